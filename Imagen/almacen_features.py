@@ -0,0 +1,380 @@
+# =============================================================================
+# ALMACÉN DE CARACTERÍSTICAS MAPEABLE EN MEMORIA
+# =============================================================================
+# Sustituye a los diccionarios pickled de tenis_features.npy / tenis_colors.npy.
+# Todo son matrices .npy contiguas que se abren con mmap_mode='r', de modo que
+# cargar el almacén no lee los datos: solo mapea los archivos.
+#
+#   almacen_tenis/
+#     vectores.npy            (N, D) float32 o float16 – un vector por imagen
+#     colores.npy             (N, 3) float32           – color medio por imagen
+#     clase_idx.npy           (N,)   int32             – clase de cada imagen
+#     centroides.npy          (C, D) float32           – media por clase
+#     centroides_colores.npy  (C, 3) float32
+#     conteos.npy             (C,)   int64             – imágenes por clase
+#     sumas.npy               (C, D) float64           – suma de vectores por clase
+#     sumas_colores.npy       (C, 3) float64
+#     firmas.npy              (N, 2) int64             – tamaño y mtime_ns de cada archivo
+#     indice.json             nombres de clase y metadatos
+#     rutas.txt               ruta de cada imagen (se lee solo si se pide)
+#
+# Uso:
+#   python almacen_features.py info
+#   python almacen_features.py migrar   (convierte los .npy antiguos)
+#   python almacen_features.py renombrar "clase vieja" "clase nueva"
+#
+# Con las sumas y los conteos por clase, añadir o quitar imágenes solo
+# recalcula los centroides de las clases afectadas (actualizar_almacen).
+
+import os
+import json
+import shutil
+import argparse
+
+import numpy as np
+
+from indice_ann import reconstruir_indices
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+ALMACEN_DIR = "almacen_tenis"
+VERSION_FORMATO = 1
+
+# =============================================================================
+# ESCRITURA
+# =============================================================================
+
+def calcular_centroides(vectores, clase_idx, n_clases):
+    """Medias por clase acumulando en float64. Devuelve (sumas, conteos, medias)."""
+    sumas = np.zeros((n_clases, vectores.shape[1]), dtype=np.float64)
+    np.add.at(sumas, clase_idx, vectores)
+    conteos = np.bincount(clase_idx, minlength=n_clases).astype(np.int64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        medias = sumas / conteos[:, None]
+    return sumas, conteos, medias
+
+def firma_archivo(ruta):
+    """(tamaño, mtime_ns) del archivo: si cambia, la imagen se vuelve a extraer."""
+    st = os.stat(ruta)
+    return st.st_size, st.st_mtime_ns
+
+def _reemplazar_directorio(tmp, destino):
+    """Sustituye 'destino' por 'tmp' sin dejar nunca un almacén a medias."""
+    viejo = destino + ".viejo"
+    if os.path.exists(viejo):
+        shutil.rmtree(viejo)
+    if os.path.exists(destino):
+        os.replace(destino, viejo)
+    os.replace(tmp, destino)
+    if os.path.exists(viejo):
+        shutil.rmtree(viejo)
+
+def guardar_almacen(clases, rutas, clase_idx, vectores, colores, directorio=ALMACEN_DIR,
+                    dtype=np.float32, modelo=None, centroides=None, centroides_colores=None,
+                    conteos=None, sumas=None, sumas_colores=None, firmas=None):
+    """
+    Escribe el almacén completo de forma atómica.
+    Si no se pasan centroides se calculan a partir de los vectores por imagen.
+    'firmas' (N, 2) son el tamaño y mtime_ns de cada imagen al extraerla (0 = desconocida).
+    """
+    clase_idx = np.asarray(clase_idx, dtype=np.int32)
+    vectores = np.asarray(vectores, dtype=np.float32)
+    colores = np.asarray(colores, dtype=np.float32)
+    firmas = (np.zeros((len(rutas), 2), dtype=np.int64) if firmas is None
+              else np.asarray(firmas, dtype=np.int64).reshape(len(rutas), 2))
+
+    if centroides is None:
+        sumas, conteos, centroides = calcular_centroides(vectores, clase_idx, len(clases))
+        sumas_colores, _, centroides_colores = calcular_centroides(colores, clase_idx, len(clases))
+    if sumas is None:
+        # Sin sumas explícitas (p. ej. migración) se reconstruyen a partir de las medias
+        n = np.asarray(conteos)[:, None]
+        sumas = np.nan_to_num(np.asarray(centroides, dtype=np.float64)) * n
+        sumas_colores = np.nan_to_num(np.asarray(centroides_colores, dtype=np.float64)) * n
+
+    tmp = directorio + ".tmp"
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+
+    np.save(os.path.join(tmp, "vectores.npy"), np.ascontiguousarray(vectores, dtype=dtype))
+    np.save(os.path.join(tmp, "colores.npy"), colores)
+    np.save(os.path.join(tmp, "clase_idx.npy"), clase_idx)
+    np.save(os.path.join(tmp, "centroides.npy"), np.asarray(centroides, dtype=np.float32))
+    np.save(os.path.join(tmp, "centroides_colores.npy"), np.asarray(centroides_colores, dtype=np.float32))
+    np.save(os.path.join(tmp, "conteos.npy"), np.asarray(conteos, dtype=np.int64))
+    np.save(os.path.join(tmp, "sumas.npy"), np.asarray(sumas, dtype=np.float64))
+    np.save(os.path.join(tmp, "sumas_colores.npy"), np.asarray(sumas_colores, dtype=np.float64))
+    np.save(os.path.join(tmp, "firmas.npy"), firmas)
+
+    with open(os.path.join(tmp, "rutas.txt"), "w", encoding="utf-8") as f:
+        f.writelines(f"{r}\n" for r in rutas)
+    with open(os.path.join(tmp, "indice.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION_FORMATO, "modelo": modelo,
+                   "dtype": np.dtype(dtype).name, "clases": list(clases)},
+                  f, ensure_ascii=False, indent=1)
+
+    # Los índices ANN viven dentro del almacén: sin esto el reemplazo los borraría
+    reconstruir_indices(directorio, tmp)
+    _reemplazar_directorio(tmp, directorio)
+    return directorio
+
+# =============================================================================
+# LECTURA
+# =============================================================================
+
+class AlmacenFeatures:
+    """Vista de solo lectura (mmap) sobre un almacén de características."""
+
+    def __init__(self, directorio=ALMACEN_DIR):
+        self.directorio = directorio
+        with open(os.path.join(directorio, "indice.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.modelo = meta.get("modelo")
+        self.dtype = meta.get("dtype")
+        self.clases = meta["clases"]
+
+        def abrir(nombre):
+            return np.load(os.path.join(directorio, nombre), mmap_mode="r")
+
+        self.vectores = abrir("vectores.npy")
+        self.colores = abrir("colores.npy")
+        self.clase_idx = abrir("clase_idx.npy")
+        self.centroides = abrir("centroides.npy")
+        self.centroides_colores = abrir("centroides_colores.npy")
+        self.conteos = abrir("conteos.npy")
+        self._rutas = None
+
+    @property
+    def rutas(self):
+        """Rutas por imagen; se leen del disco solo la primera vez que se piden."""
+        if self._rutas is None:
+            with open(os.path.join(self.directorio, "rutas.txt"), encoding="utf-8") as f:
+                self._rutas = f.read().splitlines()
+        return self._rutas
+
+    def __len__(self):
+        return self.vectores.shape[0]
+
+    def sumas(self):
+        """(sumas, sumas_colores) por clase en float64; los almacenes antiguos las reconstruyen."""
+        ruta = os.path.join(self.directorio, "sumas.npy")
+        if os.path.exists(ruta):
+            return np.load(ruta), np.load(os.path.join(self.directorio, "sumas_colores.npy"))
+        n = np.asarray(self.conteos)[:, None]
+        return (np.nan_to_num(np.asarray(self.centroides, dtype=np.float64)) * n,
+                np.nan_to_num(np.asarray(self.centroides_colores, dtype=np.float64)) * n)
+
+    def firmas(self):
+        """(tamaño, mtime_ns) de cada imagen al extraerla; (0, 0) si el almacén no las guardaba."""
+        ruta = os.path.join(self.directorio, "firmas.npy")
+        if os.path.exists(ruta):
+            return np.load(ruta)
+        return np.zeros((len(self), 2), dtype=np.int64)
+
+    def cerrar(self):
+        """Suelta los mapas de memoria (en Windows hace falta antes de reemplazar el directorio)."""
+        self.vectores = self.colores = self.clase_idx = None
+        self.centroides = self.centroides_colores = self.conteos = None
+
+    def como_diccionarios(self):
+        """Devuelve (tenis_features, tenis_colors) con el formato de los .npy antiguos."""
+        feats = {c: np.asarray(self.centroides[i]) for i, c in enumerate(self.clases)}
+        cols = {c: np.asarray(self.centroides_colores[i]) for i, c in enumerate(self.clases)}
+        return feats, cols
+
+def cargar_almacen(directorio=ALMACEN_DIR):
+    """Abre el almacén o devuelve None si todavía no existe."""
+    if not os.path.exists(os.path.join(directorio, "indice.json")):
+        return None
+    return AlmacenFeatures(directorio)
+
+# =============================================================================
+# ACTUALIZACIÓN INCREMENTAL
+# =============================================================================
+
+def _renombrar_ruta(ruta, vieja, nueva):
+    """dataset/vieja/foto.jpg → dataset/nueva/foto.jpg (otras rutas no se tocan)."""
+    carpeta, archivo = os.path.split(ruta)
+    padre, clase = os.path.split(carpeta)
+    return os.path.join(padre, nueva, archivo) if clase == vieja else ruta
+
+def actualizar_almacen(almacen, nuevas=None, eliminar=(), renombrar=None):
+    """
+    Aplica cambios sin volver a extraer el catálogo:
+      renombrar = {clase_vieja: clase_nueva}
+      eliminar  = rutas que se quitan del almacén (ya con el nombre nuevo)
+      nuevas    = (rutas, clases, vectores, colores[, firmas]) de imágenes ya
+                  extraídas; una ruta que ya estaba se sustituye
+    Los centroides se recalculan solo en las clases afectadas, sumando de nuevo
+    sus vectores (o, si alguna imagen no está en el almacén, corrigiendo las
+    sumas guardadas). Las clases que se quedan sin imágenes desaparecen.
+
+    Los almacenes migrados (migrar_legado) solo tienen el centroide de cada
+    clase, con conteo 0: ese centroide cuenta como una imagen, de modo que
+    añadir fotos lo mezcla con ellas en lugar de descartarlo.
+    """
+    renombrar = renombrar or {}
+    clases = [renombrar.get(c, c) for c in almacen.clases]
+    if len(set(clases)) != len(clases):
+        raise ValueError("El renombrado deja dos clases con el mismo nombre")
+
+    rutas = list(almacen.rutas)
+    clase_idx = np.array(almacen.clase_idx, dtype=np.int64)
+    for vieja, nueva in renombrar.items():
+        if vieja in almacen.clases:
+            for j in np.flatnonzero(clase_idx == almacen.clases.index(vieja)):
+                rutas[j] = _renombrar_ruta(rutas[j], vieja, nueva)
+
+    vectores = np.array(almacen.vectores, dtype=np.float32)
+    colores = np.array(almacen.colores, dtype=np.float32)
+    firmas = np.array(almacen.firmas(), dtype=np.int64)
+    sumas, sumas_colores = almacen.sumas()
+    conteos = np.array(almacen.conteos, dtype=np.int64)
+    centroides = np.array(almacen.centroides, dtype=np.float32)
+    centroides_colores = np.array(almacen.centroides_colores, dtype=np.float32)
+    tocadas = set()
+
+    sin_conteo = np.flatnonzero((conteos == 0) & np.isfinite(centroides).all(axis=1)
+                                & np.isfinite(centroides_colores).all(axis=1))
+    if sin_conteo.size:
+        print(f"⚠️ {sin_conteo.size} clases sin conteo (almacén migrado): "
+              "su centroide anterior cuenta como una imagen")
+        sumas[sin_conteo] = centroides[sin_conteo]
+        sumas_colores[sin_conteo] = centroides_colores[sin_conteo]
+        conteos[sin_conteo] = 1
+
+    # 1) Quitar imágenes (también las que vuelven a entrar con un vector nuevo)
+    quitar = set(eliminar)
+    if nuevas is not None:
+        quitar |= set(nuevas[0]) & set(rutas)
+    if quitar:
+        fuera = np.array([r in quitar for r in rutas], dtype=bool)
+        idx = clase_idx[fuera]
+        np.subtract.at(sumas, idx, vectores[fuera].astype(np.float64))
+        np.subtract.at(sumas_colores, idx, colores[fuera].astype(np.float64))
+        conteos -= np.bincount(idx, minlength=len(clases))
+        tocadas.update(idx.tolist())
+        rutas = [r for r, f in zip(rutas, fuera) if not f]
+        clase_idx, vectores, colores = clase_idx[~fuera], vectores[~fuera], colores[~fuera]
+        firmas = firmas[~fuera]
+
+    # 2) Añadir imágenes, creando las clases que no existían
+    if nuevas is not None:
+        n_rutas, n_clases, n_vectores, n_colores = nuevas[:4]
+        n_firmas = nuevas[4] if len(nuevas) > 4 else np.zeros((len(n_rutas), 2), dtype=np.int64)
+        posicion = {c: i for i, c in enumerate(clases)}
+        for c in n_clases:
+            posicion.setdefault(c, len(posicion))
+        extra = len(posicion) - len(clases)
+        if extra:
+            clases.extend(list(posicion)[len(clases):])
+            sumas = np.vstack([sumas, np.zeros((extra, sumas.shape[1]))])
+            sumas_colores = np.vstack([sumas_colores, np.zeros((extra, 3))])
+            conteos = np.concatenate([conteos, np.zeros(extra, dtype=np.int64)])
+            centroides = np.vstack([centroides, np.zeros((extra, centroides.shape[1]), np.float32)])
+            centroides_colores = np.vstack([centroides_colores, np.zeros((extra, 3), np.float32)])
+
+        idx = np.array([posicion[c] for c in n_clases], dtype=np.int64)
+        n_vectores = np.asarray(n_vectores, dtype=np.float32).reshape(len(idx), -1)
+        n_colores = np.asarray(n_colores, dtype=np.float32).reshape(len(idx), 3)
+        np.add.at(sumas, idx, n_vectores.astype(np.float64))
+        np.add.at(sumas_colores, idx, n_colores.astype(np.float64))
+        conteos += np.bincount(idx, minlength=len(clases))
+        tocadas.update(idx.tolist())
+        rutas.extend(n_rutas)
+        clase_idx = np.concatenate([clase_idx, idx])
+        vectores = np.vstack([vectores, n_vectores])
+        colores = np.vstack([colores, n_colores])
+        firmas = np.vstack([firmas, np.asarray(n_firmas, dtype=np.int64).reshape(len(idx), 2)])
+
+    # 3) Centroides nuevos solo donde algo cambió; fuera las clases vacías.
+    # Las clases tocadas con todas sus imágenes en el almacén se vuelven a sumar
+    # desde los vectores: en un almacén float16, restar la fila redondeada de una
+    # suma hecha en float32 deja un error que se acumula con cada sustitución.
+    tocadas = np.array(sorted(tocadas), dtype=np.int64)
+    if tocadas.size:
+        filas_por_clase = np.bincount(clase_idx, minlength=len(clases))
+        completas = tocadas[conteos[tocadas] == filas_por_clase[tocadas]]
+        filas = np.isin(clase_idx, completas)
+        sumas[completas] = 0
+        sumas_colores[completas] = 0
+        np.add.at(sumas, clase_idx[filas], vectores[filas].astype(np.float64))
+        np.add.at(sumas_colores, clase_idx[filas], colores[filas].astype(np.float64))
+    vivas = np.ones(len(clases), dtype=bool)
+    if tocadas.size:
+        vivas[tocadas] = conteos[tocadas] > 0
+        recalcular = tocadas[conteos[tocadas] > 0]
+        centroides[recalcular] = sumas[recalcular] / conteos[recalcular, None]
+        centroides_colores[recalcular] = sumas_colores[recalcular] / conteos[recalcular, None]
+    if not vivas.all():
+        clase_idx = (np.cumsum(vivas) - 1)[clase_idx]
+        clases = [c for c, v in zip(clases, vivas) if v]
+        sumas, sumas_colores = sumas[vivas], sumas_colores[vivas]
+        conteos, centroides = conteos[vivas], centroides[vivas]
+        centroides_colores = centroides_colores[vivas]
+
+    directorio, dtype, modelo = almacen.directorio, almacen.dtype, almacen.modelo
+    almacen.cerrar()
+    return guardar_almacen(clases, rutas, clase_idx, vectores, colores, directorio,
+                           dtype=dtype, modelo=modelo, centroides=centroides,
+                           centroides_colores=centroides_colores, conteos=conteos,
+                           sumas=sumas, sumas_colores=sumas_colores, firmas=firmas)
+
+# =============================================================================
+# MIGRACIÓN DESDE LOS DICCIONARIOS ANTIGUOS
+# =============================================================================
+
+def migrar_legado(ruta_features="tenis_features.npy", ruta_colores="tenis_colors.npy",
+                  directorio=ALMACEN_DIR):
+    """
+    Convierte los .npy pickled antiguos (solo medias por clase) a un almacén.
+    Solo debe usarse con archivos generados localmente: np.load con
+    allow_pickle=True puede ejecutar código arbitrario.
+    """
+    feats = np.load(ruta_features, allow_pickle=True).item()
+    cols = np.load(ruta_colores, allow_pickle=True).item()
+    clases = list(feats)
+    centroides = np.stack([feats[c] for c in clases])
+    centroides_colores = np.stack([cols[c] for c in clases])
+    vacio = np.empty((0, centroides.shape[1]), dtype=np.float32)
+    return guardar_almacen(clases, [], [], vacio, np.empty((0, 3), dtype=np.float32),
+                           directorio, centroides=centroides,
+                           centroides_colores=centroides_colores,
+                           conteos=np.zeros(len(clases), dtype=np.int64))
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Almacén de características de tenis")
+    parser.add_argument("--dir", default=ALMACEN_DIR)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("info", help="Resumen del almacén")
+    p = sub.add_parser("migrar", help="Convierte tenis_features.npy / tenis_colors.npy")
+    p.add_argument("--features", default="tenis_features.npy")
+    p.add_argument("--colores", default="tenis_colors.npy")
+    p = sub.add_parser("renombrar", help="Cambia el nombre de una clase sin reextraer")
+    p.add_argument("vieja")
+    p.add_argument("nueva")
+    args = parser.parse_args()
+
+    if args.comando == "migrar":
+        migrar_legado(args.features, args.colores, args.dir)
+        print(f"✅ Almacén creado en {args.dir}")
+    elif args.comando == "renombrar":
+        almacen = cargar_almacen(args.dir)
+        if almacen is None or args.vieja not in almacen.clases:
+            raise SystemExit(f"❌ La clase '{args.vieja}' no está en {args.dir}")
+        actualizar_almacen(almacen, renombrar={args.vieja: args.nueva})
+        print(f"✅ '{args.vieja}' → '{args.nueva}'")
+
+    almacen = cargar_almacen(args.dir)
+    if almacen is None:
+        print(f"❌ No existe el almacén {args.dir}")
+    else:
+        print(f"📦 {args.dir}: {len(almacen)} imágenes, {len(almacen.clases)} clases, "
+              f"dims={almacen.centroides.shape[1]}, dtype={almacen.dtype}, modelo={almacen.modelo}")
@@ -0,0 +1,306 @@
+# =============================================================================
+# BACKENDS DE INFERENCIA EN CPU (Keras / TFLite / ONNX Runtime, con int8)
+# =============================================================================
+# Todos los backends reciben la entrada ya preprocesada (preprocess_input del
+# modelo) y devuelven la matriz de features, igual que model(x, training=False),
+# así que se pueden pasar directamente a extraer_features_lotes.
+#
+#   keras        modelo original en float32 (por defecto)
+#   tflite       exportado a TFLite float32
+#   tflite-int8  TFLite con pesos y activaciones int8 (calibrado con tenis_dataset)
+#   onnx         exportado con tf2onnx y ejecutado con onnxruntime
+#   onnx-int8    ONNX cuantizado estáticamente (QDQ) con el mismo calibrado
+#   sintetico    proyección aleatoria fija de los píxeles, sin pesos ni TensorFlow
+#                (para benchmarks y pruebas sin conexión; no sirve para clasificar)
+#
+# Se elige con la variable de entorno BACKEND_INFERENCIA o con 'backend=' en
+# obtener_backend. Uso:
+#   python backends.py exportar --modelo mobilenet --formato tflite-int8 --dataset tenis_dataset
+#   python backends.py comparar --modelo mobilenet --formato tflite-int8 --dataset tenis_dataset
+
+import os
+import time
+import argparse
+from functools import lru_cache
+
+import numpy as np
+
+from modelos import obtener_mobilenet, obtener_vgg16, preprocess_mobilenet, preprocess_vgg16
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+BACKEND = os.environ.get("BACKEND_INFERENCIA", "keras")
+DIR_EXPORTADOS = "modelos_exportados"
+N_CALIBRACION = 200   # imágenes para calibrar la cuantización int8
+
+MODELOS = {
+    "mobilenet": (obtener_mobilenet, preprocess_mobilenet),
+    "vgg16": (obtener_vgg16, preprocess_vgg16),
+}
+FORMATOS = ("keras", "tflite", "tflite-int8", "onnx", "onnx-int8")
+DIMS = {"mobilenet": 1280, "vgg16": 512}  # tamaño de salida de cada extractor
+
+def ruta_exportado(modelo, formato):
+    extension = "tflite" if formato.startswith("tflite") else "onnx"
+    return os.path.join(DIR_EXPORTADOS, f"{modelo}{'-int8' if formato.endswith('int8') else ''}.{extension}")
+
+def hilos_inferencia():
+    """Hilos para TFLite / ONNX Runtime: HILOS_INFERENCIA o todos los núcleos."""
+    return int(os.environ.get("HILOS_INFERENCIA", "0")) or os.cpu_count() or 1
+
+def nombre_backend(backend=None):
+    """Nombre del backend que usaría obtener_backend (sin cargar el modelo)."""
+    return backend or BACKEND
+
+def clave_modelo(base, backend):
+    """
+    Clave para la caché de embeddings: los vectores de cada backend no se mezclan.
+    'backend' es un backend ya creado o su nombre.
+    """
+    nombre = getattr(backend, "nombre", backend)
+    return base if nombre == "keras" else f"{base}@{nombre}"
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class BackendKeras:
+    def __init__(self, modelo):
+        self.nombre = "keras"
+        self.model = MODELOS[modelo][0]()
+
+    def __call__(self, x, training=False):
+        return np.asarray(self.model(x, training=False))
+
+class BackendTFLite:
+    def __init__(self, ruta, nombre):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.nombre = nombre
+        self.interprete = Interpreter(model_path=ruta, num_threads=hilos_inferencia())
+        self.entrada = self.interprete.get_input_details()[0]["index"]
+        self.salida = self.interprete.get_output_details()[0]["index"]
+        self.lote = None
+
+    def __call__(self, x, training=False):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if self.lote != len(x):
+            # El intérprete necesita reservar tensores para cada tamaño de lote
+            self.interprete.resize_tensor_input(self.entrada, list(x.shape))
+            self.interprete.allocate_tensors()
+            self.lote = len(x)
+        self.interprete.set_tensor(self.entrada, x)
+        self.interprete.invoke()
+        return self.interprete.get_tensor(self.salida).copy()
+
+class BackendONNX:
+    def __init__(self, ruta, nombre):
+        import onnxruntime as ort
+        self.nombre = nombre
+        opciones = ort.SessionOptions()
+        opciones.intra_op_num_threads = hilos_inferencia()
+        self.sesion = ort.InferenceSession(ruta, opciones, providers=["CPUExecutionProvider"])
+        self.entrada = self.sesion.get_inputs()[0].name
+
+    def __call__(self, x, training=False):
+        return self.sesion.run(None, {self.entrada: np.asarray(x, dtype=np.float32)})[0]
+
+class BackendSintetico:
+    """
+    Sustituto sin pesos con la misma salida que el modelo real: submuestrea la
+    entrada a 28x28 y la proyecta con una matriz aleatoria fija. Imágenes
+    parecidas dan vectores parecidos, así que el resto del pipeline se comporta
+    de forma realista.
+    """
+
+    def __init__(self, modelo, semilla=0):
+        self.nombre = "sintetico"
+        self.proyeccion = np.random.default_rng(semilla).standard_normal(
+            (28 * 28 * 3, DIMS[modelo])).astype(np.float32) / np.float32(28 * 28 * 3) ** 0.5
+
+    def __call__(self, x, training=False):
+        x = np.asarray(x, dtype=np.float32)
+        paso = max(1, x.shape[1] // 28)
+        x = x[:, ::paso, ::paso, :][:, :28, :28, :]
+        return np.maximum(x.reshape(len(x), -1) @ self.proyeccion, 0)  # no negativos, como tras ReLU
+
+@lru_cache(maxsize=None)
+def obtener_backend(modelo="mobilenet", backend=None):
+    """Backend de inferencia para 'mobilenet' o 'vgg16' (se crea una sola vez)."""
+    backend = backend or BACKEND
+    if backend == "keras":
+        return BackendKeras(modelo)
+    if backend == "sintetico":
+        return BackendSintetico(modelo)
+    ruta = ruta_exportado(modelo, backend)
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(
+            f"No existe {ruta}. Genéralo con: python backends.py exportar "
+            f"--modelo {modelo} --formato {backend}")
+    print(f"⚙️ Backend de inferencia: {backend} ({ruta})")
+    if backend.startswith("tflite"):
+        return BackendTFLite(ruta, backend)
+    if backend.startswith("onnx"):
+        return BackendONNX(ruta, backend)
+    raise ValueError(f"Backend desconocido: {backend} (opciones: {', '.join(FORMATOS)})")
+
+# =============================================================================
+# CALIBRACIÓN Y EXPORTACIÓN
+# =============================================================================
+
+def lotes_calibracion(dataset_dir, modelo, n=N_CALIBRACION, tam_lote=8, semilla=0):
+    """Lotes preprocesados repartidos entre todas las clases de dataset_dir."""
+    from extraccion_lotes import decodificar, listar_imagenes
+
+    rng = np.random.default_rng(semilla)
+    por_clase = [listar_imagenes(os.path.join(dataset_dir, c)) for c in sorted(os.listdir(dataset_dir))
+                 if os.path.isdir(os.path.join(dataset_dir, c))]
+    rutas = []
+    while len(rutas) < n and any(por_clase):
+        for lista in por_clase:
+            if lista and len(rutas) < n:
+                rutas.append(lista.pop(rng.integers(len(lista))))
+    if not rutas:
+        raise ValueError(f"No hay imágenes para calibrar en {dataset_dir}")
+
+    preprocess = MODELOS[modelo][1]
+    for i in range(0, len(rutas), tam_lote):
+        x = np.stack([decodificar(r)[0] for r in rutas[i:i + tam_lote]])
+        yield preprocess(x).astype(np.float32)
+
+def exportar(modelo, formato, dataset_dir=None, n_calibracion=N_CALIBRACION):
+    """
+    Exporta el extractor Keras a TFLite u ONNX, opcionalmente cuantizado a int8
+    (calibrado con n_calibracion imágenes de dataset_dir).
+    """
+    import tensorflow as tf
+
+    os.makedirs(DIR_EXPORTADOS, exist_ok=True)
+    ruta = ruta_exportado(modelo, formato)
+    model = MODELOS[modelo][0]()
+    int8 = formato.endswith("int8")
+    if int8 and not dataset_dir:
+        raise ValueError("La cuantización int8 necesita --dataset para calibrar")
+
+    if formato.startswith("tflite"):
+        conversor = tf.lite.TFLiteConverter.from_keras_model(model)
+        if int8:
+            lotes = list(lotes_calibracion(dataset_dir, modelo, n_calibracion, tam_lote=1))
+            conversor.optimizations = [tf.lite.Optimize.DEFAULT]
+            conversor.representative_dataset = lambda: ([x] for x in lotes)
+            conversor.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        with open(ruta, "wb") as f:
+            f.write(conversor.convert())
+
+    elif formato.startswith("onnx"):
+        import tf2onnx
+        ruta_fp32 = ruta_exportado(modelo, "onnx")
+        firma = (tf.TensorSpec((None, 224, 224, 3), tf.float32, name="entrada"),)
+        tf2onnx.convert.from_keras(model, input_signature=firma, opset=13, output_path=ruta_fp32)
+        if int8:
+            from onnxruntime.quantization import (CalibrationDataReader, QuantFormat,
+                                                  QuantType, quantize_static)
+
+            class Lector(CalibrationDataReader):
+                def __init__(self):
+                    self.lotes = iter(lotes_calibracion(dataset_dir, modelo, n_calibracion))
+
+                def get_next(self):
+                    x = next(self.lotes, None)
+                    return None if x is None else {"entrada": x}
+
+            quantize_static(ruta_fp32, ruta, Lector(), quant_format=QuantFormat.QDQ,
+                            per_channel=True, activation_type=QuantType.QInt8,
+                            weight_type=QuantType.QInt8)
+    else:
+        raise ValueError(f"Formato no exportable: {formato}")
+
+    print(f"✅ Exportado {modelo} → {ruta} ({os.path.getsize(ruta) / 1e6:.1f} MB)")
+    return ruta
+
+# =============================================================================
+# COMPARACIÓN CON KERAS
+# =============================================================================
+
+def _rss_mb():
+    """Memoria residente actual del proceso (Linux); 0 si no se puede leer."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return 0.0
+
+def comparar(modelo, formato, dataset_dir, limite=500, batch_size=32):
+    """
+    Acuerdo de embeddings (coseno) y de top-1 frente a Keras, más img/s y
+    memoria de cada backend. El top-1 usa los centroides del almacén si existe.
+    """
+    from extraccion_lotes import decodificar, listar_imagenes
+    from almacen_features import cargar_almacen
+    from puntuacion import PuntuadorTenis, normalizar_filas
+
+    rutas = [r for c in sorted(os.listdir(dataset_dir))
+             if os.path.isdir(os.path.join(dataset_dir, c))
+             for r in listar_imagenes(os.path.join(dataset_dir, c))][:limite]
+    preprocess = MODELOS[modelo][1]
+    decodificadas = [decodificar(r) for r in rutas]
+    entradas = preprocess(np.stack([d[0] for d in decodificadas]))
+    colores = np.stack([d[1] for d in decodificadas])
+
+    resultados = {}
+    for nombre in ("keras", formato):
+        rss0 = _rss_mb()
+        backend = obtener_backend(modelo, nombre)
+        backend(entradas[:1])  # calentamiento
+        rss_modelo = _rss_mb() - rss0
+        t0 = time.perf_counter()
+        feats = np.concatenate([backend(entradas[i:i + batch_size])
+                                for i in range(0, len(entradas), batch_size)])
+        resultados[nombre] = (feats, len(rutas) / (time.perf_counter() - t0), rss_modelo)
+
+    base, otro = resultados["keras"][0], resultados[formato][0]
+    cos = np.sum(normalizar_filas(base) * normalizar_filas(otro), axis=1)
+
+    print(f"\n=== {modelo}: keras vs {formato} ({len(rutas)} imágenes) ===")
+    print(f"Coseno entre embeddings: media {cos.mean():.4f} | mínimo {cos.min():.4f}")
+
+    almacen = cargar_almacen()
+    if modelo == "mobilenet" and almacen is not None:
+        puntuador = PuntuadorTenis.desde_almacen(almacen)
+        top_base = [t[0][0] if t else None for t in puntuador.top_k(base, colores)]
+        top_otro = [t[0][0] if t else None for t in puntuador.top_k(otro, colores)]
+        acuerdo = np.mean([a == b for a, b in zip(top_base, top_otro)])
+        print(f"Acuerdo de clase top-1: {acuerdo * 100:.1f}%")
+
+    tam = {n: os.path.getsize(ruta_exportado(modelo, n)) / 1e6 for n in (formato,)}
+    for nombre, (_, ips, rss) in resultados.items():
+        extra = f" | archivo {tam[nombre]:.1f} MB" if nombre in tam else ""
+        print(f"{nombre:<12} {ips:8.1f} img/s | +{rss:7.0f} MB de RAM al cargar{extra}")
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backends de inferencia cuantizados")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    for nombre in ("exportar", "comparar"):
+        p = sub.add_parser(nombre)
+        p.add_argument("--modelo", choices=list(MODELOS), default="mobilenet")
+        p.add_argument("--formato", choices=FORMATOS[1:], default="tflite-int8")
+        p.add_argument("--dataset", default="tenis_dataset")
+        if nombre == "exportar":
+            p.add_argument("--limite", type=int, default=N_CALIBRACION,
+                           help="Imágenes de calibración para int8")
+        else:
+            p.add_argument("--limite", type=int, default=500, help="Imágenes que se comparan")
+    args = parser.parse_args()
+
+    if args.comando == "exportar":
+        exportar(args.modelo, args.formato, args.dataset, args.limite)
+    else:
+        comparar(args.modelo, args.formato, args.dataset, args.limite)
@@ -0,0 +1,936 @@
+# =============================================================================
+# BENCHMARKS DEL PIPELINE DE IMÁGENES (CPU)
+# =============================================================================
+# Uso:
+#   python benchmarks.py extraccion --carpeta tenis_dataset --batch 32
+#   python benchmarks.py almacen --imagenes 100000 --clases 2000
+#   python benchmarks.py puntuacion --consultas 256 --clases 5000
+#   python benchmarks.py ann --vectores 200000 --dims 1280
+#   python benchmarks.py arranque --imagen foto.jpg --comparar-con HEAD~1
+#   python benchmarks.py servicio --carpeta media --concurrencia 16 --peticiones 500
+#   python benchmarks.py decodificacion --carpeta tenis_dataset
+#   python benchmarks.py grupos --imagenes 2000 8000 --batch 16 64
+#   python benchmarks.py clustering --imagenes 10000 100000 1000000 --grupos 100
+#   python benchmarks.py pipeline --clases 20 --por-clase 50 --png 0.3 --backend sintetico
+#   python benchmarks.py fragmentos --procesos 1 4 8 --backend keras
+#   python benchmarks.py jerarquia --clases 500 2000 10000 --familias 1 2 4
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import numpy as np
+
+# =============================================================================
+# UTILIDADES
+# =============================================================================
+
+def listar_dataset(dataset_dir, limite=None):
+    """Devuelve [(ruta, clase)] de un dataset con una carpeta por clase."""
+    from extraccion_lotes import listar_imagenes
+    pares = []
+    for clase in sorted(os.listdir(dataset_dir)):
+        carpeta = os.path.join(dataset_dir, clase)
+        if os.path.isdir(carpeta):
+            pares.extend((ruta, clase) for ruta in sorted(listar_imagenes(carpeta)))
+    return pares[:limite] if limite else pares
+
+def medias_por_clase(rutas, feats, clase_de):
+    """Agrupa vectores por clase y devuelve {clase: media}."""
+    grupos = {}
+    for ruta, feat in zip(rutas, feats):
+        grupos.setdefault(clase_de[ruta], []).append(feat)
+    return {c: np.mean(v, axis=0) for c, v in grupos.items()}
+
+# =============================================================================
+# BENCHMARK: EXTRACCIÓN UNA A UNA VS POR LOTES
+# =============================================================================
+
+def bench_extraccion(dataset_dir, limite=256, batch_size=32, prefetch=2, workers=None):
+    """Compara imágenes/seg del bucle model.predict por imagen contra el pipeline por lotes."""
+    import generar_vectores as gv
+    from extraccion_lotes import extraer_features_lotes
+
+    pares = listar_dataset(dataset_dir, limite)
+    if not pares:
+        print(f"❌ No hay imágenes en {dataset_dir}")
+        return
+    rutas = [r for r, _ in pares]
+    clase_de = dict(pares)
+
+    # Calentamiento para no medir la construcción del grafo
+    gv.extraer_features(rutas[0])
+
+    t0 = time.perf_counter()
+    feats_bucle = [gv.extraer_features(r) for r in rutas]
+    t_bucle = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    rutas_lote, feats_lote = [], []
+    for rutas_ok, feats, _ in extraer_features_lotes(
+            rutas, gv.obtener_mobilenet(), gv.preprocess_mobilenet, batch_size, prefetch, workers):
+        rutas_lote.extend(rutas_ok)
+        feats_lote.extend(feats)
+    t_lote = time.perf_counter() - t0
+
+    medias_bucle = medias_por_clase(rutas, feats_bucle, clase_de)
+    medias_lote = medias_por_clase(rutas_lote, feats_lote, clase_de)
+    dif = max(np.abs(medias_bucle[c] - medias_lote[c]).max() for c in medias_bucle)
+
+    print("\n=== EXTRACCIÓN DE CARACTERÍSTICAS ===")
+    print(f"Imágenes: {len(rutas)} | batch={batch_size} prefetch={prefetch}")
+    print(f"Bucle una a una : {len(rutas) / t_bucle:8.1f} img/s ({t_bucle:.2f} s)")
+    print(f"Por lotes       : {len(rutas) / t_lote:8.1f} img/s ({t_lote:.2f} s)")
+    print(f"Aceleración     : {t_bucle / t_lote:8.2f}x")
+    print(f"Máx. diferencia entre medias por clase: {dif:.2e}")
+
+# =============================================================================
+# BENCHMARK: CARGA DE DICCIONARIOS PICKLED VS ALMACÉN MMAP
+# =============================================================================
+
+def bench_almacen(n_imagenes=100_000, n_clases=2_000, dims=1280, directorio="bench_almacen"):
+    """Mide el tiempo de carga del formato antiguo frente al almacén mapeado."""
+    import tempfile
+    from almacen_features import guardar_almacen, cargar_almacen
+
+    rng = np.random.default_rng(0)
+    clase_idx = rng.integers(0, n_clases, n_imagenes)
+    vectores = rng.random((n_imagenes, dims), dtype=np.float32)
+    colores = rng.random((n_imagenes, 3), dtype=np.float32) * 255
+    clases = [f"clase_{i:05d}" for i in range(n_clases)]
+    rutas = [f"{clases[c]}/img_{i}.jpg" for i, c in enumerate(clase_idx)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta_pickle = os.path.join(tmp, "tenis_features.npy")
+        directorio = os.path.join(tmp, directorio)
+        # El formato antiguo solo guardaba medias; aquí se guardan por imagen para comparar igual
+        np.save(ruta_pickle, {r: v for r, v in zip(rutas, vectores)})
+        guardar_almacen(clases, rutas, clase_idx, vectores, colores, directorio)
+
+        t0 = time.perf_counter()
+        np.load(ruta_pickle, allow_pickle=True).item()
+        t_pickle = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        almacen = cargar_almacen(directorio)
+        t_mmap = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        np.asarray(almacen.centroides).sum()
+        t_centroides = time.perf_counter() - t0
+
+    print("\n=== CARGA DE CARACTERÍSTICAS ===")
+    print(f"Imágenes: {n_imagenes} | clases: {n_clases} | dims: {dims}")
+    print(f"Dict pickled (np.load + .item()) : {t_pickle * 1000:9.1f} ms")
+    print(f"Almacén mmap (cargar_almacen)    : {t_mmap * 1000:9.1f} ms")
+    print(f"Primer acceso a los centroides   : {t_centroides * 1000:9.1f} ms")
+
+# =============================================================================
+# BENCHMARK: PUNTUACIÓN POR CLASE VS VECTORIZADA
+# =============================================================================
+
+def _puntuar_bucle(feat_new, color_new, tenis_features, tenis_colors, alpha):
+    """Réplica del bucle original de clasificar_tenis (referencia)."""
+    from sklearn.metrics.pairwise import cosine_similarity
+    resultados = []
+    for nombre, feat_avg in tenis_features.items():
+        color_avg = tenis_colors[nombre]
+        if np.isnan(feat_avg).any() or np.isnan(feat_new).any():
+            continue
+        sim_forma = cosine_similarity(feat_new.reshape(1, -1), feat_avg.reshape(1, -1))[0][0]
+        sim_color = 1 / (1 + np.linalg.norm(color_avg - color_new))
+        resultados.append((nombre, alpha * sim_forma + (1 - alpha) * sim_color))
+    resultados.sort(key=lambda x: x[1], reverse=True)
+    return resultados[0]
+
+def bench_puntuacion(n_consultas=256, n_clases=5_000, dims=1280, alpha=0.8, k=5):
+    """Compara el bucle por clase con PuntuadorTenis sobre datos sintéticos."""
+    from puntuacion import PuntuadorTenis
+
+    rng = np.random.default_rng(0)
+    centroides = rng.random((n_clases, dims), dtype=np.float32)
+    colores = rng.random((n_clases, 3), dtype=np.float32) * 255
+    feats = rng.random((n_consultas, dims), dtype=np.float32)
+    cols = rng.random((n_consultas, 3), dtype=np.float32) * 255
+    clases = [f"clase_{i:05d}" for i in range(n_clases)]
+    tenis_features = dict(zip(clases, centroides))
+    tenis_colors = dict(zip(clases, colores))
+
+    # El bucle es lento: se mide sobre pocas consultas y se extrapola
+    n_bucle = min(n_consultas, 8)
+    t0 = time.perf_counter()
+    ref = [_puntuar_bucle(feats[i], cols[i], tenis_features, tenis_colors, alpha)
+           for i in range(n_bucle)]
+    t_bucle = (time.perf_counter() - t0) / n_bucle
+
+    t0 = time.perf_counter()
+    puntuador = PuntuadorTenis(clases, centroides, colores)
+    t_preparar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    top = puntuador.top_k(feats, cols, alpha, k)
+    t_vector = (time.perf_counter() - t0) / n_consultas
+
+    coinciden = sum(r[0] == t[0][0] for r, t in zip(ref, top))
+    dif = max(abs(r[1] - t[0][1]) for r, t in zip(ref, top))
+
+    print("\n=== PUNTUACIÓN DE SIMILITUD ===")
+    print(f"Consultas: {n_consultas} | clases: {n_clases} | dims: {dims} | top-{k}")
+    print(f"Bucle por clase   : {t_bucle * 1000:9.3f} ms/consulta")
+    print(f"Vectorizado       : {t_vector * 1000:9.3f} ms/consulta "
+          f"(+{t_preparar * 1000:.1f} ms de preparación única)")
+    print(f"Aceleración       : {t_bucle / t_vector:9.1f}x")
+    print(f"Top-1 coincidente : {coinciden}/{n_bucle} | máx. diferencia: {dif:.2e}")
+
+# =============================================================================
+# BENCHMARK: ÍNDICE ANN VS FUERZA BRUTA
+# =============================================================================
+
+def datos_agrupados(n, dims, n_grupos, semilla=0):
+    """Vectores sintéticos con estructura de grupos, parecidos a embeddings reales."""
+    rng = np.random.default_rng(semilla)
+    centros = rng.standard_normal((n_grupos, dims)).astype(np.float32)
+    grupo = rng.integers(0, n_grupos, n)
+    ruido = rng.standard_normal((n, dims)).astype(np.float32) * 0.6
+    return centros[grupo] + ruido
+
+def bench_ann(n_vectores=100_000, dims=256, n_consultas=500, k=10, almacen_dir=None):
+    """Recall@k y consultas/seg de cada método y configuración frente a fuerza bruta."""
+    from indice_ann import IndiceANN, hnswlib
+    from almacen_features import cargar_almacen
+
+    almacen = cargar_almacen(almacen_dir) if almacen_dir else None
+    if almacen is not None and len(almacen) > 0:
+        vectores = np.asarray(almacen.vectores, dtype=np.float32)
+        rng = np.random.default_rng(1)
+        consultas = vectores[rng.choice(len(vectores), min(n_consultas, len(vectores)), replace=False)]
+        consultas = consultas + rng.standard_normal(consultas.shape).astype(np.float32) * 0.01
+        origen = f"almacén {almacen_dir}"
+    else:
+        vectores = datos_agrupados(n_vectores, dims, max(10, n_vectores // 200))
+        consultas = datos_agrupados(n_consultas, dims, max(10, n_vectores // 200), semilla=0)[::-1]
+        origen = "sintético"
+
+    exacto = IndiceANN("exacto").construir(vectores)
+    t0 = time.perf_counter()
+    verdad, _ = exacto.buscar(consultas, k)
+    qps_exacto = len(consultas) / (time.perf_counter() - t0)
+
+    def medir(nombre, indice, t_construir, **opciones):
+        t0 = time.perf_counter()
+        idx, _ = indice.buscar(consultas, k, **opciones)
+        qps = len(consultas) / (time.perf_counter() - t0)
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(idx, verdad)])
+        print(f"{nombre:<24} recall@{k}={recall:6.3f}  {qps:10.0f} consultas/s  "
+              f"(construcción {t_construir:.1f} s)")
+
+    print("\n=== ÍNDICE ANN ===")
+    print(f"Datos: {origen} | vectores: {len(vectores)} | dims: {vectores.shape[1]}")
+    print(f"{'exacto (fuerza bruta)':<24} recall@{k}= 1.000  {qps_exacto:10.0f} consultas/s")
+
+    t0 = time.perf_counter()
+    ivf = IndiceANN("ivf").construir(vectores)
+    t_ivf = time.perf_counter() - t0
+    for nprobe in (1, 4, 8, 16, 32):
+        medir(f"ivf nprobe={nprobe}", ivf, t_ivf, nprobe=nprobe)
+
+    if hnswlib is not None:
+        t0 = time.perf_counter()
+        hnsw = IndiceANN("hnsw").construir(vectores)
+        t_hnsw = time.perf_counter() - t0
+        for ef in (16, 32, 64, 128, 256):
+            medir(f"hnsw ef={ef}", hnsw, t_hnsw, ef=ef)
+    else:
+        print("(hnswlib no instalado: se omite HNSW)")
+
+# =============================================================================
+# BENCHMARK: TIEMPO DE IMPORTACIÓN Y ARRANQUE EN FRÍO
+# =============================================================================
+
+MODULOS_ARRANQUE = ["generar_vectores", "clasificar_carpeta",
+                    "clasificación_grupos_similitud", "galería"]
+
+def _medir_arranque(directorio, modulo, imagen=None):
+    """Importa 'modulo' en un proceso nuevo; con 'imagen' mide también la primera extracción."""
+    primera = (f"m.extraer_features({imagen!r}) if hasattr(m, 'extraer_features') else None; "
+               if imagen else "")
+    codigo = ("import time, resource, importlib; t0 = time.perf_counter(); "
+              f"m = importlib.import_module({modulo!r}); t1 = time.perf_counter(); {primera}"
+              "print(t1 - t0, time.perf_counter() - t0, "
+              "resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)")
+    proc = subprocess.run([sys.executable, "-c", codigo], cwd=directorio,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    t_import, t_total, rss_kb = proc.stdout.strip().splitlines()[-1].split()
+    return float(t_import), float(t_total), int(rss_kb) / 1024
+
+def bench_arranque(imagen=None, ref=None):
+    """Tiempo de importación, arranque hasta la primera extracción y RAM máxima por script."""
+    import tempfile
+
+    aqui = os.path.dirname(os.path.abspath(__file__))
+    versiones = [("actual", aqui)]
+    tmp = None
+    if ref:
+        # Extrae la carpeta Imagen de otra revisión para comparar antes/después
+        raiz = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=aqui,
+                              capture_output=True, text=True, check=True).stdout.strip()
+        tmp = tempfile.TemporaryDirectory()
+        archivo = subprocess.run(["git", "archive", ref, os.path.relpath(aqui, raiz)],
+                                 cwd=raiz, capture_output=True, check=True).stdout
+        subprocess.run(["tar", "-x", "-C", tmp.name], input=archivo, check=True)
+        versiones.insert(0, (ref, os.path.join(tmp.name, os.path.relpath(aqui, raiz))))
+    imagen = os.path.abspath(imagen) if imagen else None
+
+    print("\n=== IMPORTACIÓN Y ARRANQUE EN FRÍO ===")
+    print(f"{'versión':<10} {'módulo':<32} {'import':>9} {'1ª extracción':>14} {'RAM máx':>9}")
+    for nombre, directorio in versiones:
+        for modulo in MODULOS_ARRANQUE:
+            r = _medir_arranque(directorio, modulo, imagen)
+            if r is None:
+                print(f"{nombre:<10} {modulo:<32} {'error al importar':>34}")
+                continue
+            t_import, t_total, rss = r
+            primera = f"{t_total:13.2f}s" if imagen else f"{'-':>14}"
+            print(f"{nombre:<10} {modulo:<32} {t_import:8.2f}s {primera} {rss:7.0f}MB")
+
+    if tmp:
+        tmp.cleanup()
+
+# =============================================================================
+# BENCHMARK: SERVICIO DE CLASIFICACIÓN BAJO CARGA CONCURRENTE
+# =============================================================================
+
+def bench_servicio(carpeta, url="http://127.0.0.1:8765", concurrencia=16, peticiones=500, k=1):
+    """
+    Cliente de carga contra servicio_clasificacion.py (debe estar en marcha).
+    Informa latencia p50/p99 por petición y throughput total.
+    """
+    import json
+    import urllib.request
+    from concurrent.futures import ThreadPoolExecutor
+    from extraccion_lotes import listar_imagenes
+
+    rutas = [os.path.abspath(r) for r in listar_imagenes(carpeta)]
+    if not rutas:
+        print(f"❌ No hay imágenes en {carpeta}")
+        return
+
+    def una(i):
+        cuerpo = json.dumps({"ruta": rutas[i % len(rutas)], "k": k}).encode("utf-8")
+        peticion = urllib.request.Request(url + "/clasificar", data=cuerpo,
+                                          headers={"Content-Type": "application/json"})
+        t0 = time.perf_counter()
+        with urllib.request.urlopen(peticion) as r:
+            r.read()
+        return time.perf_counter() - t0
+
+    una(0)  # calentamiento
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as ex:
+        latencias = np.array(list(ex.map(una, range(peticiones))))
+    total = time.perf_counter() - t0
+
+    with urllib.request.urlopen(url + "/salud") as r:
+        salud = json.loads(r.read())
+
+    print("\n=== SERVICIO DE CLASIFICACIÓN ===")
+    print(f"Peticiones: {peticiones} | concurrencia: {concurrencia} | imágenes distintas: {len(rutas)}")
+    print(f"Latencia p50 : {np.percentile(latencias, 50) * 1000:8.1f} ms")
+    print(f"Latencia p99 : {np.percentile(latencias, 99) * 1000:8.1f} ms")
+    print(f"Throughput   : {peticiones / total:8.1f} peticiones/s")
+    print(f"Lote medio en el servidor: {salud.get('lote_medio')}")
+
+# =============================================================================
+# BENCHMARK: DOBLE DECODIFICACIÓN VS DECODIFICACIÓN ÚNICA
+# =============================================================================
+
+def _decodificar_doble(ruta, tiempos):
+    """Camino anterior: image.load_img para la red + cv2.imread a resolución completa."""
+    import cv2
+    from PIL import Image
+
+    t0 = time.perf_counter()
+    # Equivalente a image.load_img(ruta, target_size=(224, 224)) sin necesitar TensorFlow
+    img = Image.open(ruta).convert("RGB")
+    if img.size != (224, 224):
+        img = img.resize((224, 224), Image.NEAREST)
+    x = np.asarray(img, dtype=np.float32)
+    t1 = time.perf_counter()
+    bgr = cv2.imread(ruta)
+    color = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB).mean(axis=(0, 1))
+    t2 = time.perf_counter()
+    tiempos.sumar(entrada_cnn=t1 - t0, color_cv2=t2 - t1)
+    return x, color
+
+def bench_decodificacion(carpeta, limite=300, workers=None):
+    """Tiempos por etapa (un hilo) y throughput con el pool de hilos de cada camino."""
+    from concurrent.futures import ThreadPoolExecutor
+    from extraccion_lotes import decodificar, Tiempos
+
+    rutas = [r for r, _ in listar_dataset(carpeta, limite)] if any(
+        os.path.isdir(os.path.join(carpeta, d)) for d in os.listdir(carpeta)) else []
+    if not rutas:
+        from extraccion_lotes import listar_imagenes
+        rutas = sorted(listar_imagenes(carpeta))[:limite]
+    if not rutas:
+        print(f"❌ No hay imágenes en {carpeta}")
+        return
+
+    caminos = {
+        "doble (load_img + cv2)": lambda r, t: _decodificar_doble(r, t),
+        "única, completa": lambda r, t: decodificar(r, reducir=False, tiempos=t),
+        "única, draft DCT": lambda r, t: decodificar(r, reducir=True, tiempos=t),
+    }
+
+    print("\n=== DECODIFICACIÓN ===")
+    print(f"Imágenes: {len(rutas)} | carpeta: {carpeta}")
+    referencia = None
+    for nombre, funcion in caminos.items():
+        tiempos = Tiempos()
+        tiempos.imagenes = len(rutas)
+        t0 = time.perf_counter()
+        salidas = [funcion(r, tiempos) for r in rutas]
+        t_serie = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as ex:
+            list(ex.map(lambda r: funcion(r, Tiempos()), rutas))
+        t_hilos = time.perf_counter() - t0
+
+        entradas = np.stack([x for x, _ in salidas])
+        colores = np.array([c for _, c in salidas])
+        if referencia is None:
+            referencia = entradas, colores
+        dif_entrada = np.abs(entradas - referencia[0]).mean()
+        dif_color = np.abs(colores - referencia[1]).max()
+        print(f"\n{nombre}")
+        print(f"  un hilo : {t_serie * 1000 / len(rutas):7.2f} ms/img → {tiempos.resumen()}")
+        print(f"  pool    : {len(rutas) / t_hilos:7.1f} img/s")
+        print(f"  frente a load_img + cv2: entrada CNN {dif_entrada:.2f} de media por píxel, "
+              f"color medio {dif_color:.2f} como máximo")
+
+# =============================================================================
+# BENCHMARK: MEMORIA PICO DE LA EXTRACCIÓN DE clasificación_grupos_similitud
+# =============================================================================
+
+def carpeta_sintetica(directorio, n, tam=(320, 240), semilla=0):
+    """Crea (o completa) una carpeta con n JPEG sintéticos; reutiliza los existentes."""
+    from PIL import Image
+
+    os.makedirs(directorio, exist_ok=True)
+    rng = np.random.default_rng(semilla)
+    base = rng.integers(0, 256, (tam[1], tam[0], 3), dtype=np.uint8)
+    for i in range(n):
+        ruta = os.path.join(directorio, f"sint_{i:07d}.jpg")
+        if not os.path.exists(ruta):
+            img = np.roll(base, i * 7, axis=1) // 2 + rng.integers(0, 128, 3, dtype=np.uint8)
+            Image.fromarray(img).save(ruta, quality=85)
+    return directorio
+
+def bench_grupos(tamanos=(2000, 8000), lotes=(16, 64), directorio="bench_grupos",
+                 limite_antiguo=2000, vgg16=False):
+    """
+    Memoria pico (tracemalloc) de extraer características en streaming frente a
+    cargar todas las imágenes en un único array, para varios tamaños de carpeta.
+    """
+    import tracemalloc
+    from backends import BackendSintetico
+    grupos = __import__("clasificación_grupos_similitud")
+
+    modelo = None if vgg16 else BackendSintetico("vgg16")
+    print("\n=== EXTRACCIÓN EN GRUPOS: MEMORIA PICO ===")
+    print(f"Modelo: {'VGG16' if vgg16 else 'sintético (512 dims)'}")
+    for n in tamanos:
+        carpeta = os.path.join(directorio, str(n))
+        carpeta_sintetica(carpeta, n)
+
+        if n <= limite_antiguo and not vgg16:
+            tracemalloc.start()
+            _, imagenes = grupos.load_images_from_directory(carpeta)
+            modelo(imagenes)
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            del imagenes
+            print(f"{n:>8} imágenes | array completo   | pico {pico / 1e6:9.1f} MB")
+
+        for batch_size in lotes:
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            _, feats = grupos.extract_features_from_directory(carpeta, use_cache=False,
+                                                              batch_size=batch_size, model=modelo)
+            t = time.perf_counter() - t0
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{n:>8} imágenes | streaming lote {batch_size:<3} | pico {pico / 1e6:9.1f} MB "
+                  f"(features {feats.nbytes / 1e6:.1f} MB) | {n / t:7.1f} img/s")
+
+# =============================================================================
+# BENCHMARK: CLUSTERING EN MEMORIA VS INCREMENTAL
+# =============================================================================
+
+def features_en_disco(ruta, n, dims, n_grupos, tam_bloque=50_000, semilla=0):
+    """Escribe por bloques un .npy de n vectores agrupados; devuelve (memmap, grupo real)."""
+    from clustering_escalable import guardar_bloques_npy
+
+    rng = np.random.default_rng(semilla)
+    centros = rng.standard_normal((n_grupos, dims)).astype(np.float32)
+    grupo = rng.integers(0, n_grupos, n)
+
+    def generar():
+        for i in range(0, n, tam_bloque):
+            g = grupo[i:i + tam_bloque]
+            yield centros[g] + rng.standard_normal((len(g), dims)).astype(np.float32) * 0.6
+
+    return guardar_bloques_npy(generar(), ruta), grupo
+
+def bench_clustering(tamanos=(10_000, 100_000, 1_000_000), dims=512, n_grupos=100,
+                     limite_memoria=100_000, directorio="bench_clustering"):
+    """
+    Tiempo de ajuste, memoria pico (tracemalloc) y calidad de PCA + KMeans(n_init=10)
+    frente a IncrementalPCA + MiniBatchKMeans sobre un memmap, y del reajuste en caliente.
+    """
+    import tracemalloc
+    from sklearn.metrics import adjusted_rand_score
+    from clustering_escalable import (ClusteringIncremental, metricas_calidad,
+                                      mostrar_metricas)
+
+    os.makedirs(directorio, exist_ok=True)
+    print("\n=== CLUSTERING ===")
+    print(f"{dims} dims, {n_grupos} grupos reales y pedidos")
+
+    def medir(nombre, funcion):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        etiquetas = funcion()
+        t = time.perf_counter() - t0
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {nombre:<22} {t:8.1f} s | pico {pico / 1e6:8.1f} MB | "
+              f"ARI {adjusted_rand_score(real, etiquetas):.3f}")
+        print(f"  {'':<22} {mostrar_metricas(metricas_calidad(features, etiquetas))}")
+
+    for n in tamanos:
+        features, real = features_en_disco(os.path.join(directorio, f"features_{n}.npy"),
+                                           n, dims, n_grupos)
+        print(f"\n{n} imágenes ({features.nbytes / 1e6:.0f} MB en disco)")
+        grupos = __import__("clasificación_grupos_similitud")
+
+        if n <= limite_memoria:
+            medir("PCA + KMeans(n_init=10)",
+                  lambda: grupos.cluster_images(np.asarray(features), n_grupos, method="kmeans"))
+        else:
+            print(f"  PCA + KMeans(n_init=10) omitido (> {limite_memoria} imágenes)")
+
+        modelo = ClusteringIncremental(n_grupos)
+        medir("incremental", lambda: modelo.ajustar(features).predecir(features))
+        previo = modelo
+        medir("incremental en caliente",
+              lambda: ClusteringIncremental(n_grupos).ajustar(features, previo).predecir(features))
+
+# =============================================================================
+# BENCHMARK: PIPELINE COMPLETO CON DATOS Y MODELO SINTÉTICOS
+# =============================================================================
+
+MARCAS = ("nike", "adidas", "puma", "vans", "reebok", "asics", "converse", "fila")
+COLORES = ("white", "black", "cream", "red", "blue", "grey")
+
+def dataset_sintetico(directorio, clases=10, por_clase=20,
+                      resoluciones=((640, 480), (1280, 960), (3024, 4032)), png=0.2, semilla=0):
+    """
+    Crea (o completa) un dataset con una carpeta por clase al estilo de
+    tenis_dataset ("03 puma_m03_cream"). Cada clase parte de un patrón suave
+    propio y cada foto lo varía (brillo, desplazamiento, manchas, ruido), con
+    resoluciones y formato (JPEG / PNG en proporción 'png') al azar.
+    Devuelve [(ruta, clase)].
+    """
+    from PIL import Image
+
+    pares = []
+    for c in range(clases):
+        nombre = f"{c + 1:02d} {MARCAS[c % len(MARCAS)]}_m{c + 1:02d}_{COLORES[c % len(COLORES)]}"
+        carpeta = os.path.join(directorio, nombre)
+        os.makedirs(carpeta, exist_ok=True)
+        patron = np.random.default_rng((semilla, c)).integers(0, 256, (6, 6, 3), dtype=np.uint8)
+        for i in range(por_clase):
+            # Generador propio por foto: completar un dataset existente da las mismas fotos
+            rng = np.random.default_rng((semilla, c, i))
+            ancho, alto = resoluciones[rng.integers(len(resoluciones))]
+            extension = "png" if rng.random() < png else "jpg"
+            brillo, desplazamiento = rng.integers(-25, 26), rng.integers(0, ancho // 10 + 1)
+            ruta = os.path.join(carpeta, f"foto_{i:05d}.{extension}")
+            pares.append((ruta, nombre))
+            if os.path.exists(ruta):
+                continue
+            img = np.asarray(Image.fromarray(patron).resize((ancho, alto), Image.BICUBIC), dtype=np.int16)
+            img = np.roll(img, desplazamiento, axis=1) + brillo
+            for _ in range(3):  # manchas propias de cada foto: no son casi-duplicados
+                x0, y0 = rng.integers(0, ancho * 3 // 4), rng.integers(0, alto * 3 // 4)
+                img[y0:y0 + alto // 4, x0:x0 + ancho // 4] = rng.integers(0, 256, 3)
+            img += rng.integers(-12, 13, (alto // 8 + 1, ancho // 8 + 1, 1), dtype=np.int16).repeat(
+                8, 0).repeat(8, 1)[:alto, :ancho]
+            Image.fromarray(np.clip(img, 0, 255).astype(np.uint8)).save(
+                ruta, **({"quality": 90} if extension == "jpg" else {}))
+    return pares
+
+class Etapas:
+    """Tabla de etapas: segundos, imágenes/s y memoria pico (tracemalloc) de cada una."""
+
+    def __init__(self):
+        self.filas = []
+
+    def medir(self, nombre, n, funcion):
+        import tracemalloc
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        resultado = funcion()
+        t = time.perf_counter() - t0
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.filas.append((nombre, n, t, pico))
+        return resultado
+
+    def desglose(self, nombre, tiempos):
+        """Añade las etapas de un Tiempos (lectura, decodificación, preproceso, inferencia...)."""
+        for etapa, segundos in tiempos.segundos.items():
+            self.filas.append((f"  {nombre}: {etapa}", tiempos.imagenes, segundos, None))
+
+    def mostrar(self):
+        print(f"\n{'etapa':<44} {'s':>8} {'img/s':>10} {'pico MB':>9}")
+        for nombre, n, t, pico in self.filas:
+            velocidad = f"{n / t:10.1f}" if t > 0 and n else f"{'-':>10}"
+            memoria = f"{pico / 1e6:9.1f}" if pico is not None else f"{'':>9}"
+            print(f"{nombre:<44} {t:8.2f} {velocidad} {memoria}")
+
+def bench_pipeline(directorio="bench_pipeline", clases=10, por_clase=20, resoluciones=None,
+                   png=0.2, backend="sintetico", batch_size=32):
+    """
+    Mide por etapas generar_vectores, clasificar_carpeta, clasificación_grupos_similitud
+    y galería sobre un dataset sintético, sin conexión. Con backend="sintetico" la
+    inferencia es una proyección aleatoria (mide todo salvo la CNN); con "keras",
+    "tflite-int8", etc. se usa el modelo real si está disponible localmente.
+    """
+    import shutil
+    import resource
+    import pandas as pd
+
+    os.environ["BACKEND_INFERENCIA"] = backend
+    import backends
+    backends.BACKEND = backend
+    import generar_vectores as gv
+    import clasificar_carpeta as cc
+    import galería
+    from extraccion_lotes import Tiempos
+    from miniaturas import CacheMiniaturas
+    from proyeccion_2d import proyectar_2d
+    grupos = __import__("clasificación_grupos_similitud")
+
+    dataset = os.path.join(directorio, "dataset")
+    t0 = time.perf_counter()
+    pares = dataset_sintetico(dataset, clases, por_clase,
+                              resoluciones or ((640, 480), (1280, 960), (3024, 4032)), png)
+    rutas = [r for r, _ in pares]
+    n = len(rutas)
+    print(f"\n=== PIPELINE COMPLETO ({backend}) ===")
+    print(f"Dataset sintético: {n} imágenes, {clases} clases, "
+          f"{sum(r.endswith('.png') for r in rutas)} PNG ({time.perf_counter() - t0:.1f} s)")
+
+    # Salidas en el directorio del benchmark; nada de cachés compartidas
+    almacen_dir = os.path.join(directorio, "almacen")
+    cache_miniaturas = os.path.join(directorio, "miniaturas_cache")
+    salida_html = os.path.join(directorio, "galeria.html")
+    for ruta in (almacen_dir, cache_miniaturas):
+        shutil.rmtree(ruta, ignore_errors=True)
+    etapas = Etapas()
+
+    # generar_vectores
+    tiempos = Tiempos()
+    etapas.medir("generar_vectores (total)", n, lambda: gv.generar_vectores(
+        dataset, batch_size, usar_cache=False, almacen_dir=almacen_dir, tiempos=tiempos))
+    etapas.desglose("generar_vectores", tiempos)
+
+    # clasificar_carpeta: carga del almacén, extracción y similitud sobre todo el dataset
+    mejores = etapas.medir("clasificar: carga del clasificador", 0,
+                           lambda: cc.cargar_clasificador(almacen_dir, usar_ann=False))
+    tiempos, similitud = Tiempos(), [0.0]
+
+    def mejores_medido(feats, cols, alpha=0.8, k=1):
+        t = time.perf_counter()
+        top = mejores(feats, cols, alpha, k)
+        similitud[0] += time.perf_counter() - t
+        return top
+
+    clasificadas = etapas.medir("clasificar_carpeta (total)", n, lambda: list(
+        cc.clasificar_rutas(rutas, mejores_medido, batch_size=batch_size, tiempos=tiempos)))
+    tiempos.sumar(similitud=similitud[0])
+    etapas.desglose("clasificar", tiempos)
+    clase_de = dict(pares)
+    aciertos = sum(top is not None and top[0][0] == clase_de[r] for r, top, _ in clasificadas)
+
+    # clasificación_grupos_similitud: extracción VGG16, clustering y proyección 2-D
+    _, features = etapas.medir("grupos: extracción", n, lambda: grupos.extract_features_from_directory(
+        dataset, use_cache=False, batch_size=batch_size, paths=rutas))
+    etiquetas = etapas.medir("grupos: clustering", n,
+                             lambda: grupos.cluster_images(features, clases, method="kmeans"))
+    etapas.medir("grupos: proyección 2-D", n,
+                 lambda: proyectar_2d(features, etiquetas, dir_cache=None))
+
+    # galería: miniaturas en frío, en caché y escritura del HTML
+    df = pd.DataFrame({"archivo": [os.path.relpath(r, dataset) for r in rutas],
+                       "grupo_similitud": etiquetas})
+    etapas.medir("galería: miniaturas (en frío)", n,
+                 lambda: CacheMiniaturas(cache_miniaturas).preparar(rutas, 120))
+    etapas.medir("galería: HTML (miniaturas en caché)", n, lambda: galería.generate_html_gallery(
+        df, dataset, salida_html, thumbnails=CacheMiniaturas(cache_miniaturas)))
+
+    etapas.mostrar()
+    print(f"\nAcierto top-1 de clasificar_carpeta: {aciertos}/{n}")
+    print(f"Memoria residente máxima del proceso: "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    print("(pico MB = tracemalloc: memoria de Python y NumPy, no la de TensorFlow)")
+
+# =============================================================================
+# BENCHMARK: EXTRACCIÓN EN UN PROCESO VS FRAGMENTADA EN VARIOS
+# =============================================================================
+
+def bench_fragmentos(directorio="bench_pipeline", clases=10, por_clase=40, procesos=(1, 2, 4),
+                     backend="sintetico", batch_size=32):
+    """
+    Imágenes/s de extraer_rutas (generar_vectores) con un único proceso por
+    lotes frente al modo fragmentado con N procesos, sobre el dataset sintético.
+    Comprueba además que los vectores coinciden con los del proceso único.
+    """
+    os.environ["BACKEND_INFERENCIA"] = backend
+    import backends
+    backends.BACKEND = backend
+    import generar_vectores as gv
+
+    pares = dataset_sintetico(os.path.join(directorio, "dataset"), clases, por_clase)
+    rutas = [r for r, _ in pares]
+    nucleos = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"\n=== EXTRACCIÓN FRAGMENTADA ({backend}) ===")
+    print(f"{len(rutas)} imágenes, {nucleos} núcleos disponibles")
+
+    referencia = None
+    for n in procesos:
+        t0 = time.perf_counter()
+        feat_de, _ = gv.extraer_rutas(rutas, batch_size, usar_cache=False, procesos=n)
+        t = time.perf_counter() - t0
+        if referencia is None:
+            referencia = feat_de
+        dif = max(float(np.abs(feat_de[r] - referencia[r]).max()) for r in rutas)
+        print(f"  {n:>2} proceso(s) | {t:7.2f} s | {len(rutas) / t:8.1f} img/s | "
+              f"máx. diferencia {dif:.2e}")
+
+# =============================================================================
+# BENCHMARK: CLASIFICACIÓN JERÁRQUICA VS BÚSQUEDA PLANA
+# =============================================================================
+
+def catalogo_jerarquico(n_clases, por_familia=20, dims=512, n_consultas=256, separacion=0.4,
+                        ruido_clase=0.6, ruido_consulta=2.0, semilla=0):
+    """
+    Centroides sintéticos con estructura marca → clase y consultas ruidosas de
+    clases al azar. Devuelve (clases, centroides, colores, conteos, feats, cols, verdad).
+    """
+    rng = np.random.default_rng(semilla)
+    n_familias = max(1, n_clases // por_familia)
+    familia = np.arange(n_clases) % n_familias
+    centros = rng.standard_normal((n_familias, dims)).astype(np.float32) * separacion
+    colores_familia = rng.random((n_familias, 3), dtype=np.float32) * 255
+    centroides = centros[familia] + rng.standard_normal((n_clases, dims)).astype(np.float32) * ruido_clase
+    colores = np.clip(colores_familia[familia] + rng.normal(0, 25, (n_clases, 3)), 0, 255)
+    clases = [f"{f:03d} marca{f}_modelo{i}" for i, f in enumerate(familia)]
+    conteos = rng.integers(5, 60, n_clases)
+
+    verdad = rng.integers(0, n_clases, n_consultas)
+    feats = centroides[verdad] + rng.standard_normal((n_consultas, dims)).astype(np.float32) * ruido_consulta
+    cols = np.clip(colores[verdad] + rng.normal(0, 10, (n_consultas, 3)), 0, 255)
+    return clases, centroides, colores.astype(np.float32), conteos, feats, cols.astype(np.float32), verdad
+
+def bench_jerarquia(tamanos=(500, 2_000, 10_000), por_familia=20, dims=512, n_consultas=256,
+                    familias_top=(1, 2, 4), alpha=0.8, k=5, almacen_dir=None, nivel="marca"):
+    """
+    Top-1 / top-k y ms por consulta de la búsqueda plana (PuntuadorTenis) frente
+    al clasificador en dos etapas con distintas podas, según crece el número de clases.
+    Con un almacén real, las consultas son sus propias imágenes.
+    """
+    from puntuacion import PuntuadorTenis
+    from clasificacion_jerarquica import ClasificadorJerarquico
+    from almacen_features import cargar_almacen
+
+    def medir(puntuador, feats, cols):
+        puntuador.top_k(feats[:8], cols[:8], alpha, k)  # calentamiento
+        t0 = time.perf_counter()
+        top = puntuador.top_k(feats, cols, alpha, k)
+        return top, (time.perf_counter() - t0) / len(feats) * 1000
+
+    def aciertos(top, verdad):
+        top1 = np.mean([bool(t) and t[0][0] == v for t, v in zip(top, verdad)])
+        topk = np.mean([v in [c for c, _ in t] for t, v in zip(top, verdad)])
+        return top1, topk
+
+    almacen = cargar_almacen(almacen_dir) if almacen_dir else None
+    if almacen is not None and len(almacen) > 0:
+        rng = np.random.default_rng(1)
+        idx = np.sort(rng.choice(len(almacen), min(n_consultas, len(almacen)), replace=False))
+        casos = [(f"almacén {almacen_dir}", almacen.clases, almacen.centroides,
+                  almacen.centroides_colores, almacen.conteos,
+                  np.asarray(almacen.vectores[idx], dtype=np.float32),
+                  np.asarray(almacen.colores[idx], dtype=np.float32),
+                  np.asarray(almacen.clase_idx[idx]))]
+    else:
+        casos = [("sintético", *catalogo_jerarquico(n, por_familia, dims, n_consultas))
+                 for n in tamanos]
+
+    print("\n=== CLASIFICACIÓN JERÁRQUICA VS PLANA ===")
+    print(f"Consultas: {n_consultas} | top-{k} | alpha={alpha} | nivel={nivel}")
+    for origen, clases, centroides, colores, conteos, feats, cols, verdad in casos:
+        verdad = [clases[v] for v in verdad]
+        plano = PuntuadorTenis(clases, centroides, colores)
+        top_plano, ms_plano = medir(plano, feats, cols)
+        top1, topk = aciertos(top_plano, verdad)
+        print(f"\n{origen}: {len(clases)} clases")
+        print(f"  {'plana':<22} top-1 {top1:6.3f} | top-{k} {topk:6.3f} | {ms_plano:8.3f} ms/consulta")
+
+        for f in familias_top:
+            t0 = time.perf_counter()
+            jerarquico = ClasificadorJerarquico(clases, centroides, colores, conteos, nivel,
+                                                familias_top=f)
+            t_preparar = time.perf_counter() - t0
+            top, ms = medir(jerarquico, feats, cols)
+            top1, topk = aciertos(top, verdad)
+            igual = np.mean([bool(a) and bool(b) and a[0][0] == b[0][0]
+                             for a, b in zip(top, top_plano)])
+            print(f"  {f'jerárquica top {f} fam.':<22} top-1 {top1:6.3f} | top-{k} {topk:6.3f} | "
+                  f"{ms:8.3f} ms/consulta ({ms_plano / ms:4.1f}x) | igual a plana {igual:6.3f} "
+                  f"| preparación {t_preparar * 1000:.0f} ms")
+        print(f"  {jerarquico.resumen()}")
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline de imágenes")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("extraccion", help="Bucle por imagen vs extracción por lotes")
+    p.add_argument("--carpeta", default="tenis_dataset")
+    p.add_argument("--limite", type=int, default=256)
+    p.add_argument("--batch", type=int, default=32)
+    p.add_argument("--prefetch", type=int, default=2)
+    p.add_argument("--workers", type=int, default=None)
+
+    p = sub.add_parser("almacen", help="Carga pickled vs almacén mapeado en memoria")
+    p.add_argument("--imagenes", type=int, default=100_000)
+    p.add_argument("--clases", type=int, default=2_000)
+    p.add_argument("--dims", type=int, default=1280)
+
+    p = sub.add_parser("puntuacion", help="Bucle por clase vs puntuación vectorizada")
+    p.add_argument("--consultas", type=int, default=256)
+    p.add_argument("--clases", type=int, default=5_000)
+    p.add_argument("--dims", type=int, default=1280)
+    p.add_argument("--k", type=int, default=5)
+
+    p = sub.add_parser("ann", help="Recall@k y consultas/s del índice ANN")
+    p.add_argument("--vectores", type=int, default=100_000)
+    p.add_argument("--dims", type=int, default=256)
+    p.add_argument("--consultas", type=int, default=500)
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--almacen", default=None, help="Usa los vectores de un almacén real")
+
+    p = sub.add_parser("arranque", help="Tiempo de importación y de la primera clasificación")
+    p.add_argument("--imagen", default=None, help="Imagen para medir el arranque en frío")
+    p.add_argument("--comparar-con", dest="ref", default=None,
+                   help="Revisión de git con la que comparar (p. ej. HEAD~1)")
+
+    p = sub.add_parser("servicio", help="Latencia y throughput del servicio de clasificación")
+    p.add_argument("--carpeta", default="media")
+    p.add_argument("--url", default="http://127.0.0.1:8765")
+    p.add_argument("--concurrencia", type=int, default=16)
+    p.add_argument("--peticiones", type=int, default=500)
+    p.add_argument("--k", type=int, default=1)
+
+    p = sub.add_parser("decodificacion", help="Doble decodificación vs decodificación única")
+    p.add_argument("--carpeta", default="tenis_dataset")
+    p.add_argument("--limite", type=int, default=300)
+    p.add_argument("--workers", type=int, default=None)
+
+    p = sub.add_parser("grupos", help="Memoria pico de la extracción en streaming (grupos)")
+    p.add_argument("--imagenes", type=int, nargs="+", default=[2000, 8000])
+    p.add_argument("--batch", type=int, nargs="+", default=[16, 64])
+    p.add_argument("--directorio", default="bench_grupos")
+    p.add_argument("--limite-antiguo", type=int, default=2000,
+                   help="Tamaño máximo para medir la carga completa en memoria")
+    p.add_argument("--vgg16", action="store_true", help="Usa VGG16 real en vez del modelo sintético")
+
+    p = sub.add_parser("clustering", help="PCA + KMeans en memoria vs clustering incremental")
+    p.add_argument("--imagenes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p.add_argument("--dims", type=int, default=512)
+    p.add_argument("--grupos", type=int, default=100)
+    p.add_argument("--limite-memoria", type=int, default=100_000,
+                   help="Tamaño máximo para el camino PCA + KMeans en memoria")
+    p.add_argument("--directorio", default="bench_clustering")
+
+    p = sub.add_parser("pipeline", help="Etapas de todo el pipeline con un dataset sintético")
+    p.add_argument("--directorio", default="bench_pipeline")
+    p.add_argument("--clases", type=int, default=10)
+    p.add_argument("--por-clase", type=int, default=20)
+    p.add_argument("--resoluciones", nargs="+", default=["640x480", "1280x960", "3024x4032"],
+                   help="Resoluciones ANCHOxALTO entre las que se elige al azar")
+    p.add_argument("--png", type=float, default=0.2, help="Proporción de imágenes PNG")
+    p.add_argument("--backend", default="sintetico",
+                   help="sintetico (sin pesos) o un backend real: keras, tflite-int8, onnx...")
+    p.add_argument("--batch", type=int, default=32)
+
+    p = sub.add_parser("fragmentos", help="Extracción en un proceso vs fragmentada en N procesos")
+    p.add_argument("--directorio", default="bench_pipeline")
+    p.add_argument("--clases", type=int, default=10)
+    p.add_argument("--por-clase", type=int, default=40)
+    p.add_argument("--procesos", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--backend", default="sintetico")
+    p.add_argument("--batch", type=int, default=32)
+
+    p = sub.add_parser("jerarquia", help="Clasificación en dos etapas (familia → clase) vs plana")
+    p.add_argument("--clases", type=int, nargs="+", default=[500, 2_000, 10_000])
+    p.add_argument("--por-familia", type=int, default=20)
+    p.add_argument("--dims", type=int, default=512)
+    p.add_argument("--consultas", type=int, default=256)
+    p.add_argument("--familias", type=int, nargs="+", default=[1, 2, 4],
+                   help="Familias que pasan a la segunda etapa")
+    p.add_argument("--k", type=int, default=5)
+    p.add_argument("--nivel", default="marca", choices=["marca", "modelo"])
+    p.add_argument("--almacen", default=None, help="Usa las clases e imágenes de un almacén real")
+
+    args = parser.parse_args()
+
+    if args.comando == "extraccion":
+        bench_extraccion(args.carpeta, args.limite, args.batch, args.prefetch, args.workers)
+    elif args.comando == "almacen":
+        bench_almacen(args.imagenes, args.clases, args.dims)
+    elif args.comando == "puntuacion":
+        bench_puntuacion(args.consultas, args.clases, args.dims, k=args.k)
+    elif args.comando == "ann":
+        bench_ann(args.vectores, args.dims, args.consultas, args.k, args.almacen)
+    elif args.comando == "arranque":
+        bench_arranque(args.imagen, args.ref)
+    elif args.comando == "servicio":
+        bench_servicio(args.carpeta, args.url, args.concurrencia, args.peticiones, args.k)
+    elif args.comando == "decodificacion":
+        bench_decodificacion(args.carpeta, args.limite, args.workers)
+    elif args.comando == "grupos":
+        bench_grupos(args.imagenes, args.batch, args.directorio, args.limite_antiguo, args.vgg16)
+    elif args.comando == "clustering":
+        bench_clustering(args.imagenes, args.dims, args.grupos, args.limite_memoria, args.directorio)
+    elif args.comando == "pipeline":
+        resoluciones = [tuple(int(v) for v in r.split("x")) for r in args.resoluciones]
+        bench_pipeline(args.directorio, args.clases, args.por_clase, resoluciones, args.png,
+                       args.backend, args.batch)
+    elif args.comando == "fragmentos":
+        bench_fragmentos(args.directorio, args.clases, args.por_clase, args.procesos,
+                         args.backend, args.batch)
+    elif args.comando == "jerarquia":
+        bench_jerarquia(args.clases, args.por_familia, args.dims, args.consultas, args.familias,
+                        k=args.k, almacen_dir=args.almacen, nivel=args.nivel)
@@ -0,0 +1,311 @@
+# =============================================================================
+# CACHÉ PERSISTENTE DE EMBEDDINGS (SQLite, direccionada por contenido)
+# =============================================================================
+# La clave es (sha256 del archivo, modelo, versión de preprocesado), así que
+# renombrar o mover una foto no obliga a recalcularla y cambiar el modelo o el
+# preprocesado invalida solo lo que corresponde. Los hashes perceptuales de
+# duplicados.py (dHash/pHash) se guardan igual, por sha256 y método.
+#
+# Uso por línea de comandos:
+#   python cache_embeddings.py stats
+#   python cache_embeddings.py podar --dias 90
+#   python cache_embeddings.py podar --huerfanos tenis_dataset media
+#   python cache_embeddings.py podar --modelo VGG16-imagenet-gap
+
+import os
+import time
+import sqlite3
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+DB_CACHE = os.environ.get("CACHE_EMBEDDINGS", "cache_embeddings.sqlite")
+VERSION_PREPROCESO = "load_img-224-nearest-v1"
+TAM_VENTANA = 1024  # rutas que se consultan juntas en la caché
+
+# Claves compartidas por los tres scripts (deben coincidir para reutilizar vectores)
+MODELO_MOBILENET = "MobileNetV2-imagenet-avg"
+MODELO_MOBILENET_COLOR = "MobileNetV2-imagenet-avg+color-rgb"  # [features | color medio]
+MODELO_VGG16 = "VGG16-imagenet-gap"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    hash    TEXT NOT NULL,
+    modelo  TEXT NOT NULL,
+    version TEXT NOT NULL,
+    dim     INTEGER NOT NULL,
+    vector  BLOB NOT NULL,
+    creado  REAL NOT NULL,
+    usado   REAL NOT NULL,
+    PRIMARY KEY (hash, modelo, version)
+);
+CREATE TABLE IF NOT EXISTS archivos (
+    ruta     TEXT PRIMARY KEY,
+    tamano   INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS perceptuales (
+    hash    TEXT NOT NULL,
+    metodo  TEXT NOT NULL,
+    valor   TEXT NOT NULL,
+    PRIMARY KEY (hash, metodo)
+);
+"""
+
+# =============================================================================
+# HASH DE CONTENIDO
+# =============================================================================
+
+def hash_archivo(ruta, tam_bloque=1 << 20):
+    """Calcula el sha256 del contenido de un archivo."""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(tam_bloque), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+# =============================================================================
+# CACHÉ
+# =============================================================================
+
+class CacheEmbeddings:
+    """Caché de vectores float32 compartida por todos los scripts de Imagen."""
+
+    def __init__(self, ruta_db=DB_CACHE):
+        self.ruta_db = ruta_db
+        self.con = sqlite3.connect(ruta_db)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.executescript(_ESQUEMA)
+        self.aciertos = 0
+        self.fallos = 0
+
+    def cerrar(self):
+        self.con.close()
+
+    # ---------------------------------------------------------------------
+    # Hashes (se reutilizan mientras tamaño y mtime no cambien)
+    # ---------------------------------------------------------------------
+
+    def hashes(self, rutas, workers=None):
+        """Devuelve {ruta: hash} y la lista de (ruta, error) de las ilegibles."""
+        resultado, errores, por_calcular = {}, [], []
+
+        for ruta in rutas:
+            try:
+                st = os.stat(ruta)
+            except OSError as e:
+                errores.append((ruta, e))
+                continue
+            fila = self.con.execute(
+                "SELECT hash FROM archivos WHERE ruta=? AND tamano=? AND mtime_ns=?",
+                (os.path.abspath(ruta), st.st_size, st.st_mtime_ns)).fetchone()
+            if fila:
+                resultado[ruta] = fila[0]
+            else:
+                por_calcular.append((ruta, st))
+
+        if por_calcular:
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as ex:
+                futuros = [(ruta, st, ex.submit(hash_archivo, ruta)) for ruta, st in por_calcular]
+                filas = []
+                for ruta, st, fut in futuros:
+                    try:
+                        resultado[ruta] = fut.result()
+                    except OSError as e:
+                        errores.append((ruta, e))
+                        continue
+                    filas.append((os.path.abspath(ruta), st.st_size, st.st_mtime_ns, resultado[ruta]))
+            with self.con:
+                self.con.executemany("INSERT OR REPLACE INTO archivos VALUES (?, ?, ?, ?)", filas)
+
+        return resultado, errores
+
+    # ---------------------------------------------------------------------
+    # Lectura y escritura de vectores
+    # ---------------------------------------------------------------------
+
+    def obtener(self, hashes, modelo, version=VERSION_PREPROCESO):
+        """Devuelve {hash: vector} con los vectores ya calculados."""
+        encontrados = {}
+        hashes = list(set(hashes))
+        for i in range(0, len(hashes), 500):
+            trozo = hashes[i:i + 500]
+            marcas = ",".join("?" * len(trozo))
+            for h, blob in self.con.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE modelo=? AND version=? "
+                    f"AND hash IN ({marcas})", (modelo, version, *trozo)):
+                encontrados[h] = np.frombuffer(blob, dtype=np.float32)
+        if encontrados:
+            ahora = time.time()
+            with self.con:
+                self.con.executemany(
+                    "UPDATE embeddings SET usado=? WHERE hash=? AND modelo=? AND version=?",
+                    [(ahora, h, modelo, version) for h in encontrados])
+        return encontrados
+
+    def guardar(self, pares, modelo, version=VERSION_PREPROCESO):
+        """Guarda [(hash, vector)] como blobs float32."""
+        ahora = time.time()
+        filas = []
+        for h, v in pares:
+            v = np.ascontiguousarray(v, dtype=np.float32)
+            filas.append((h, modelo, version, v.shape[0], v.tobytes(), ahora, ahora))
+        with self.con:
+            self.con.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?, ?)", filas)
+
+    # ---------------------------------------------------------------------
+    # Hashes perceptuales (enteros de 64 bits, guardados en hexadecimal)
+    # ---------------------------------------------------------------------
+
+    def obtener_perceptuales(self, hashes, metodo):
+        """Devuelve {hash: valor} con los hashes perceptuales ya calculados."""
+        encontrados = {}
+        hashes = list(set(hashes))
+        for i in range(0, len(hashes), 500):
+            trozo = hashes[i:i + 500]
+            marcas = ",".join("?" * len(trozo))
+            for h, valor in self.con.execute(
+                    f"SELECT hash, valor FROM perceptuales WHERE metodo=? AND hash IN ({marcas})",
+                    (metodo, *trozo)):
+                encontrados[h] = int(valor, 16)
+        return encontrados
+
+    def guardar_perceptuales(self, pares, metodo):
+        """Guarda [(hash, valor)] para 'metodo'."""
+        with self.con:
+            self.con.executemany("INSERT OR REPLACE INTO perceptuales VALUES (?, ?, ?)",
+                                 [(h, metodo, format(v, "x")) for h, v in pares])
+
+    # ---------------------------------------------------------------------
+    # Mantenimiento
+    # ---------------------------------------------------------------------
+
+    def estadisticas(self):
+        """Resumen por (modelo, versión): número de vectores, dimensión y bytes."""
+        filas = self.con.execute(
+            "SELECT modelo, version, COUNT(*), MAX(dim), SUM(LENGTH(vector)), "
+            "MIN(usado), MAX(usado) FROM embeddings GROUP BY modelo, version").fetchall()
+        n_archivos = self.con.execute("SELECT COUNT(*) FROM archivos").fetchone()[0]
+        tam_db = os.path.getsize(self.ruta_db) if os.path.exists(self.ruta_db) else 0
+        return {"grupos": filas, "archivos": n_archivos, "tam_db": tam_db}
+
+    def podar(self, dias=None, modelo=None, version=None, carpetas_vivas=None):
+        """
+        Elimina entradas según el criterio indicado:
+          - dias: no usadas en los últimos N días
+          - modelo / version: todas las de ese modelo o versión
+          - carpetas_vivas: cuyo hash no corresponde a ningún archivo actual
+        Devuelve el número de vectores eliminados.
+        """
+        borrados = 0
+        with self.con:
+            if dias is not None:
+                limite = time.time() - dias * 86400
+                borrados += self.con.execute(
+                    "DELETE FROM embeddings WHERE usado < ?", (limite,)).rowcount
+            if modelo is not None:
+                borrados += self.con.execute(
+                    "DELETE FROM embeddings WHERE modelo=?", (modelo,)).rowcount
+            if version is not None:
+                borrados += self.con.execute(
+                    "DELETE FROM embeddings WHERE version=?", (version,)).rowcount
+
+        if carpetas_vivas:
+            rutas = [os.path.join(raiz, f)
+                     for carpeta in carpetas_vivas
+                     for raiz, _, archivos in os.walk(carpeta) for f in archivos]
+            vivos, _ = self.hashes(rutas)
+            vivos = set(vivos.values())
+            with self.con:
+                self.con.execute("CREATE TEMP TABLE IF NOT EXISTS vivos (hash TEXT PRIMARY KEY)")
+                self.con.execute("DELETE FROM vivos")
+                self.con.executemany("INSERT OR IGNORE INTO vivos VALUES (?)", [(h,) for h in vivos])
+                borrados += self.con.execute(
+                    "DELETE FROM embeddings WHERE hash NOT IN (SELECT hash FROM vivos)").rowcount
+                self.con.execute("DELETE FROM archivos WHERE hash NOT IN (SELECT hash FROM vivos)")
+                self.con.execute("DELETE FROM perceptuales WHERE hash NOT IN (SELECT hash FROM vivos)")
+
+        self.con.execute("VACUUM")
+        return borrados
+
+# =============================================================================
+# EXTRACCIÓN CON CACHÉ
+# =============================================================================
+
+def extraer_con_cache(rutas, extraer, cache, modelo, version=VERSION_PREPROCESO,
+                      tam_ventana=TAM_VENTANA):
+    """
+    Envuelve un extractor por lotes (rutas → (rutas_ok, features, errores)).
+    Solo los archivos nuevos o modificados pasan por 'extraer'; el resto sale
+    de la caché. Acepta listas o generadores y devuelve lotes con el mismo
+    formato, primero los aciertos de cada ventana y luego los recalculados.
+    """
+    it = iter(rutas)
+    while True:
+        ventana = [r for _, r in zip(range(tam_ventana), it)]
+        if not ventana:
+            return
+
+        hashes, errores = cache.hashes(ventana)
+        encontrados = cache.obtener(hashes.values(), modelo, version)
+
+        aciertos = [r for r in ventana if r in hashes and hashes[r] in encontrados]
+        faltantes = [r for r in ventana if r in hashes and hashes[r] not in encontrados]
+        cache.aciertos += len(aciertos)
+        cache.fallos += len(faltantes)
+
+        if aciertos or errores:
+            feats = (np.stack([encontrados[hashes[r]] for r in aciertos]) if aciertos
+                     else np.empty((0, 0), dtype=np.float32))
+            yield aciertos, feats, errores
+
+        if faltantes:
+            for rutas_ok, feats, errores in extraer(faltantes):
+                cache.guardar(((hashes[r], f) for r, f in zip(rutas_ok, feats)), modelo, version)
+                yield rutas_ok, feats, errores
+
+def _mostrar_estadisticas(cache):
+    est = cache.estadisticas()
+    print(f"📦 Caché: {cache.ruta_db} ({est['tam_db'] / 1e6:.1f} MB, "
+          f"{est['archivos']} archivos con hash conocido)")
+    if not est["grupos"]:
+        print("   (vacía)")
+    for modelo, version, n, dim, nbytes, usado_min, usado_max in est["grupos"]:
+        dias = (time.time() - usado_min) / 86400
+        print(f" - {modelo} [{version}]: {n} vectores de {dim} dims, "
+              f"{nbytes / 1e6:.1f} MB, el menos usado hace {dias:.0f} días")
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento de la caché de embeddings")
+    parser.add_argument("--db", default=DB_CACHE)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("stats", help="Muestra el contenido de la caché")
+    p = sub.add_parser("podar", help="Elimina entradas viejas, huérfanas o de un modelo")
+    p.add_argument("--dias", type=float, help="Borra lo no usado en N días")
+    p.add_argument("--modelo", help="Borra todos los vectores de este modelo")
+    p.add_argument("--version", help="Borra todos los vectores de esta versión de preprocesado")
+    p.add_argument("--huerfanos", nargs="+", metavar="CARPETA",
+                   help="Borra vectores cuyos archivos ya no están en estas carpetas")
+    args = parser.parse_args()
+
+    cache = CacheEmbeddings(args.db)
+    if args.comando == "stats":
+        _mostrar_estadisticas(cache)
+    elif args.comando == "podar":
+        n = cache.podar(args.dias, args.modelo, args.version, args.huerfanos)
+        print(f"🧹 Eliminados {n} vectores.")
+        _mostrar_estadisticas(cache)
+    cache.cerrar()
@@ -0,0 +1,169 @@
+# =============================================================================
+# CLASIFICACIÓN JERÁRQUICA EN DOS ETAPAS (FAMILIA → CLASE)
+# =============================================================================
+# Los nombres de carpeta ya codifican una jerarquía:
+#   "01 nike_AF1_cream", "01 nike free metcon 6 beige cafe", "02 adidas_samba_..."
+# El prefijo numérico es la marca y la primera palabra tras la marca, el modelo.
+#
+#   1. Se puntúa la consulta contra los centroides de familia (media de todas
+#      las imágenes de sus clases, ponderada por el número de imágenes).
+#   2. Solo las clases de las mejores familias se puntúan con la fórmula
+#      completa forma + color (PuntuadorTenis.top_k_candidatos).
+#
+# Poda configurable:
+#   NIVEL         "marca" (01 nike) o "modelo" (01 nike af1)
+#   FAMILIAS_TOP  familias que pasan a la segunda etapa
+#   MARGEN        además, descarta las familias que quedan a más de MARGEN de la
+#                 mejor (None = se quedan todas las FAMILIAS_TOP)
+#
+# Uso:
+#   python clasificacion_jerarquica.py familias --nivel modelo
+#   python benchmarks.py jerarquia --clases 500 2000 10000
+
+import re
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from puntuacion import PuntuadorTenis, top_k_filas
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+NIVEL = "marca"     # "marca" o "modelo"
+FAMILIAS_TOP = 3
+MARGEN = None       # p. ej. 0.05 para quedarse solo con las familias casi empatadas
+
+# =============================================================================
+# FAMILIAS
+# =============================================================================
+
+def familia_de(clase, nivel=NIVEL):
+    """
+    Familia de una clase a partir del nombre de su carpeta:
+    "01 nike_AF1_cream" → "01 nike" (marca) o "01 nike af1" (modelo).
+    """
+    m = re.match(r"\s*(\d+)[\s_\-]*(.*)", clase)
+    prefijo, resto = (m.group(1), m.group(2)) if m else ("", clase)
+    palabras = [p for p in re.split(r"[\s_\-]+", resto.lower()) if p]
+    n = 1 if nivel == "marca" else 2
+    return " ".join(([prefijo] if prefijo else []) + palabras[:n]) or clase
+
+def agrupar_familias(clases, nivel=NIVEL):
+    """(familias, familia_idx): nombres de familia y la familia de cada clase."""
+    familias, familia_idx, posicion = [], [], {}
+    for clase in clases:
+        familia = familia_de(clase, nivel)
+        if familia not in posicion:
+            posicion[familia] = len(familias)
+            familias.append(familia)
+        familia_idx.append(posicion[familia])
+    return familias, np.array(familia_idx, dtype=np.int64)
+
+# =============================================================================
+# CLASIFICADOR
+# =============================================================================
+
+class ClasificadorJerarquico:
+    """
+    Puntuador en dos etapas con la misma interfaz que PuntuadorTenis.top_k:
+    top_k(feats, colores, alpha, k) → [[(clase, similitud), ...], ...].
+    """
+
+    def __init__(self, clases, centroides, centroides_colores, conteos=None, nivel=NIVEL,
+                 familias_top=FAMILIAS_TOP, margen=MARGEN):
+        self.hojas = PuntuadorTenis(clases, centroides, centroides_colores)
+        self.familias_top = familias_top
+        self.margen = margen
+
+        familias, familia_idx = agrupar_familias(clases, nivel)
+        # las clases descartadas por NaN no aportan al centroide ni son candidatas
+        validas = self.hojas.posicion >= 0
+        # los almacenes migrados (almacen_features.py migrar) no tienen conteos: peso 1 por clase
+        pesos = np.asarray(conteos if conteos is not None else np.ones(len(clases)), dtype=np.float64)
+        if pesos.sum() <= 0:
+            pesos = np.ones(len(clases))
+        pesos = np.where(validas, pesos, 0.0)
+
+        sumas = np.zeros((len(familias), np.shape(centroides)[1]), dtype=np.float64)
+        sumas_colores = np.zeros((len(familias), 3), dtype=np.float64)
+        np.add.at(sumas, familia_idx[validas],
+                  np.asarray(centroides, dtype=np.float64)[validas] * pesos[validas, None])
+        np.add.at(sumas_colores, familia_idx[validas],
+                  np.asarray(centroides_colores, dtype=np.float64)[validas] * pesos[validas, None])
+        total = np.bincount(familia_idx, weights=pesos, minlength=len(familias))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.familias = PuntuadorTenis(familias, sumas / total[:, None],
+                                           sumas_colores / total[:, None])
+
+        # miembros[f] = índices (del almacén) de las clases de la familia f, rellenado con -1;
+        # las familias con peso total 0 no tienen centroide y se omiten
+        interna = self.familias.posicion[familia_idx]
+        clase = np.flatnonzero(validas & (interna >= 0))
+        clase = clase[np.argsort(interna[clase], kind="stable")]
+        tam = np.bincount(interna[clase], minlength=len(self.familias))
+        inicio = np.cumsum(tam) - tam
+        columna = np.arange(len(clase)) - np.repeat(inicio, tam)
+        self.miembros = np.full((len(self.familias), max(tam.max(initial=0), 1)), -1, dtype=np.int64)
+        self.miembros[interna[clase], columna] = clase
+
+    @classmethod
+    def desde_almacen(cls, almacen, **opciones):
+        return cls(almacen.clases, almacen.centroides, almacen.centroides_colores,
+                   almacen.conteos, **opciones)
+
+    def __len__(self):
+        return len(self.hojas)
+
+    def resumen(self):
+        tam = (self.miembros >= 0).sum(axis=1)
+        return (f"{len(self.familias)} familias para {len(self.hojas)} clases "
+                f"(media {tam.mean():.1f}, máx. {tam.max()} clases por familia)")
+
+    def candidatos(self, feats, colores, alpha=0.8):
+        """Matriz consultas × m con las clases de las familias elegidas (-1 = hueco)."""
+        puntuaciones = np.nan_to_num(self.familias.puntuar(feats, colores, alpha), nan=-np.inf)
+        idx = top_k_filas(puntuaciones, self.familias_top)
+        candidatos = self.miembros[idx]                       # consultas × familias × miembros
+        if self.margen is not None:
+            elegidas = np.take_along_axis(puntuaciones, idx, axis=1)
+            lejos = elegidas < elegidas[:, :1] - self.margen
+            candidatos[lejos] = -1
+        candidatos = candidatos.reshape(len(candidatos), -1)
+
+        # huecos al final y fuera las columnas que son hueco en todas las consultas
+        candidatos = -np.sort(-candidatos, axis=1)
+        ancho = max(int((candidatos >= 0).sum(axis=1).max(initial=0)), 1)
+        return candidatos[:, :ancho]
+
+    def top_k(self, feats, colores, alpha=0.8, k=1):
+        feats = np.atleast_2d(np.asarray(feats, dtype=np.float32))
+        colores = np.atleast_2d(np.asarray(colores, dtype=np.float32))
+        return self.hojas.top_k_candidatos(feats, colores, self.candidatos(feats, colores, alpha),
+                                           alpha, k)
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+if __name__ == "__main__":
+    from almacen_features import cargar_almacen, ALMACEN_DIR
+
+    parser = argparse.ArgumentParser(description="Familias de clases y clasificación en dos etapas")
+    parser.add_argument("--dir", default=ALMACEN_DIR)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("familias", help="Familias que salen de los nombres de clase")
+    p.add_argument("--nivel", default=NIVEL, choices=["marca", "modelo"])
+    args = parser.parse_args()
+
+    almacen = cargar_almacen(args.dir)
+    if almacen is None:
+        raise SystemExit(f"❌ No existe el almacén {args.dir}; ejecuta generar_vectores.py")
+
+    clasificador = ClasificadorJerarquico.desde_almacen(almacen, nivel=args.nivel)
+    print(f"🌳 {clasificador.resumen()}")
+    conteo = Counter(familia_de(c, args.nivel) for c in almacen.clases)
+    for familia, n in sorted(conteo.items()):
+        print(f"  {familia:<30} {n:5d} clases")
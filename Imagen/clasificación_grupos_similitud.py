@@ -5,24 +5,21 @@
 # Instalación de paquetes necesarios (ejecutar solo una vez)
 # !pip install tensorflow keras opencv-python pillow scikit-learn pandas numpy matplotlib seaborn
 
+# TensorFlow, sklearn y matplotlib se importan dentro de las funciones que los
+# usan: importar este módulo para leer resultados no debe cargar VGG16.
 import os
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from PIL import Image
-import cv2
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
-from sklearn.manifold import TSNE
-from tensorflow.keras.applications import VGG16
-from tensorflow.keras.applications.vgg16 import preprocess_input
-from tensorflow.keras.preprocessing import image
-from tensorflow.keras.models import Model
-import tensorflow as tf
 import warnings
 warnings.filterwarnings('ignore')
+from extraccion_lotes import extraer_features_lotes
+from cache_embeddings import CacheEmbeddings, extraer_con_cache, MODELO_VGG16
+from modelos import obtener_vgg16, preprocess_vgg16
+from backends import obtener_backend, clave_modelo, nombre_backend
+from clustering_escalable import guardar_bloques_npy, agrupar_incremental, UMBRAL_INCREMENTAL
+from proyeccion_2d import proyectar_2d
+from duplicados import colapsar_duplicados, listar_grupos
 
 # =============================================================================
 # CONFIGURACIÓN PRINCIPAL
@@ -31,35 +28,56 @@ warnings.filterwarnings('ignore')
 # CAMBIA ESTA RUTA por la ubicación de tus imágenes
 IMAGE_DIR = "ruta/a/tu/carpeta/con/imagenes"  
 IMG_SIZE = (224, 224)  # Tamaño requerido por VGG16
+USE_CACHE = True  # Reutiliza características ya calculadas (cache_embeddings.sqlite)
+VERSION_PREPROCESO = "PIL-resize-224-v1"  # cambiar si se modifica load_and_preprocess_image
+VALID_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
+FEATURES_FILE = "features_grupos.npy"  # características en disco (se abren con mmap)
+CLUSTER_MODEL = "grupos_modelo.npz"    # PCA + centroides del último clustering incremental
+CLUSTERING = "auto"  # "auto", "kmeans" (PCA + KMeans en memoria) o "incremental"
+WARM_START = True    # el modo incremental arranca desde CLUSTER_MODEL si existe
+PLOT_MAX_PER_CLUSTER = 200  # puntos por grupo en el gráfico 2-D (None = todos)
+PROJECTION = "auto"  # "auto", "opentsne", "umap" o "tsne" (ver proyeccion_2d.py)
+DEDUPLICATE = True   # los casi-duplicados se extraen una vez y heredan el grupo
 
 # =============================================================================
 # FUNCIONES DE PROCESAMIENTO
 # =============================================================================
 
+def read_image_array(img_path):
+    """Carga y preprocesa una imagen para VGG16 (lanza excepción si falla)"""
+    img = Image.open(img_path)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img = img.resize(IMG_SIZE)
+    img_array = np.array(img)
+    return preprocess_vgg16(img_array)
+
 def load_and_preprocess_image(img_path):
     """Carga y preprocesa una imagen para el modelo VGG16"""
     try:
-        img = Image.open(img_path)
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        img = img.resize(IMG_SIZE)
-        img_array = np.array(img)
-        img_array = preprocess_input(img_array)
-        return img_array
+        return read_image_array(img_path)
     except Exception as e:
         print(f"Error procesando {img_path}: {e}")
         return None
 
+def iter_image_paths(directory):
+    """Genera las rutas de imagen del directorio sin construir listas intermedias"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VALID_EXTENSIONS:
+                yield entry.path
+
 def load_images_from_directory(directory):
-    """Carga todas las imágenes del directorio especificado"""
+    """
+    Carga todas las imágenes del directorio especificado.
+    Ocupa ~600 KB por imagen: para carpetas grandes usa extract_features_from_directory.
+    """
     image_paths = []
     image_arrays = []
     
-    valid_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
-    
     print("Cargando imágenes...")
     for filename in os.listdir(directory):
-        if any(filename.lower().endswith(ext) for ext in valid_extensions):
+        if any(filename.lower().endswith(ext) for ext in VALID_EXTENSIONS):
             img_path = os.path.join(directory, filename)
             img_array = load_and_preprocess_image(img_path)
             if img_array is not None:
@@ -69,30 +87,90 @@ def load_images_from_directory(directory):
     print(f"✓ Se cargaron {len(image_paths)} imágenes exitosamente")
     return image_paths, np.array(image_arrays)
 
+def build_feature_extractor():
+    """VGG16 sin capas fully connected + Global Average Pooling (se carga una sola vez)"""
+    return obtener_vgg16()
+
 def extract_features(images):
     """Extrae características visuales usando VGG16 pre-entrenado"""
     print("Extrayendo características de las imágenes...")
     
-    # Cargar modelo VGG16 sin las capas fully connected
-    base_model = VGG16(weights='imagenet', include_top=False, 
-                       input_shape=(224, 224, 3))
-    
-    # Añadir Global Average Pooling para características compactas
-    x = base_model.output
-    x = tf.keras.layers.GlobalAveragePooling2D()(x)
-    feature_extractor = Model(inputs=base_model.input, outputs=x)
+    feature_extractor = build_feature_extractor()
     
     # Extraer características
     features = feature_extractor.predict(images, batch_size=32, verbose=1)
     print(f"✓ Características extraídas: {features.shape}")
     return features
 
-def cluster_images(features, n_clusters=50):
-    """Agrupa imágenes por similitud usando K-means"""
+def extract_features_from_directory(directory, use_cache=USE_CACHE, batch_size=32, model=None,
+                                    output_path=None, paths=None):
+    """
+    Extrae características en streaming: las rutas salen de un generador, cada
+    lote se decodifica, pasa por VGG16 y se descarta, y solo se conservan las
+    filas de 512 dimensiones. La memoria pico depende de batch_size, no del
+    número de imágenes. Con caché, solo las nuevas o modificadas pasan por VGG16.
+    Con output_path las filas se escriben a un .npy y se devuelve abierto con mmap.
+    'paths' limita la extracción a esas rutas (p. ej. sin duplicados).
+    Devuelve (nombres_de_archivo, matriz_de_características).
+    """
+    paths = iter_image_paths(directory) if paths is None else iter(paths)
+    print(f"Extrayendo características de las imágenes de {directory}...")
+    
+    def extract(batch_paths):
+        # el modelo solo se carga si alguna ruta no está en la caché
+        return extraer_features_lotes(batch_paths, model or obtener_backend("vgg16"), lambda x: x,
+                                      batch_size=batch_size, cargar=read_image_array)
+    
+    cache = CacheEmbeddings() if use_cache else None
+    if cache:
+        # la clave es la del modelo que se usa de verdad, no la del backend por defecto
+        key = clave_modelo(MODELO_VGG16, getattr(model, "nombre", nombre_backend()))
+        batches = extraer_con_cache(paths, extract, cache, key, VERSION_PREPROCESO)
+    else:
+        batches = extract(paths)
+    
+    image_paths = []
+    def feature_blocks():
+        for ok_paths, feats, errors in batches:
+            for path, e in errors:
+                print(f"Error procesando {path}: {e}")
+            if ok_paths:
+                image_paths.extend(os.path.basename(p) for p in ok_paths)
+                yield np.asarray(feats, dtype=np.float32)
+    
+    if output_path:
+        features = guardar_bloques_npy(feature_blocks(), output_path)
+    else:
+        blocks = list(feature_blocks())
+        features = np.concatenate(blocks) if blocks else np.empty((0, 512), dtype=np.float32)
+    
+    if cache:
+        print(f"✓ Caché: {cache.aciertos} reutilizadas, {cache.fallos} calculadas")
+        cache.cerrar()
+    
+    print(f"✓ Características extraídas: {features.shape}")
+    return image_paths, features
+
+def cluster_images(features, n_clusters=50, method=CLUSTERING, model_path=CLUSTER_MODEL,
+                   warm_start=WARM_START):
+    """
+    Agrupa imágenes por similitud usando K-means.
+    Con method="incremental" (o "auto" en catálogos grandes) usa IncrementalPCA +
+    MiniBatchKMeans por bloques, sin cargar las características en memoria.
+    """
+    if method == "incremental" or (method == "auto" and len(features) >= UMBRAL_INCREMENTAL):
+        print("Agrupando imágenes por similitud (modo incremental)...")
+        clusters = agrupar_incremental(features, n_clusters, model_path, warm_start)
+        print(f"✓ Imágenes agrupadas en {len(np.unique(clusters))} grupos")
+        return clusters
+    
+    from sklearn.cluster import KMeans
+    from sklearn.decomposition import PCA
+    
     print("Agrupando imágenes por similitud...")
     
     # Reducir dimensionalidad para mejor clustering
-    n_components = min(100, features.shape[1])
+    n_components = min(100, *features.shape)
     pca = PCA(n_components=n_components)
     features_reduced = pca.fit_transform(features)
     
@@ -103,24 +181,25 @@ def cluster_images(features, n_clusters=50):
     print(f"✓ Imágenes agrupadas en {len(np.unique(clusters))} grupos")
     return clusters
 
-def visualize_results(features, clusters, image_paths, results_df, directory):
+def visualize_results(features, clusters, image_paths, results_df, directory,
+                      max_per_cluster=PLOT_MAX_PER_CLUSTER, projection=PROJECTION):
     """Visualiza los resultados del clustering"""
+    import matplotlib.pyplot as plt
     
-    # Reducción para visualización 2D
+    # Reducción para visualización 2D: PCA + t-SNE acelerado / UMAP, con caché
     print("Generando visualizaciones...")
-    tsne = TSNE(n_components=2, random_state=42, perplexity=30)
-    features_2d = tsne.fit_transform(features)
+    indices, features_2d = proyectar_2d(features, clusters, max_per_cluster, projection)
     
     # 1. Gráfico de dispersión de clusters
     plt.figure(figsize=(15, 5))
     
     plt.subplot(1, 2, 1)
     scatter = plt.scatter(features_2d[:, 0], features_2d[:, 1], 
-                         c=clusters, cmap='tab20', alpha=0.7, s=10)
+                         c=np.asarray(clusters)[indices], cmap='tab20', alpha=0.7, s=10)
     plt.colorbar(scatter)
-    plt.title('Distribución de Clusters de Zapatos Deportivos\n(t-SNE)')
-    plt.xlabel('Componente t-SNE 1')
-    plt.ylabel('Componente t-SNE 2')
+    plt.title('Distribución de Clusters de Zapatos Deportivos\n(proyección 2-D)')
+    plt.xlabel('Componente 1')
+    plt.ylabel('Componente 2')
     
     # 2. Distribución de tamaños de clusters
     plt.subplot(1, 2, 2)
@@ -172,16 +251,24 @@ def visualize_results(features, clusters, image_paths, results_df, directory):
 def main():
     """Función principal que ejecuta todo el pipeline"""
     
-    # 1. Cargar imágenes
-    image_paths, image_arrays = load_images_from_directory(IMAGE_DIR)
+    # 1. Colapsar casi-duplicados: solo se extrae un representante por grupo
+    paths, duplicate_of = None, {}
+    if DEDUPLICATE:
+        cache = CacheEmbeddings() if USE_CACHE else None
+        paths, duplicate_of = colapsar_duplicados(sorted(iter_image_paths(IMAGE_DIR)), cache=cache)
+        if cache:
+            cache.cerrar()
+        for rep, dups in listar_grupos(duplicate_of).items():
+            print(f"   {os.path.basename(rep)} ≈ {', '.join(os.path.basename(d) for d in dups)}")
+    
+    # 2. Extraer características (por lotes, con caché)
+    image_paths, features = extract_features_from_directory(IMAGE_DIR, output_path=FEATURES_FILE,
+                                                            paths=paths)
     
     if len(image_paths) == 0:
         print("❌ No se encontraron imágenes en el directorio especificado")
         return None
     
-    # 2. Extraer características
-    features = extract_features(image_arrays)
-    
     # 3. Calcular número de clusters (aproximadamente 1 grupo cada 50-100 imágenes)
     n_clusters = max(10, min(100, len(image_paths) // 50))
     print(f"📊 Usando {n_clusters} clusters para {len(image_paths)} imágenes")
@@ -192,9 +279,18 @@ def main():
     # 5. Crear DataFrame con resultados
     results_df = pd.DataFrame({
         'archivo': image_paths,
-        'grupo_similitud': clusters
+        'grupo_similitud': clusters,
+        'duplicado_de': ''
     })
     
+    # Los duplicados heredan el grupo de su representante
+    if duplicate_of:
+        group_of = dict(zip(image_paths, clusters))
+        duplicates = [(os.path.basename(d), group_of[os.path.basename(r)], os.path.basename(r))
+                      for d, r in duplicate_of.items() if os.path.basename(r) in group_of]
+        results_df = pd.concat([results_df, pd.DataFrame(
+            duplicates, columns=['archivo', 'grupo_similitud', 'duplicado_de'])], ignore_index=True)
+    
     # Ordenar por grupo para mejor organización
     results_df = results_df.sort_values('grupo_similitud').reset_index(drop=True)
     
@@ -1,73 +1,143 @@
 import os
 import numpy as np
-import cv2
-from tensorflow.keras.preprocessing import image
-from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2, preprocess_input
-from sklearn.metrics.pairwise import cosine_similarity
 from collections import Counter
+from extraccion_lotes import (extraer_features_y_color, separar_color, decodificar,
+                              version_preprocesado, BATCH_SIZE, PREFETCH,
+                              DECODIFICACION_REDUCIDA)
+from cache_embeddings import CacheEmbeddings, extraer_con_cache, MODELO_MOBILENET_COLOR
+from modelos import preprocess_mobilenet
+from backends import obtener_backend, clave_modelo, nombre_backend
+from almacen_features import cargar_almacen, ALMACEN_DIR
+from puntuacion import PuntuadorTenis
+from indice_ann import cargar_indice, top_k_clases, UMBRAL_EXACTO
+from clasificacion_jerarquica import ClasificadorJerarquico
 
 # =====================================================
 # 1. CONFIGURACIÓN
 # =====================================================
-print("🧠 Cargando modelo MobileNetV2...")
-model = MobileNetV2(weights='imagenet', include_top=False, pooling='avg')
-print("✅ Modelo cargado correctamente.\n")
+# El modelo se carga la primera vez que una imagen necesita inferencia (backends.obtener_backend)
 
 # =====================================================
 # 2. FUNCIONES
 # =====================================================
-def extraer_features(img_path):
+def features_y_color(img_path, reducir=DECODIFICACION_REDUCIDA):
+    """
+    Vector de características y color medio RGB de una imagen, con la misma
+    decodificación (y el mismo 'reducir') que clasificar_rutas.
+    """
+    for _, matriz, errores in extraer_features_y_color([img_path], obtener_backend("mobilenet"),
+                                                       preprocess_mobilenet, 1, 0, workers=1,
+                                                       reducir=reducir):
+        if errores:
+            raise ValueError(f"No se pudo leer la imagen: {img_path}") from errores[0][1]
+        feats, cols = separar_color(matriz)
+        return feats[0], cols[0]
+
+def extraer_features(img_path, reducir=DECODIFICACION_REDUCIDA):
     """Extrae el vector de características de una imagen."""
-    img = image.load_img(img_path, target_size=(224, 224))
-    x = image.img_to_array(img)
-    x = np.expand_dims(x, axis=0)
-    x = preprocess_input(x)
-    feat = model.predict(x, verbose=0)
-    return feat[0]
-
-def promedio_color(img_path):
+    return features_y_color(img_path, reducir)[0]
+
+def promedio_color(img_path, reducir=DECODIFICACION_REDUCIDA):
     """Calcula el color promedio (RGB) de una imagen."""
-    img = cv2.imread(img_path)
-    if img is None:
-        raise ValueError(f"No se pudo leer la imagen: {img_path}")
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    mean_color = img.mean(axis=(0, 1))
-    return mean_color
-
-def clasificar_tenis(imagen_nueva, tenis_features, tenis_colors, alpha=0.8):
-    """Clasifica una sola imagen con los vectores promedio cargados."""
-    feat_new = extraer_features(imagen_nueva)
-    color_new = promedio_color(imagen_nueva)
+    try:
+        return decodificar(img_path, reducir=reducir)[1].astype(np.float32)
+    except Exception as e:
+        raise ValueError(f"No se pudo leer la imagen: {img_path}") from e
+
+def clasificar_tenis(imagen_nueva, tenis_features, tenis_colors=None, alpha=0.8,
+                     reducir=DECODIFICACION_REDUCIDA):
+    """
+    Clasifica una sola imagen. 'tenis_features' puede ser un PuntuadorTenis
+    ya preparado o los diccionarios de vectores promedio.
+    """
+    feat_new, color_new = features_y_color(imagen_nueva, reducir)
+    puntuador = tenis_features
+    if not isinstance(puntuador, PuntuadorTenis):
+        puntuador = PuntuadorTenis.desde_diccionarios(tenis_features, tenis_colors)
+    mejores = puntuador.top_k(feat_new, color_new, alpha, k=1)[0]
+    if not mejores:
+        raise ValueError(f"Vector de características inválido (NaN): {imagen_nueva}")
+    return mejores[0]  # (nombre, similitud)
 
-    resultados = []
-    for nombre, feat_avg in tenis_features.items():
-        color_avg = tenis_colors[nombre]
-        if np.isnan(feat_avg).any() or np.isnan(feat_new).any():
+# =====================================================
+# 3. CLASIFICACIÓN POR LOTES (reutilizable)
+# =====================================================
+def cargar_clasificador(almacen_dir=ALMACEN_DIR, usar_ann=True, jerarquico=False):
+    """
+    Prepara la función de puntuación (feats, colores, alpha, k) → top-k por consulta.
+    Con jerarquico=True puntúa primero las familias (marca) y luego solo sus clases.
+    Devuelve None si todavía no existe el almacén de características.
+    """
+    almacen = cargar_almacen(almacen_dir)
+    if almacen is None:
+        print(f"❌ No se encontró el almacén de características '{almacen_dir}'.")
+        print("   Ejecute primero el script de entrenamiento (generar_vectores.py)")
+        print("   o convierta los .npy antiguos con: python almacen_features.py migrar")
+        return None
+
+    if jerarquico:
+        clasificador = ClasificadorJerarquico.desde_almacen(almacen)
+        print(f"🌳 Clasificación en dos etapas: {clasificador.resumen()}")
+        return clasificador.top_k
+
+    puntuador = PuntuadorTenis.desde_almacen(almacen)
+
+    # Con muchas clases, el índice ANN (python indice_ann.py construir) preselecciona candidatos
+    indice = cargar_indice(almacen, "centroides") if usar_ann else None
+    if usar_ann and indice is None and len(almacen.clases) >= UMBRAL_EXACTO:
+        print(f"ℹ️ No hay índice ANN para {len(almacen.clases)} clases; se puntúan todas "
+              f"(constrúyelo con: python indice_ann.py construir)")
+    if indice is not None and indice.metodo != "exacto":
+        print(f"⚡ Usando índice ANN ({indice.metodo}) sobre {indice.n} clases")
+
+        def mejores_clases(feats, cols, alpha=0.8, k=1):
+            return top_k_clases(indice, puntuador, feats, cols, alpha, k)
+        return mejores_clases
+
+    return puntuador.top_k
+
+def clasificar_rutas(rutas, mejores_clases, alpha=0.8, k=1, cache=None,
+                     batch_size=BATCH_SIZE, prefetch=PREFETCH, reducir=DECODIFICACION_REDUCIDA,
+                     tiempos=None):
+    """
+    Clasifica una lista de rutas por lotes, decodificando cada archivo una vez.
+    Genera (ruta, top_k, error): top_k es [(clase, similitud), ...] o None si hubo error.
+    """
+    def extraer(rs):
+        return extraer_features_y_color(rs, obtener_backend("mobilenet"), preprocess_mobilenet,
+                                        batch_size, prefetch, reducir=reducir, tiempos=tiempos)
+
+    if cache:
+        lotes = extraer_con_cache(rutas, extraer, cache,
+                                  clave_modelo(MODELO_MOBILENET_COLOR, nombre_backend()),
+                                  version_preprocesado(reducir))
+    else:
+        lotes = extraer(rutas)
+
+    for rutas_ok, matriz, errores in lotes:
+        for path, e in errores:
+            yield path, None, e
+        if not rutas_ok:
             continue
-        feat_avg = feat_avg.reshape(1, -1)
-        feat_new_reshaped = feat_new.reshape(1, -1)
-        sim_forma = cosine_similarity(feat_new_reshaped, feat_avg)[0][0]
-        dist_color = np.linalg.norm(color_avg - color_new)
-        sim_color = 1 / (1 + dist_color)
-        sim_total = alpha * sim_forma + (1 - alpha) * sim_color
-        resultados.append((nombre, sim_total))
 
-    resultados.sort(key=lambda x: x[1], reverse=True)
-    return resultados[0]  # (nombre, similitud)
+        feats, cols = separar_color(matriz)
+        for path, top in zip(rutas_ok, mejores_clases(feats, cols, alpha, k)):
+            if top:
+                yield path, top, None
+            else:
+                yield path, None, ValueError("vector de características inválido (NaN)")
 
 # =====================================================
-# 3. CLASIFICAR TODAS LAS IMÁGENES EN UNA CARPETA
+# 4. CLASIFICAR TODAS LAS IMÁGENES EN UNA CARPETA
 # =====================================================
-def clasificar_carpeta(carpeta_imagenes, alpha=0.8, salida_txt="resultados_clasificacion.txt"):
+def clasificar_carpeta(carpeta_imagenes, alpha=0.8, salida_txt="resultados_clasificacion.txt",
+                       batch_size=BATCH_SIZE, prefetch=PREFETCH, usar_cache=True,
+                       almacen_dir=ALMACEN_DIR, usar_ann=True, jerarquico=False):
     """Clasifica todas las imágenes en una carpeta y genera un resumen."""
-    if not os.path.exists("tenis_features.npy") or not os.path.exists("tenis_colors.npy"):
-        print("❌ No se encontraron los archivos 'tenis_features.npy' o 'tenis_colors.npy'.")
-        print("   Ejecute primero el script de entrenamiento.")
+    mejores_clases = cargar_clasificador(almacen_dir, usar_ann, jerarquico)
+    if mejores_clases is None:
         return
 
-    tenis_features = np.load("tenis_features.npy", allow_pickle=True).item()
-    tenis_colors = np.load("tenis_colors.npy", allow_pickle=True).item()
-
     resultados = []
     conteo = Counter()
 
@@ -80,18 +150,25 @@ def clasificar_carpeta(carpeta_imagenes, alpha=0.8, salida_txt="resultados_clasi
 
     print(f"📁 Clasificando {len(imagenes)} imágenes en '{carpeta_imagenes}'...\n")
 
+    rutas = [os.path.join(carpeta_imagenes, fname) for fname in imagenes]
+    cache = CacheEmbeddings() if usar_cache else None
+
     with open(salida_txt, "w", encoding="utf-8") as f:
-        for fname in imagenes:
-            path = os.path.join(carpeta_imagenes, fname)
-            try:
-                clase, sim = clasificar_tenis(path, tenis_features, tenis_colors, alpha)
-                resultados.append((fname, clase, sim))
-                conteo[clase] += 1
-                f.write(f"{fname} → {clase} ({sim:.3f})\n")
-                print(f"✅ {fname} → {clase} ({sim:.3f})")
-            except Exception as e:
-                f.write(f"{fname} → Error: {e}\n")
-                print(f"⚠️ Error con {fname}: {e}")
+        for path, top, error in clasificar_rutas(rutas, mejores_clases, alpha, 1, cache,
+                                                 batch_size, prefetch):
+            fname = os.path.basename(path)
+            if error is not None:
+                f.write(f"{fname} → Error: {error}\n")
+                print(f"⚠️ Error con {fname}: {error}")
+                continue
+            clase, sim = top[0]
+            resultados.append((fname, clase, sim))
+            conteo[clase] += 1
+            f.write(f"{fname} → {clase} ({sim:.3f})\n")
+            print(f"✅ {fname} → {clase} ({sim:.3f})")
+
+        if cache:
+            cache.cerrar()
 
         f.write("\n=== RESUMEN ===\n")
         for clase, cantidad in conteo.most_common():
@@ -103,21 +180,43 @@ def clasificar_carpeta(carpeta_imagenes, alpha=0.8, salida_txt="resultados_clasi
         print(f"{clase}: {cantidad}")
 
 # =====================================================
-# 4. EJECUCIÓN CON SELECCIÓN DE CARPETA
+# 5. EJECUCIÓN (CARPETA POR ARGUMENTO, DIÁLOGO O VIGILANCIA)
 # =====================================================
+# python clasificar_carpeta.py                  → diálogo para elegir carpeta
+# python clasificar_carpeta.py media            → clasifica la carpeta una vez
+# python clasificar_carpeta.py media --vigilar  → sin interfaz, solo lo nuevo
 if __name__ == "__main__":
-    import tkinter as tk
-    from tkinter import filedialog
-
-    # Oculta la ventana principal de Tkinter
-    root = tk.Tk()
-    root.withdraw()
-
-    print("📁 Selecciona la carpeta que contiene las imágenes...")
-    carpeta = filedialog.askdirectory(title="Selecciona la carpeta con imágenes")
+    import argparse
+    import vigilar_carpeta
+
+    parser = argparse.ArgumentParser(description="Clasifica las imágenes de una carpeta")
+    parser.add_argument("carpeta", nargs="?")
+    parser.add_argument("--vigilar", action="store_true",
+                        help="Sigue clasificando las imágenes que lleguen (CSV/JSONL)")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE,
+                        help="Imágenes por llamada al modelo al clasificar la carpeta una vez")
+    args = vigilar_carpeta.argumentos(parser).parse_args()
+
+    carpeta = args.carpeta
+    if not carpeta and args.vigilar:
+        carpeta = vigilar_carpeta.CARPETA
+    elif not carpeta:
+        import tkinter as tk
+        from tkinter import filedialog
+
+        # Oculta la ventana principal de Tkinter
+        root = tk.Tk()
+        root.withdraw()
+
+        print("📁 Selecciona la carpeta que contiene las imágenes...")
+        carpeta = filedialog.askdirectory(title="Selecciona la carpeta con imágenes")
 
     if not carpeta:
         print("❌ No se seleccionó ninguna carpeta.")
+    elif args.vigilar:
+        vigilar_carpeta.vigilar(args, carpeta)
     else:
         print(f"✅ Carpeta seleccionada: {carpeta}\n")
-        clasificar_carpeta(carpeta)
+        clasificar_carpeta(carpeta, args.alpha, batch_size=args.batch,
+                           usar_cache=not args.sin_cache, almacen_dir=args.almacen,
+                           usar_ann=not args.sin_ann, jerarquico=args.jerarquico)
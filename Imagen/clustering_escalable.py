@@ -0,0 +1,240 @@
+# =============================================================================
+# CLUSTERING FUERA DE MEMORIA PARA CATÁLOGOS GRANDES
+# =============================================================================
+# Alternativa a PCA + KMeans(n_init=10) de clasificación_grupos_similitud para
+# cientos de miles o millones de fotos:
+#   - las características viven en un .npy en disco (np.load con mmap_mode='r')
+#     y se recorren por bloques de 'tam_bloque' filas
+#   - IncrementalPCA aprende la proyección con partial_fit bloque a bloque
+#   - MiniBatchKMeans ajusta los grupos con partial_fit sobre los bloques ya
+#     proyectados
+#   - el modelo (PCA + centroides) se guarda en un .npz; la siguiente ejecución
+#     puede arrancar desde él (arranque en caliente) y solo refina
+#
+# La memoria pico depende de tam_bloque y no del número de imágenes.
+#
+# Uso:
+#   python clustering_escalable.py features_grupos.npy --grupos 100 --modelo grupos_modelo.npz
+#   python clustering_escalable.py features_grupos.npy --grupos 100 --modelo grupos_modelo.npz --caliente
+
+import os
+import time
+import shutil
+import argparse
+
+import numpy as np
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+TAM_BLOQUE = 8_192        # filas por bloque (>= número de componentes y de grupos)
+N_COMPONENTES = 100       # igual que el PCA de cluster_images
+PASADAS = 2               # recorridos de MiniBatchKMeans sobre los datos
+N_INIT = 3                # inicializaciones k-means++ sobre el primer bloque
+MUESTRA_METRICAS = 10_000 # filas para silhouette / Davies-Bouldin / Calinski-Harabasz
+UMBRAL_INCREMENTAL = 50_000  # a partir de aquí cluster_images usa este camino
+
+# =============================================================================
+# CARACTERÍSTICAS EN DISCO
+# =============================================================================
+
+def guardar_bloques_npy(bloques, ruta, dtype=np.float32):
+    """
+    Escribe en 'ruta' (.npy) una matriz que llega por bloques sin juntarla en
+    memoria y la devuelve abierta con mmap. Los bloques vacíos se ignoran.
+    """
+    parcial = ruta + ".parcial"
+    filas, dims = 0, None
+    with open(parcial, "wb") as f:
+        for bloque in bloques:
+            bloque = np.ascontiguousarray(bloque, dtype=dtype)
+            if bloque.size == 0:
+                continue
+            dims = bloque.shape[1]
+            filas += len(bloque)
+            f.write(bloque.tobytes())
+
+    if dims is None:
+        os.remove(parcial)
+        np.save(ruta, np.empty((0, 0), dtype=dtype))
+        return np.load(ruta, mmap_mode="r")
+
+    # Cabecera .npy + copia secuencial de los datos crudos
+    destino = np.lib.format.open_memmap(ruta + ".tmp", mode="w+", dtype=dtype, shape=(filas, dims))
+    crudo = np.memmap(parcial, dtype=dtype, mode="r", shape=(filas, dims))
+    for i in range(0, filas, TAM_BLOQUE):
+        destino[i:i + TAM_BLOQUE] = crudo[i:i + TAM_BLOQUE]
+    destino.flush()
+    del destino, crudo
+    os.remove(parcial)
+    shutil.move(ruta + ".tmp", ruta)
+    return np.load(ruta, mmap_mode="r")
+
+def bloques(matriz, tam_bloque=TAM_BLOQUE):
+    """Recorre una matriz (o memmap) por bloques contiguos en float32."""
+    for i in range(0, len(matriz), tam_bloque):
+        yield np.asarray(matriz[i:i + tam_bloque], dtype=np.float32)
+
+# =============================================================================
+# MODELO INCREMENTAL
+# =============================================================================
+
+class ClusteringIncremental:
+    """
+    IncrementalPCA + MiniBatchKMeans ajustados bloque a bloque. Tras ajustar,
+    el modelo son tres matrices (media, componentes, centroides) y la
+    predicción es NumPy puro.
+    """
+
+    def __init__(self, n_grupos, n_componentes=N_COMPONENTES, tam_bloque=TAM_BLOQUE,
+                 pasadas=PASADAS, semilla=42):
+        self.n_grupos = n_grupos
+        self.n_componentes = n_componentes
+        self.tam_bloque = tam_bloque
+        self.pasadas = pasadas
+        self.semilla = semilla
+        self.media = self.componentes = self.centroides = None
+
+    def proyectar(self, bloque):
+        return (bloque - self.media) @ self.componentes.T
+
+    def ajustar(self, features, caliente=None):
+        """
+        Ajusta sobre 'features' (array o memmap). 'caliente' es un modelo previo
+        (ClusteringIncremental.cargar): se reutiliza su proyección y sus
+        centroides inician MiniBatchKMeans, así que basta con una pasada.
+        """
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.decomposition import IncrementalPCA
+
+        n, dims = features.shape
+        n_componentes = min(self.n_componentes, dims, n)
+        tam_bloque = max(self.tam_bloque, n_componentes, self.n_grupos)
+        utilizable = (caliente is not None and caliente.componentes.shape[1] == dims
+                      and caliente.n_grupos == self.n_grupos)
+        if caliente is not None and not utilizable:
+            print("⚠️ El modelo previo no es compatible (dimensiones o grupos distintos): "
+                  "se ajusta desde cero.")
+
+        if utilizable:
+            self.media, self.componentes = caliente.media, caliente.componentes
+            inicio, pasadas = caliente.centroides, 1
+        else:
+            pca = IncrementalPCA(n_components=n_componentes)
+            for i, bloque in enumerate(bloques(features, tam_bloque)):
+                # partial_fit necesita al menos n_componentes filas por bloque
+                if i == 0 or len(bloque) >= n_componentes:
+                    pca.partial_fit(bloque)
+            self.media = pca.mean_.astype(np.float32)
+            self.componentes = pca.components_.astype(np.float32)
+            # Mejor de N_INIT arranques sobre el primer bloque como punto de partida
+            primero = self.proyectar(next(bloques(features, tam_bloque)))
+            inicio = MiniBatchKMeans(n_clusters=self.n_grupos, n_init=N_INIT,
+                                     batch_size=min(tam_bloque, 4096),
+                                     random_state=self.semilla).fit(primero).cluster_centers_
+            pasadas = self.pasadas
+
+        kmeans = MiniBatchKMeans(n_clusters=self.n_grupos, init=inicio, n_init=1,
+                                 batch_size=min(tam_bloque, 4096), random_state=self.semilla)
+        for _ in range(pasadas):
+            for bloque in bloques(features, tam_bloque):
+                kmeans.partial_fit(self.proyectar(bloque))
+        self.centroides = kmeans.cluster_centers_.astype(np.float32)
+        return self
+
+    def predecir(self, features):
+        """Grupo de cada fila (centroide más cercano), bloque a bloque."""
+        normas = np.sum(self.centroides ** 2, axis=1)
+        etiquetas = [np.argmin(normas - 2 * self.proyectar(b) @ self.centroides.T, axis=1)
+                     for b in bloques(features, self.tam_bloque)]
+        return np.concatenate(etiquetas) if etiquetas else np.empty(0, dtype=np.int64)
+
+    # ---------------------------------------------------------------------
+    # Persistencia (npz, sin pickle)
+    # ---------------------------------------------------------------------
+
+    def guardar(self, ruta):
+        np.savez(ruta, media=self.media, componentes=self.componentes, centroides=self.centroides)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """Modelo guardado con guardar(); None si no existe."""
+        if not ruta or not os.path.exists(ruta):
+            return None
+        datos = np.load(ruta)
+        modelo = cls(len(datos["centroides"]), n_componentes=len(datos["componentes"]))
+        modelo.media, modelo.componentes = datos["media"], datos["componentes"]
+        modelo.centroides = datos["centroides"]
+        return modelo
+
+def agrupar_incremental(features, n_grupos, ruta_modelo=None, caliente=False,
+                        tam_bloque=TAM_BLOQUE, n_componentes=N_COMPONENTES):
+    """
+    Punto de entrada para cluster_images: ajusta (en caliente si se pide y
+    existe 'ruta_modelo'), guarda el modelo y devuelve las etiquetas.
+    """
+    previo = ClusteringIncremental.cargar(ruta_modelo) if caliente else None
+    if caliente and previo is None:
+        print("ℹ️ No hay modelo previo: primer ajuste completo.")
+    modelo = ClusteringIncremental(n_grupos, n_componentes, tam_bloque).ajustar(features, previo)
+    if ruta_modelo:
+        modelo.guardar(ruta_modelo)
+    return modelo.predecir(features)
+
+# =============================================================================
+# CALIDAD DE LOS GRUPOS
+# =============================================================================
+
+def metricas_calidad(features, etiquetas, muestra=MUESTRA_METRICAS, semilla=0):
+    """
+    Silhouette (coseno), Davies-Bouldin y Calinski-Harabasz sobre una muestra
+    aleatoria, más el tamaño mínimo / máximo de grupo sobre todos los datos.
+    """
+    from sklearn.metrics import (silhouette_score, davies_bouldin_score,
+                                 calinski_harabasz_score)
+
+    rng = np.random.default_rng(semilla)
+    idx = np.sort(rng.choice(len(etiquetas), min(muestra, len(etiquetas)), replace=False))
+    x = np.asarray(features[idx], dtype=np.float32)
+    y = np.asarray(etiquetas)[idx]
+    tamanos = np.bincount(etiquetas)
+    tamanos = tamanos[tamanos > 0]
+    metricas = {"grupos": len(tamanos), "min": int(tamanos.min()), "max": int(tamanos.max())}
+    if len(np.unique(y)) > 1:
+        metricas["silhouette"] = float(silhouette_score(x, y, metric="cosine"))
+        metricas["davies_bouldin"] = float(davies_bouldin_score(x, y))
+        metricas["calinski_harabasz"] = float(calinski_harabasz_score(x, y))
+    return metricas
+
+def mostrar_metricas(metricas):
+    texto = f"{metricas['grupos']} grupos (tamaño {metricas['min']}–{metricas['max']})"
+    if "silhouette" in metricas:
+        texto += (f" | silhouette {metricas['silhouette']:.3f}"
+                  f" | Davies-Bouldin {metricas['davies_bouldin']:.3f}"
+                  f" | Calinski-Harabasz {metricas['calinski_harabasz']:.0f}")
+    return texto
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clustering incremental de características")
+    parser.add_argument("features", help="Matriz .npy (se abre con mmap)")
+    parser.add_argument("--grupos", type=int, default=100)
+    parser.add_argument("--componentes", type=int, default=N_COMPONENTES)
+    parser.add_argument("--bloque", type=int, default=TAM_BLOQUE)
+    parser.add_argument("--modelo", default=None, help="Ruta .npz donde guardar / leer el modelo")
+    parser.add_argument("--caliente", action="store_true", help="Arranca desde el modelo previo")
+    parser.add_argument("--salida", default=None, help="Guarda las etiquetas en este .npy")
+    args = parser.parse_args()
+
+    features = np.load(args.features, mmap_mode="r")
+    t0 = time.perf_counter()
+    etiquetas = agrupar_incremental(features, args.grupos, args.modelo, args.caliente,
+                                    args.bloque, args.componentes)
+    print(f"✓ {len(etiquetas)} imágenes agrupadas en {time.perf_counter() - t0:.1f} s")
+    print(f"📊 {mostrar_metricas(metricas_calidad(features, etiquetas))}")
+    if args.salida:
+        np.save(args.salida, etiquetas)
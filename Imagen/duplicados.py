@@ -0,0 +1,246 @@
+# =============================================================================
+# DETECCIÓN DE CASI-DUPLICADOS CON HASH PERCEPTUAL
+# =============================================================================
+# Las fotos que llegan por el bot incluyen reenvíos y tomas casi idénticas.
+# Antes de pasar por la CNN se calcula un hash perceptual de 64 bits sobre una
+# miniatura en gris (dHash por defecto, o pHash con DCT) y se buscan vecinos a
+# distancia de Hamming <= UMBRAL con un BK-tree. Cada grupo de duplicados se
+# reduce a un representante (el archivo más grande), que es el único que se
+# extrae; los demás heredan su resultado. Cada foto se compara con los
+# representantes, no con cualquier miembro: A~B y B~C no juntan A con C si C
+# queda lejos de A.
+#
+# Con una CacheEmbeddings, los hashes se guardan por sha256 del archivo y solo
+# se decodifican las fotos nuevas o modificadas.
+#
+# Uso:
+#   python duplicados.py media --umbral 5
+#   python duplicados.py tenis_dataset --recursivo --csv duplicados.csv
+
+import os
+import csv
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+UMBRAL = 5          # bits distintos (de 64) para considerar dos fotos duplicadas
+METODO = "dhash"    # "dhash" o "phash"
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+
+# =============================================================================
+# HASHES PERCEPTUALES
+# =============================================================================
+
+def _miniatura_gris(ruta, tam):
+    img = Image.open(ruta)
+    img.draft("L", (tam[0] * 4, tam[1] * 4))  # JPEG: decodifica ya reducido
+    return np.asarray(img.convert("L").resize(tam, Image.BILINEAR), dtype=np.float32)
+
+def _bits_a_entero(bits):
+    return int("".join("1" if b else "0" for b in bits.ravel()), 2)
+
+def dhash(ruta):
+    """Diferencia horizontal entre píxeles vecinos de una miniatura 9x8."""
+    px = _miniatura_gris(ruta, (9, 8))
+    return _bits_a_entero(px[:, 1:] > px[:, :-1])
+
+_DCT = None
+
+def phash(ruta):
+    """Coeficientes DCT de baja frecuencia (8x8) de una miniatura 32x32 frente a su mediana."""
+    global _DCT
+    if _DCT is None:
+        n = np.arange(32)
+        _DCT = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / 64).astype(np.float32)
+    px = _miniatura_gris(ruta, (32, 32))
+    coef = (_DCT @ px @ _DCT.T)[:8, :8]
+    return _bits_a_entero(coef > np.median(coef.ravel()[1:]))
+
+HASHES = {"dhash": dhash, "phash": phash}
+
+def distancia(a, b):
+    return bin(a ^ b).count("1")
+
+# =============================================================================
+# BK-TREE
+# =============================================================================
+
+class BKTree:
+    """Árbol métrico para buscar hashes a distancia de Hamming <= radio."""
+
+    def __init__(self):
+        self.raiz = None  # [hash, [elementos], {distancia: nodo}]
+
+    def agregar(self, h, elemento):
+        if self.raiz is None:
+            self.raiz = [h, [elemento], {}]
+            return
+        nodo = self.raiz
+        while True:
+            d = distancia(h, nodo[0])
+            if d == 0:
+                nodo[1].append(elemento)
+                return
+            hijo = nodo[2].get(d)
+            if hijo is None:
+                nodo[2][d] = [h, [elemento], {}]
+                return
+            nodo = hijo
+
+    def buscar(self, h, radio):
+        """Elementos a distancia <= radio de h."""
+        encontrados = []
+        pendientes = [self.raiz] if self.raiz else []
+        while pendientes:
+            nodo = pendientes.pop()
+            d = distancia(h, nodo[0])
+            if d <= radio:
+                encontrados.extend(nodo[1])
+            for dh, hijo in nodo[2].items():
+                if d - radio <= dh <= d + radio:
+                    pendientes.append(hijo)
+        return encontrados
+
+# =============================================================================
+# AGRUPACIÓN
+# =============================================================================
+
+def calcular_hashes(rutas, metodo=METODO, workers=None, cache=None):
+    """
+    ({ruta: hash}, [(ruta, error)]) calculando en un pool de hilos.
+    Con 'cache' (CacheEmbeddings) solo se calculan los que no estaban guardados.
+    """
+    funcion = HASHES[metodo]
+
+    def seguro(ruta):
+        try:
+            return ruta, funcion(ruta), None
+        except Exception as e:
+            return ruta, None, e
+
+    hashes, errores = {}, []
+    contenido = {}
+    if cache is not None:
+        contenido, errores = cache.hashes(rutas, workers)
+        guardados = cache.obtener_perceptuales(contenido.values(), metodo)
+        hashes = {r: guardados[contenido[r]] for r in rutas
+                  if r in contenido and contenido[r] in guardados}
+        rutas = [r for r in rutas if r in contenido and r not in hashes]
+
+    nuevos = []
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as ex:
+        for ruta, h, error in ex.map(seguro, rutas):
+            if error is None:
+                hashes[ruta] = h
+                nuevos.append(ruta)
+            else:
+                errores.append((ruta, error))
+    if cache is not None and nuevos:
+        cache.guardar_perceptuales(((contenido[r], hashes[r]) for r in nuevos), metodo)
+    return hashes, errores
+
+def grupos_duplicados(hashes, umbral=UMBRAL):
+    """
+    Lista de grupos (listas de rutas) con más de un elemento. Las rutas se
+    recorren en el orden de 'hashes': cada una se une al representante más
+    cercano a distancia <= umbral o pasa a ser representante. El primero de
+    cada grupo es su representante.
+    """
+    arbol = BKTree()
+    grupos = {}
+    for ruta, h in hashes.items():
+        cercanos = arbol.buscar(h, umbral)
+        if cercanos:
+            rep = min(cercanos, key=lambda r: (distancia(h, hashes[r]), r))
+            grupos[rep].append(ruta)
+        else:
+            arbol.agregar(h, ruta)
+            grupos[ruta] = [ruta]
+    return [g for g in grupos.values() if len(g) > 1]
+
+def colapsar_duplicados(rutas, umbral=UMBRAL, metodo=METODO, workers=None, informe=True,
+                        cache=None):
+    """
+    Devuelve (representantes, duplicado_de): las rutas a extraer (una por
+    grupo, el archivo más grande; los que no se pudieron hashear se mantienen)
+    y {ruta_duplicada: representante}.
+    """
+    rutas = list(rutas)
+    hashes, _ = calcular_hashes(rutas, metodo, workers, cache)
+    # los más grandes primero: son los que pasan a representantes
+    orden = sorted(hashes, key=lambda r: (-os.path.getsize(r), r))
+    duplicado_de = {}
+    grupos = grupos_duplicados({r: hashes[r] for r in orden}, umbral)
+    for grupo in grupos:
+        for ruta in grupo[1:]:
+            duplicado_de[ruta] = grupo[0]
+    representantes = [r for r in rutas if r not in duplicado_de]
+
+    if informe:
+        ahorro = len(duplicado_de) / len(rutas) * 100 if rutas else 0
+        print(f"🔁 Duplicados: {len(rutas)} imágenes → {len(representantes)} únicas "
+              f"({len(grupos)} grupos); se evitan {len(duplicado_de)} pasadas de la CNN "
+              f"({ahorro:.1f} %)")
+    return representantes, duplicado_de
+
+def listar_grupos(duplicado_de):
+    """{representante: [duplicados]} a partir de duplicado_de."""
+    grupos = {}
+    for ruta, rep in duplicado_de.items():
+        grupos.setdefault(rep, []).append(ruta)
+    return grupos
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca fotos casi duplicadas")
+    parser.add_argument("carpeta")
+    parser.add_argument("--umbral", type=int, default=UMBRAL)
+    parser.add_argument("--metodo", choices=list(HASHES), default=METODO)
+    parser.add_argument("--recursivo", action="store_true",
+                        help="Busca dentro de cada subcarpeta (clase) por separado")
+    parser.add_argument("--csv", default=None, help="Guarda los grupos (representante, duplicado)")
+    parser.add_argument("--sin-cache", action="store_true",
+                        help="No lee ni guarda los hashes en cache_embeddings.sqlite")
+    args = parser.parse_args()
+
+    if args.recursivo:
+        carpetas = [os.path.join(args.carpeta, d) for d in sorted(os.listdir(args.carpeta))
+                    if os.path.isdir(os.path.join(args.carpeta, d))]
+    else:
+        carpetas = [args.carpeta]
+
+    from cache_embeddings import CacheEmbeddings
+    cache = None if args.sin_cache else CacheEmbeddings()
+
+    todos = {}
+    for carpeta in carpetas:
+        rutas = sorted(os.path.join(carpeta, f) for f in os.listdir(carpeta)
+                       if f.lower().endswith(EXTENSIONES))
+        _, duplicado_de = colapsar_duplicados(rutas, args.umbral, args.metodo, informe=False,
+                                              cache=cache)
+        todos.update(duplicado_de)
+    if cache:
+        cache.cerrar()
+
+    grupos = listar_grupos(todos)
+    for rep, dups in sorted(grupos.items()):
+        print(f"\n{rep}")
+        for d in sorted(dups):
+            print(f"   ≈ {d}")
+    print(f"\n🔁 {len(grupos)} grupos, {len(todos)} duplicados")
+
+    if args.csv:
+        with open(args.csv, "w", encoding="utf-8", newline="") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(["representante", "duplicado"])
+            escritor.writerows((rep, d) for rep, dups in sorted(grupos.items()) for d in sorted(dups))
+        print(f"💾 Grupos guardados en: {args.csv}")
@@ -0,0 +1,269 @@
+# =============================================================================
+# EVALUACIÓN RÁPIDA DE ALPHA Y DE LA SIMILITUD DE COLOR
+# =============================================================================
+# Usa los vectores y colores por imagen ya guardados en el almacén (sin volver
+# a pasar la CNN) para medir el acierto top-1 … top-k de la fórmula
+#   alpha * coseno(feat, centroide) + (1 - alpha) * similitud_color(...)
+# para una rejilla de valores de alpha y cada variante de color.
+#
+#   - "loo"  : leave-one-out; el centroide de la propia clase se recalcula sin
+#              la imagen consultada a partir de las sumas por clase (exacto y
+#              sin bucles por imagen). Las clases de una sola imagen se omiten.
+#   - k-fold : --pliegues 5; los centroides salen de los otros pliegues.
+#
+# Por cada bloque de consultas se calculan una vez las matrices de forma y de
+# color (consultas × clases); cada alpha solo las combina y cuenta cuántas
+# clases superan a la correcta (posición de la clase verdadera).
+#
+# Uso:
+#   python evaluacion.py
+#   python evaluacion.py --alphas 0.5 1 11 --variantes rgb lab --pliegues 5 --k 5
+
+import csv
+import time
+import argparse
+
+import numpy as np
+
+from puntuacion import (normalizar_filas, rgb_a_lab, similitud_color, similitud_de_distancia,
+                        VARIANTES_COLOR)
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+ALPHAS = np.round(np.linspace(0, 1, 21), 2)
+ALPHA_ACTUAL = 0.8
+K = 5
+BLOQUE = 1024                 # consultas por bloque (memoria ~ BLOQUE × clases)
+SALIDA = "evaluacion_alpha.csv"
+
+# =============================================================================
+# SUMAS POR CLASE
+# =============================================================================
+
+def filas_validas(vectores, colores, bloque=16_384):
+    """Índices de las imágenes sin NaN en el vector ni en el color."""
+    ok = np.isfinite(np.asarray(colores, dtype=np.float32)).all(axis=1)
+    for i in range(0, len(ok), bloque):
+        ok[i:i + bloque] &= np.isfinite(np.asarray(vectores[i:i + bloque])).all(axis=1)
+    return np.flatnonzero(ok)
+
+def sumas_por_clase(vectores, colores, clase_idx, n_clases, filas, bloque=16_384):
+    """Sumas (float64) de vectores y colores y conteos por clase de las 'filas' indicadas."""
+    sumas = np.zeros((n_clases, vectores.shape[1]), dtype=np.float64)
+    sumas_colores = np.zeros((n_clases, 3), dtype=np.float64)
+    for i in range(0, len(filas), bloque):
+        parte = filas[i:i + bloque]
+        np.add.at(sumas, clase_idx[parte], np.asarray(vectores[parte], dtype=np.float64))
+        np.add.at(sumas_colores, clase_idx[parte], np.asarray(colores[parte], dtype=np.float64))
+    conteos = np.bincount(clase_idx[filas], minlength=n_clases)
+    return sumas, sumas_colores, conteos
+
+# =============================================================================
+# EVALUACIÓN
+# =============================================================================
+
+def _posiciones(forma, colores_sim, verdad, alphas, k, excluidas):
+    """
+    Histograma de la posición de la clase verdadera (0 = primera, k = fuera
+    del top-k) para cada variante y todos los alpha a la vez. Devuelve
+    {variante: (len(alphas), k + 1)}.
+
+    Con ΔF y ΔC las diferencias de forma y color de una clase respecto a la
+    verdadera, la clase la supera si alpha·ΔF + (1 - alpha)·ΔC > 0, que es
+    lineal en alpha: si ΔF y ΔC son positivas gana siempre, si ninguna lo es
+    no gana nunca y en otro caso basta el alpha de corte ΔC / (ΔC - ΔF).
+    """
+    filas = np.arange(len(verdad))
+    n_alphas = len(alphas)
+    d_forma = forma - forma[filas, verdad][:, None]
+    validas = np.ones(forma.shape[1], dtype=bool)
+    if excluidas is not None:
+        validas[excluidas] = False
+
+    resultado = {}
+    for variante, sim_color in colores_sim.items():
+        d_color = sim_color - sim_color[filas, verdad][:, None]
+        sube, baja = (d_forma > 0) & validas, (d_color > 0) & validas
+        posicion = np.repeat((sube & baja).sum(axis=1)[:, None], n_alphas, axis=1)
+
+        r, c = np.nonzero(sube ^ baja)
+        f, col = d_forma[r, c], d_color[r, c]
+        corte = col / (col - f)
+        # ΔF > 0 ≥ ΔC: gana con alpha > corte; ΔC > 0 ≥ ΔF: gana con alpha < corte
+        creciente = f > 0
+        desde = np.searchsorted(alphas, corte[creciente], side="right")
+        hist = np.bincount(r[creciente] * (n_alphas + 1) + desde, minlength=len(filas) * (n_alphas + 1))
+        posicion += np.cumsum(hist.reshape(len(filas), -1), axis=1)[:, :n_alphas]
+        hasta = np.searchsorted(alphas, corte[~creciente], side="left")
+        hist = np.bincount(r[~creciente] * (n_alphas + 1) + hasta, minlength=len(filas) * (n_alphas + 1))
+        hist = hist.reshape(len(filas), -1)
+        posicion += hist.sum(axis=1)[:, None] - np.cumsum(hist, axis=1)[:, :n_alphas]
+
+        resultado[variante] = np.stack([np.bincount(np.minimum(posicion[:, a], k), minlength=k + 1)
+                                        for a in range(n_alphas)])
+    return resultado
+
+def _similitudes_color(colores, medias, variantes):
+    """
+    {variante: similitud (consultas × clases)}. Las distancias RGB y Lab se
+    calculan una vez por espacio con |a|² + |b|² - 2·a·b (un producto de matrices).
+    """
+    distancias = {}
+    for espacio in {"lab" if v == "lab" else "rgb" for v in variantes}:
+        a, b = (rgb_a_lab(colores), rgb_a_lab(medias)) if espacio == "lab" else (colores, medias)
+        a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+        d2 = (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] - 2 * (a @ b.T)
+        distancias[espacio] = np.sqrt(np.maximum(d2, 0)).astype(np.float32)
+    return {v: similitud_de_distancia(distancias["lab" if v == "lab" else "rgb"], v)
+            for v in variantes}
+
+def _acumular(total, parcial):
+    for variante, hist in parcial.items():
+        total[variante] = total.get(variante, 0) + hist
+
+def evaluar(vectores, colores, clase_idx, n_clases, alphas=ALPHAS, variantes=VARIANTES_COLOR,
+            k=K, pliegues=None, bloque=BLOQUE, semilla=0):
+    """
+    Acierto top-1 … top-k por variante de color y alpha.
+    'alphas' debe estar en [0, 1]; se ordena de menor a mayor.
+    pliegues=None → leave-one-out; un entero → k-fold estratificado al azar.
+    Devuelve ({variante: matriz (len(alphas), k) de tasas acumuladas}, consultas evaluadas).
+    """
+    clase_idx = np.asarray(clase_idx, dtype=np.int64)
+    alphas = np.sort(np.asarray(alphas, dtype=np.float32))
+    if alphas.min() < 0 or alphas.max() > 1:
+        raise ValueError("alpha debe estar entre 0 y 1")
+    validas = filas_validas(vectores, colores)
+    sumas, sumas_colores, conteos = sumas_por_clase(vectores, colores, clase_idx, n_clases, validas)
+
+    total = {}
+    if pliegues is None:
+        # leave-one-out: las imágenes solas en su clase no tienen centroide sin ellas
+        consultas = validas[conteos[clase_idx[validas]] > 1]
+        normas = np.linalg.norm(sumas, axis=1)
+        centroides = (sumas / np.where(normas > 0, normas, 1)[:, None]).astype(np.float32)
+        medias_color = (sumas_colores / np.maximum(conteos, 1)[:, None]).astype(np.float32)
+        vacias = np.flatnonzero(conteos == 0)
+
+        for i in range(0, len(consultas), bloque):
+            filas = consultas[i:i + bloque]
+            v = np.asarray(vectores[filas], dtype=np.float32)
+            c = np.asarray(colores[filas], dtype=np.float32)
+            y = clase_idx[filas]
+            norma_v = np.linalg.norm(v, axis=1)
+            vn = normalizar_filas(v)
+            forma = vn @ centroides.T
+
+            # centroide propio sin la consulta: (S_y - v), con la norma de S_y - v
+            producto = forma[np.arange(len(y)), y] * normas[y]          # S_y · v̂
+            norma_sin = np.sqrt(np.maximum(normas[y] ** 2 - 2 * producto * norma_v + norma_v ** 2, 0))
+            forma[np.arange(len(y)), y] = np.where(norma_sin > 0,
+                                                   (producto - norma_v) / np.maximum(norma_sin, 1e-12), 0)
+            propio = ((sumas_colores[y] - c) / (conteos[y] - 1)[:, None]).astype(np.float32)
+
+            sim_colores = _similitudes_color(c, medias_color, variantes)
+            for variante, sim in sim_colores.items():
+                sim[np.arange(len(y)), y] = similitud_color(c, propio, variante)
+            _acumular(total, _posiciones(forma, sim_colores, y, alphas, k,
+                                         vacias if len(vacias) else None))
+        evaluadas = len(consultas)
+    else:
+        rng = np.random.default_rng(semilla)
+        pliegue = np.empty(len(clase_idx), dtype=np.int64)
+        # estratificado: dentro de cada clase las imágenes se reparten por turnos
+        orden = validas[np.lexsort((rng.random(len(validas)), clase_idx[validas]))]
+        _, inicio = np.unique(clase_idx[orden], return_index=True)
+        rango = np.arange(len(orden)) - np.repeat(inicio, np.diff(np.append(inicio, len(orden))))
+        pliegue[orden] = (rango + rng.integers(0, pliegues)) % pliegues
+
+        evaluadas = 0
+        for p in range(pliegues):
+            prueba = validas[pliegue[validas] == p]
+            s, sc, n = sumas_por_clase(vectores, colores, clase_idx, n_clases, prueba)
+            entreno_n = conteos - n
+            centroides = normalizar_filas(sumas - s)
+            medias_color = ((sumas_colores - sc) / np.maximum(entreno_n, 1)[:, None]).astype(np.float32)
+            sin_entreno = np.flatnonzero(entreno_n == 0)
+            # las consultas de clases sin imágenes de entrenamiento no pueden acertar
+            prueba = prueba[entreno_n[clase_idx[prueba]] > 0]
+            for i in range(0, len(prueba), bloque):
+                filas = prueba[i:i + bloque]
+                c = np.asarray(colores[filas], dtype=np.float32)
+                forma = normalizar_filas(vectores[filas]) @ centroides.T
+                sim_colores = _similitudes_color(c, medias_color, variantes)
+                _acumular(total, _posiciones(forma, sim_colores, clase_idx[filas], alphas, k,
+                                             sin_entreno if len(sin_entreno) else None))
+            evaluadas += len(prueba)
+
+    tasas = {v: np.cumsum(hist[:, :k], axis=1) / max(evaluadas, 1) for v, hist in total.items()}
+    return tasas, evaluadas
+
+# =============================================================================
+# INFORME
+# =============================================================================
+
+def guardar_informe(tasas, alphas, ruta=SALIDA):
+    """CSV con una fila por (variante, alpha) y columnas top1 … topk."""
+    k = next(iter(tasas.values())).shape[1]
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["variante", "alpha"] + [f"top{j + 1}" for j in range(k)])
+        for variante, matriz in tasas.items():
+            for alpha, fila in zip(alphas, matriz):
+                escritor.writerow([variante, f"{alpha:.3f}"] + [f"{x:.4f}" for x in fila])
+
+def mostrar_informe(tasas, alphas, evaluadas, alpha_actual=ALPHA_ACTUAL):
+    k = next(iter(tasas.values())).shape[1]
+    alphas = np.asarray(alphas)
+    actual = int(np.argmin(np.abs(alphas - alpha_actual)))
+    print(f"\n=== EVALUACIÓN ({evaluadas} consultas) ===")
+    print(f"{'variante':<8} {'mejor alpha':>11} {'top-1':>7} {f'top-{k}':>7} | "
+          f"{f'alpha={alphas[actual]:.2f}':>11} {'top-1':>7} {f'top-{k}':>7}")
+    for variante, matriz in tasas.items():
+        # mejor top-1; a igualdad, mejor top-k
+        mejor = max(range(len(alphas)), key=lambda a: (matriz[a, 0], matriz[a, -1]))
+        print(f"{variante:<8} {alphas[mejor]:11.2f} {matriz[mejor, 0]:7.3f} {matriz[mejor, -1]:7.3f} | "
+              f"{'':>11} {matriz[actual, 0]:7.3f} {matriz[actual, -1]:7.3f}")
+
+    print("\nTop-1 por alpha:")
+    print(f"{'alpha':>6} " + " ".join(f"{v:>7}" for v in tasas))
+    for a, alpha in enumerate(alphas):
+        print(f"{alpha:6.2f} " + " ".join(f"{m[a, 0]:7.3f}" for m in tasas.values()))
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+if __name__ == "__main__":
+    from almacen_features import cargar_almacen, ALMACEN_DIR
+
+    parser = argparse.ArgumentParser(description="Acierto por alpha y variante de color sin la CNN")
+    parser.add_argument("--dir", default=ALMACEN_DIR)
+    parser.add_argument("--alphas", type=float, nargs=3, metavar=("INICIO", "FIN", "N"),
+                        default=None, help="Rejilla linspace(INICIO, FIN, N)")
+    parser.add_argument("--variantes", nargs="+", default=list(VARIANTES_COLOR),
+                        choices=VARIANTES_COLOR)
+    parser.add_argument("--pliegues", type=int, default=None, help="k-fold (por defecto leave-one-out)")
+    parser.add_argument("--k", type=int, default=K)
+    parser.add_argument("--salida", default=SALIDA)
+    args = parser.parse_args()
+
+    almacen = cargar_almacen(args.dir)
+    if almacen is None:
+        raise SystemExit(f"❌ No existe el almacén {args.dir}; ejecuta generar_vectores.py")
+    alphas = ALPHAS if args.alphas is None else np.round(
+        np.sort(np.linspace(args.alphas[0], args.alphas[1], int(args.alphas[2]))), 3)
+
+    modo = "leave-one-out" if args.pliegues is None else f"{args.pliegues}-fold"
+    print(f"📊 {len(almacen)} imágenes, {len(almacen.clases)} clases | {modo} | "
+          f"{len(alphas)} valores de alpha × {len(args.variantes)} variantes de color")
+    t0 = time.perf_counter()
+    tasas, evaluadas = evaluar(almacen.vectores, almacen.colores, almacen.clase_idx,
+                               len(almacen.clases), alphas, args.variantes, args.k, args.pliegues)
+    t = time.perf_counter() - t0
+
+    mostrar_informe(tasas, alphas, evaluadas)
+    guardar_informe(tasas, alphas, args.salida)
+    print(f"\n⏱️ {t:.1f} s | informe completo en {args.salida}")
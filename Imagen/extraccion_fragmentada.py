@@ -0,0 +1,149 @@
+# =============================================================================
+# EXTRACCIÓN MULTIPROCESO POR FRAGMENTOS
+# =============================================================================
+# TensorFlow en CPU no aprovecha todos los núcleos con un solo proceso. Aquí la
+# lista de rutas se reparte en N fragmentos contiguos, uno por proceso. Cada
+# proceso tiene su propia instancia del modelo y un número fijo de hilos
+# (OMP / TF / BLAS y, en Linux, afinidad a sus propios núcleos). Cada uno
+# escribe su fragmento (rutas + [features | color]) en un .npz y el proceso
+# principal los une.
+#
+# ExtractorFragmentado se usa como 'extraer' de extraer_con_cache: la caché
+# sigue en el proceso principal y solo las fotos nuevas llegan a los procesos.
+#
+#   with ExtractorFragmentado(procesos=4) as extraer:
+#       for rutas_ok, matriz, errores in extraer(rutas): ...
+
+import os
+import shutil
+import tempfile
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import backends
+from extraccion_lotes import (extraer_features_y_color, Tiempos, BATCH_SIZE, PREFETCH,
+                              DECODIFICACION_REDUCIDA)
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+PROCESOS = int(os.environ.get("PROCESOS_EXTRACCION", "1"))  # 1 = sin fragmentar
+DIR_FRAGMENTOS = None  # None: carpeta temporal; si no, los fragmentos se dejan aquí
+
+VARIABLES_HILOS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                   "TF_NUM_INTRAOP_THREADS", "HILOS_INFERENCIA")
+
+# =============================================================================
+# PROCESOS DE TRABAJO
+# =============================================================================
+
+def _inicializar(hilos, contador):
+    """Fija hilos y núcleos del proceso antes de que se cargue TensorFlow."""
+    for variable in VARIABLES_HILOS:
+        os.environ[variable] = str(hilos)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+
+    with contador.get_lock():
+        indice = contador.value
+        contador.value += 1
+    if hasattr(os, "sched_setaffinity"):
+        nucleos = sorted(os.sched_getaffinity(0))
+        propios = nucleos[indice * hilos:(indice + 1) * hilos]
+        if len(propios) == hilos:  # si no hay núcleos para todos, no se fija afinidad
+            os.sched_setaffinity(0, propios)
+
+def _extraer_fragmento(tarea):
+    """Extrae un fragmento y lo escribe en un .npz. Devuelve (ruta, errores, tiempos, n)."""
+    numero, rutas, directorio, modelo, backend, hilos, batch_size, prefetch, reducir = tarea
+    tiempos = Tiempos()
+    rutas_ok, bloques, errores = [], [], []
+    for ok, matriz, errs in extraer_features_y_color(rutas, backends.obtener_backend(modelo, backend),
+                                                     backends.MODELOS[modelo][1], batch_size,
+                                                     prefetch, hilos, reducir, tiempos):
+        rutas_ok.extend(ok)
+        if ok:
+            bloques.append(np.asarray(matriz, dtype=np.float32))
+        errores.extend((r, str(e)) for r, e in errs)
+
+    destino = os.path.join(directorio, f"fragmento_{numero:05d}.npz")
+    with open(destino + ".tmp", "wb") as f:
+        np.savez(f, rutas=np.array(rutas_ok, dtype=str),
+                 matriz=np.concatenate(bloques) if bloques else np.empty((0, 0), dtype=np.float32))
+    os.replace(destino + ".tmp", destino)
+    return destino, errores, dict(tiempos.segundos), tiempos.imagenes
+
+def repartir(rutas, n):
+    """Divide 'rutas' en n fragmentos contiguos de tamaño parecido (sin vacíos)."""
+    n = max(1, min(n, len(rutas)))
+    tam, resto = divmod(len(rutas), n)
+    fragmentos, inicio = [], 0
+    for i in range(n):
+        fin = inicio + tam + (i < resto)
+        fragmentos.append(rutas[inicio:fin])
+        inicio = fin
+    return [f for f in fragmentos if f]
+
+# =============================================================================
+# EXTRACTOR
+# =============================================================================
+
+class ExtractorFragmentado:
+    """
+    Pool de 'procesos' procesos con 'hilos' hilos cada uno que se mantiene vivo
+    entre llamadas (el modelo se carga una vez por proceso). Llamarlo con una
+    lista de rutas devuelve lotes (rutas_ok, [features | color], errores) por
+    fragmento, en el orden en que terminan.
+    """
+
+    def __init__(self, procesos=PROCESOS, hilos=None, modelo="mobilenet", backend=None,
+                 batch_size=BATCH_SIZE, prefetch=PREFETCH, reducir=DECODIFICACION_REDUCIDA,
+                 directorio=DIR_FRAGMENTOS, tiempos=None):
+        nucleos = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+        self.procesos = procesos
+        self.hilos = hilos or max(1, (nucleos or 1) // procesos)
+        self.modelo = modelo
+        self.backend = backend or backends.BACKEND
+        self.batch_size, self.prefetch, self.reducir = batch_size, prefetch, reducir
+        self.tiempos = tiempos
+        self.temporal = directorio is None
+        self.directorio = directorio or tempfile.mkdtemp(prefix="fragmentos_")
+        os.makedirs(self.directorio, exist_ok=True)
+        # spawn: cada proceso arranca limpio y carga su propio TensorFlow con los hilos fijados
+        contexto = mp.get_context("spawn")
+        self.pool = ProcessPoolExecutor(procesos, mp_context=contexto, initializer=_inicializar,
+                                        initargs=(self.hilos, contexto.Value("i", 0)))
+        self.fragmentos = 0
+        print(f"🧵 Extracción fragmentada: {procesos} procesos × {self.hilos} hilos")
+
+    def __call__(self, rutas):
+        futuros = []
+        for parte in repartir(list(rutas), self.procesos):
+            futuros.append(self.pool.submit(_extraer_fragmento, (
+                self.fragmentos, parte, self.directorio, self.modelo, self.backend, self.hilos,
+                self.batch_size, self.prefetch, self.reducir)))
+            self.fragmentos += 1
+
+        for futuro in as_completed(futuros):
+            destino, errores, segundos, imagenes = futuro.result()
+            with np.load(destino) as datos:
+                rutas_ok, matriz = datos["rutas"].tolist(), datos["matriz"]
+            if self.temporal:
+                os.remove(destino)
+            if self.tiempos is not None:
+                self.tiempos.sumar(**segundos)
+                self.tiempos.imagenes += imagenes
+            yield rutas_ok, matriz, [(r, RuntimeError(e)) for r, e in errores]
+
+    def cerrar(self):
+        self.pool.shutdown()
+        if self.temporal:
+            shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
@@ -0,0 +1,188 @@
+import io
+import os
+import time
+import threading
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+# =====================================================
+# 1. CONFIGURACIÓN
+# =====================================================
+
+TAM_ENTRADA = (224, 224)
+BATCH_SIZE = 32   # imágenes por llamada al modelo
+PREFETCH = 2      # lotes que se decodifican por adelantado
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+# JPEG: decodificar con escalado DCT (draft) cerca de 224 px. Más rápido, pero la
+# entrada de la red y el color medio ya no son los de image.load_img + cv2: las
+# medias por clase cambian un poco (medirlo con "python benchmarks.py decodificacion").
+DECODIFICACION_REDUCIDA = False
+
+def version_preprocesado(reducir=DECODIFICACION_REDUCIDA):
+    """Clave de preprocesado para la caché: cambia si cambia la decodificación."""
+    return "pil-draft-224-nearest-v1" if reducir else "pil-224-nearest-v1"
+
+# =====================================================
+# 2. CARGA PARALELA DE IMÁGENES
+# =====================================================
+
+def cargar_imagen(img_path, target_size=TAM_ENTRADA):
+    """Decodifica y redimensiona una imagen igual que image.load_img."""
+    from tensorflow.keras.preprocessing import image
+    img = image.load_img(img_path, target_size=target_size)
+    return image.img_to_array(img)
+
+def _partir(iterable, tam):
+    """Divide cualquier iterable (lista o generador) en listas de 'tam' elementos."""
+    it = iter(iterable)
+    while True:
+        trozo = list(islice(it, tam))
+        if not trozo:
+            return
+        yield trozo
+
+def iterar_lotes(rutas, batch_size=BATCH_SIZE, prefetch=PREFETCH, workers=None,
+                 cargar=cargar_imagen):
+    """
+    Recorre 'rutas' en lotes ya decodificados.
+    La decodificación corre en un pool de hilos y se adelanta 'prefetch' lotes,
+    de modo que el disco y el redimensionado se solapan con la inferencia.
+    Devuelve tuplas (rutas_ok, datos, errores) respetando el orden de entrada.
+    """
+    workers = workers or os.cpu_count() or 1
+    lotes = _partir(rutas, batch_size)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pendientes = deque()
+
+        def encolar():
+            lote = next(lotes, None)
+            if lote is not None:
+                pendientes.append((lote, [executor.submit(cargar, r) for r in lote]))
+
+        for _ in range(prefetch + 1):
+            encolar()
+
+        while pendientes:
+            lote, futuros = pendientes.popleft()
+            encolar()
+
+            rutas_ok, datos, errores = [], [], []
+            for ruta, fut in zip(lote, futuros):
+                try:
+                    datos.append(fut.result())
+                    rutas_ok.append(ruta)
+                except Exception as e:
+                    errores.append((ruta, e))
+            yield rutas_ok, datos, errores
+
+# =====================================================
+# 3. DECODIFICACIÓN ÚNICA (entrada CNN + color medio)
+# =====================================================
+
+class Tiempos:
+    """Acumula segundos por etapa; seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.segundos = defaultdict(float)
+        self.imagenes = 0
+
+    def sumar(self, **etapas):
+        with self._lock:
+            for etapa, seg in etapas.items():
+                self.segundos[etapa] += seg
+
+    def resumen(self):
+        """Texto con ms por imagen de cada etapa."""
+        n = max(self.imagenes, 1)
+        return " | ".join(f"{etapa}: {seg * 1000 / n:.2f} ms/img"
+                          for etapa, seg in self.segundos.items())
+
+def decodificar(img_path, target_size=TAM_ENTRADA, reducir=DECODIFICACION_REDUCIDA, tiempos=None):
+    """
+    Lee y decodifica el archivo una sola vez y devuelve (entrada_cnn, color_medio_rgb).
+    Con 'reducir', los JPEG se decodifican directamente a la menor escala DCT
+    (1/2, 1/4, 1/8) que sigue cubriendo target_size y el color medio se mide
+    sobre esa imagen reducida. Sin 'reducir' el resultado es el de image.load_img
+    (redimensionado NEAREST) y el color medio, el de la imagen completa.
+    """
+    from PIL import Image, ImageStat
+
+    t0 = time.perf_counter()
+    with open(img_path, "rb") as f:
+        datos = f.read()
+    t1 = time.perf_counter()
+
+    img = Image.open(io.BytesIO(datos))
+    if reducir:
+        img.draft("RGB", (target_size[1], target_size[0]))
+    img = img.convert("RGB")
+    t2 = time.perf_counter()
+
+    color = np.array(ImageStat.Stat(img).mean)  # a partir del histograma, sin copiar píxeles
+    t3 = time.perf_counter()
+
+    if img.size != (target_size[1], target_size[0]):
+        img = img.resize((target_size[1], target_size[0]), Image.NEAREST)
+    x = np.asarray(img, dtype=np.float32)
+    t4 = time.perf_counter()
+
+    if tiempos is not None:
+        tiempos.sumar(lectura=t1 - t0, decodificacion=t2 - t1, color=t3 - t2, redimension=t4 - t3)
+    return x, color
+
+def separar_color(matriz):
+    """Divide la salida [features | color RGB] en (features, colores)."""
+    return matriz[:, :-3], matriz[:, -3:]
+
+# =====================================================
+# 4. EXTRACCIÓN POR LOTES
+# =====================================================
+
+def extraer_features_lotes(rutas, model, preprocess_input, batch_size=BATCH_SIZE,
+                           prefetch=PREFETCH, workers=None, cargar=cargar_imagen):
+    """
+    Extrae características con una sola llamada model(batch) por lote.
+    Devuelve tuplas (rutas_ok, features, errores) lote a lote.
+    """
+    for rutas_ok, arrays, errores in iterar_lotes(rutas, batch_size, prefetch, workers, cargar):
+        if not rutas_ok:
+            yield rutas_ok, np.empty((0, 0), dtype=np.float32), errores
+            continue
+        x = preprocess_input(np.stack(arrays))
+        feats = np.asarray(model(x, training=False))
+        yield rutas_ok, feats, errores
+
+def listar_imagenes(carpeta, extensiones=EXTENSIONES):
+    """Lista las rutas de imágenes válidas de una carpeta (sin recursión)."""
+    return [os.path.join(carpeta, f) for f in os.listdir(carpeta)
+            if f.lower().endswith(extensiones)]
+
+def extraer_features_y_color(rutas, model, preprocess_input, batch_size=BATCH_SIZE,
+                             prefetch=PREFETCH, workers=None, reducir=DECODIFICACION_REDUCIDA,
+                             tiempos=None):
+    """
+    Como extraer_features_lotes pero decodificando cada archivo una sola vez:
+    el mismo buffer alimenta la entrada de la red y el color medio.
+    Devuelve lotes (rutas_ok, [features | color RGB], errores); usar separar_color.
+    """
+    def cargar(ruta):
+        return decodificar(ruta, reducir=reducir, tiempos=tiempos)
+
+    for rutas_ok, datos, errores in iterar_lotes(rutas, batch_size, prefetch, workers, cargar):
+        if not rutas_ok:
+            yield rutas_ok, np.empty((0, 0), dtype=np.float32), errores
+            continue
+        t0 = time.perf_counter()
+        x = preprocess_input(np.stack([d[0] for d in datos]))
+        t1 = time.perf_counter()
+        feats = np.asarray(model(x, training=False))
+        if tiempos is not None:
+            tiempos.sumar(preproceso=t1 - t0, inferencia=time.perf_counter() - t1)
+            tiempos.imagenes += len(rutas_ok)
+        colores = np.stack([d[1] for d in datos]).astype(np.float32)
+        yield rutas_ok, np.hstack([feats, colores]), errores
@@ -3,30 +3,22 @@
 # =============================================================================
 
 import os
-import base64
+import json
 from IPython.display import display, HTML
 import pandas as pd
-from PIL import Image
-import io
+from miniaturas import CacheMiniaturas, data_uri, publicar_miniaturas, podar_publicadas
 
-def generate_html_gallery(results_df, image_dir, output_file='galeria_similitud_tenis.html'):
-    """
-    Genera una galería HTML organizada por grupos de similitud
-    """
-    
-    # Agrupar por grupo de similitud
-    grouped = results_df.groupby('grupo_similitud')
-    
-    # Crear el contenido HTML usando lista de strings para evitar errores
-    html_parts = []
-    
-    html_parts.append("""<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Galería de Zapatos por Similitud</title>
-    <style>
+# "externos": miniaturas como archivos junto al HTML (<salida>_miniaturas/) con
+# loading="lazy"; "base64": un único HTML autocontenido con las imágenes incrustadas
+THUMBNAIL_ASSETS = "externos"
+
+# Imágenes por bloque al preparar miniaturas: acota la memoria con catálogos grandes
+THUMBNAIL_BLOCK = 2000
+
+# None: una sola página; N: página índice + una página cada N grupos
+CLUSTERS_PER_PAGE = None
+
+GALLERY_CSS = """
         body {
             font-family: Arial, sans-serif;
             margin: 20px;
@@ -176,104 +168,198 @@ def generate_html_gallery(results_df, image_dir, output_file='galeria_similitud_
             font-size: 12px;
             color: #666;
         }
+        .page-nav {
+            display: flex;
+            justify-content: center;
+            gap: 10px;
+        }
         @media (max-width: 768px) {
             .jump-to {
                 display: none;
             }
         }
-    </style>
+    """
+
+GALLERY_JS = """
+        // Función de búsqueda (tarjetas y nombres leídos una sola vez, con espera entre teclas)
+        const imageCards = Array.from(document.querySelectorAll('.image-card'));
+        const filenames = imageCards.map(card => card.querySelector('.filename').textContent.toLowerCase());
+        let searchTimer = null;
+        document.getElementById('searchBox').addEventListener('input', function(e) {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => {
+                const searchTerm = e.target.value.toLowerCase();
+                imageCards.forEach((card, i) => {
+                    const display = filenames[i].includes(searchTerm) ? 'block' : 'none';
+                    if (card.style.display !== display) {
+                        card.style.display = display;
+                    }
+                });
+            }, 150);
+        });
+        
+        // Smooth scroll para los enlaces
+        document.querySelectorAll('.jump-item').forEach(link => {
+            link.addEventListener('click', function(e) {
+                e.preventDefault();
+                const targetId = this.getAttribute('href');
+                document.querySelector(targetId).scrollIntoView({
+                    behavior: 'smooth'
+                });
+            });
+        });
+        
+        // Mostrar/ocultar menú de salto en scroll
+        let lastScrollTop = 0;
+        window.addEventListener('scroll', function() {
+            const jumpTo = document.getElementById('jumpTo');
+            const scrollTop = window.pageYOffset || document.documentElement.scrollTop;
+            
+            if (scrollTop > lastScrollTop) {
+                // Scrolling down
+                jumpTo.style.opacity = '0.7';
+            } else {
+                // Scrolling up
+                jumpTo.style.opacity = '1';
+            }
+            lastScrollTop = scrollTop;
+        });
+    """
+
+def thumbnail_folder(output_file):
+    """Carpeta de miniaturas externas de una página (junto al HTML)."""
+    return os.path.splitext(output_file)[0] + "_miniaturas"
+
+def thumbnail_sources(thumbs, output_file, assets=THUMBNAIL_ASSETS):
+    """
+    {ruta_imagen: src} para las etiquetas <img>: ruta relativa al HTML en modo
+    "externos", URI data: en modo "base64" (None si no hay miniatura).
+    """
+    if assets == "base64":
+        return {img_path: thumb and data_uri(thumb) for img_path, thumb in thumbs.items()}
+    if assets != "externos":
+        raise ValueError(f"Modo de miniaturas desconocido: {assets}")
+    
+    folder = thumbnail_folder(output_file)
+    prefix = os.path.basename(folder)
+    names = publicar_miniaturas(thumbs, folder)
+    return {img_path: name and f"{prefix}/{name}" for img_path, name in names.items()}
+
+def prune_thumbnails(output_file, sources, assets=THUMBNAIL_ASSETS):
+    """Borra de la carpeta de la página las miniaturas que ya no referencia."""
+    if assets == "externos":
+        podar_publicadas(thumbnail_folder(output_file),
+                         {os.path.basename(src) for src in sources if src})
+
+def cluster_statistics(results_df):
+    """Estadísticas de los grupos a partir de un único value_counts()."""
+    counts = results_df['grupo_similitud'].value_counts().sort_index()
+    total_images = int(counts.sum())
+    return {
+        'counts': counts,
+        'total_images': total_images,
+        'total_clusters': len(counts),
+        'avg_per_cluster': round(total_images / len(counts), 1) if len(counts) else 0,
+        'largest_cluster': int(counts.max()) if len(counts) else 0,
+        'single_image_clusters': int((counts == 1).sum()),
+    }
+
+def iter_cluster_thumbnails(grouped, image_dir, thumbnails, size, output_file,
+                            assets=THUMBNAIL_ASSETS, workers=None, block=THUMBNAIL_BLOCK):
+    """
+    Genera (cluster_id, [(filename, src)]) en orden de grupo, preparando las
+    miniaturas por bloques de unas 'block' imágenes en lugar de todas a la vez.
+    """
+    def flush(pending):
+        paths = [os.path.join(image_dir, f) for _, files in pending for f in files]
+        sources = thumbnail_sources(thumbnails.preparar(paths, size, workers), output_file, assets)
+        for cluster_id, files in pending:
+            yield cluster_id, [(f, sources[os.path.join(image_dir, f)]) for f in files]
+    
+    pending, count = [], 0
+    for cluster_id, group_data in grouped:
+        files = group_data['archivo'].tolist()
+        pending.append((cluster_id, files))
+        count += len(files)
+        if count >= block:
+            yield from flush(pending)
+            pending, count = [], 0
+    yield from flush(pending)
+
+def _open_page(f, title, subtitle):
+    f.write(f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>{GALLERY_CSS}</style>
 </head>
 <body>
     <div class="header">
         <h1>🧠 Galería de Zapatos por Similitud Visual</h1>
-        <p>Agrupación automática basada en características visuales - Total: """)
-    
-    # Calcular estadísticas
-    total_images = len(results_df)
-    total_clusters = len(grouped)
-    avg_per_cluster = round(total_images / total_clusters, 1)
-    largest_cluster = results_df['grupo_similitud'].value_counts().max()
-    single_image_clusters = len(results_df['grupo_similitud'].value_counts()[results_df['grupo_similitud'].value_counts() == 1])
-    
-    html_parts.append(f"""{total_images} imágenes</p>
+        <p>{subtitle}</p>
     </div>
-    
+    """)
+
+def _write_stats(f, stats):
+    f.write(f"""
     <div class="stats-bar">
         <div class="cluster-stats">
             <div class="stat-item">
-                <div class="stat-value">{total_clusters}</div>
+                <div class="stat-value">{stats['total_clusters']}</div>
                 <div class="stat-label">Grupos Totales</div>
             </div>
             <div class="stat-item">
-                <div class="stat-value">{avg_per_cluster}</div>
+                <div class="stat-value">{stats['avg_per_cluster']}</div>
                 <div class="stat-label">Promedio por Grupo</div>
             </div>
             <div class="stat-item">
-                <div class="stat-value">{largest_cluster}</div>
+                <div class="stat-value">{stats['largest_cluster']}</div>
                 <div class="stat-label">Grupo Más Grande</div>
             </div>
             <div class="stat-item">
-                <div class="stat-value">{single_image_clusters}</div>
+                <div class="stat-value">{stats['single_image_clusters']}</div>
                 <div class="stat-label">Grupos Únicos</div>
             </div>
         </div>
     </div>
-    
-    <input type="text" class="search-box" id="searchBox" placeholder="🔍 Buscar imagen por nombre...">
-    
+    """)
+
+def _write_jump_to(f, links):
+    """Menú lateral 'Saltar a grupo' con [(href, cluster_id, count)]."""
+    f.write("""
     <div class="jump-to" id="jumpTo">
         <strong>Saltar a grupo:</strong>
     """)
-    
-    # Generar enlaces rápidos para cada grupo
-    cluster_stats = results_df['grupo_similitud'].value_counts().sort_index()
-    for cluster_id in cluster_stats.index:
-        count = cluster_stats[cluster_id]
-        html_parts.append(f'<a href="#cluster-{cluster_id}" class="jump-item">Grupo {cluster_id} ({count} imágenes)</a>')
-    
-    html_parts.append("""
+    for href, cluster_id, count in links:
+        f.write(f'<a href="{href}" class="jump-item">Grupo {cluster_id} ({count} imágenes)</a>')
+    f.write("""
     </div>
     """)
-    
-    # Generar galería para cada grupo
-    for cluster_id, group_data in grouped:
-        cluster_images = group_data['archivo'].tolist()
-        
-        html_parts.append(f"""
+
+def _write_cluster(f, cluster_id, items):
+    f.write(f"""
     <div class="cluster" id="cluster-{cluster_id}">
         <div class="cluster-header">
             <div class="cluster-title">Grupo {cluster_id}</div>
-            <div class="cluster-count">{len(cluster_images)} imágenes</div>
+            <div class="cluster-count">{len(items)} imágenes</div>
         </div>
         <div class="gallery">
         """)
-        
-        images_processed = 0
-        for filename in cluster_images:
-            img_path = os.path.join(image_dir, filename)
-            
-            try:
-                # Redimensionar imagen para la galería
-                img = Image.open(img_path)
-                img.thumbnail((120, 120), Image.Resampling.LANCZOS)
-                
-                # Convertir a base64 para incrustar en HTML
-                buffered = io.BytesIO()
-                img.save(buffered, format="JPEG", quality=85)
-                img_str = base64.b64encode(buffered.getvalue()).decode()
-                
-                html_parts.append(f"""
+    
+    for filename, img_src in items:
+        if img_src is not None:
+            f.write(f"""
             <div class="image-card">
                 <div class="image-container">
-                    <img src="data:image/jpeg;base64,{img_str}" alt="{filename}">
+                    <img src="{img_src}" alt="{filename}" loading="lazy" decoding="async">
                 </div>
                 <div class="filename">{filename}</div>
             </div>
                 """)
-                images_processed += 1
-                
-            except Exception as e:
-                html_parts.append(f"""
+        else:
+            f.write(f"""
             <div class="image-card">
                 <div class="image-container" style="background: #ffebee;">
                     <div style="color: #c62828; font-size: 12px;">Error</div>
@@ -281,75 +367,148 @@ def generate_html_gallery(results_df, image_dir, output_file='galeria_similitud_
                 <div class="filename">{filename}</div>
             </div>
                 """)
-        
-        html_parts.append("""
+    
+    f.write("""
         </div>
     </div>
         """)
-    
-    # Añadir JavaScript para funcionalidad de búsqueda
-    html_parts.append("""
-    <script>
-        // Función de búsqueda
-        document.getElementById('searchBox').addEventListener('input', function(e) {
-            const searchTerm = e.target.value.toLowerCase();
-            const imageCards = document.querySelectorAll('.image-card');
-            
-            imageCards.forEach(card => {
-                const filename = card.querySelector('.filename').textContent.toLowerCase();
-                if (filename.includes(searchTerm)) {
-                    card.style.display = 'block';
-                } else {
-                    card.style.display = 'none';
-                }
-            });
-        });
-        
-        // Smooth scroll para los enlaces
-        document.querySelectorAll('.jump-item').forEach(link => {
-            link.addEventListener('click', function(e) {
-                e.preventDefault();
-                const targetId = this.getAttribute('href');
-                document.querySelector(targetId).scrollIntoView({
-                    behavior: 'smooth'
-                });
-            });
-        });
-        
-        // Mostrar/ocultar menú de salto en scroll
-        let lastScrollTop = 0;
-        window.addEventListener('scroll', function() {
-            const jumpTo = document.getElementById('jumpTo');
-            const scrollTop = window.pageYOffset || document.documentElement.scrollTop;
-            
-            if (scrollTop > lastScrollTop) {
-                // Scrolling down
-                jumpTo.style.opacity = '0.7';
-            } else {
-                // Scrolling up
-                jumpTo.style.opacity = '1';
-            }
-            lastScrollTop = scrollTop;
-        });
-    </script>
+
+def _close_page(f, search=True):
+    if search:
+        f.write(f"""
+    <script>{GALLERY_JS}</script>""")
+    f.write("""
 </body>
 </html>
     """)
+
+def _page_file(output_file, number):
+    stem, ext = os.path.splitext(output_file)
+    return f"{stem}_p{number:04d}{ext}"
+
+def _remove_stale_pages(output_file, written):
+    """Borra las páginas de una ejecución anterior que ya no existen."""
+    stem, ext = os.path.splitext(output_file)
+    folder = os.path.dirname(stem) or "."
+    prefix = os.path.basename(stem) + "_p"
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if (name.startswith(prefix) and name.endswith(ext)
+                and name[len(prefix):-len(ext)].isdigit() and path not in written):
+            os.remove(path)
+
+def generate_html_gallery(results_df, image_dir, output_file='galeria_similitud_tenis.html',
+                          thumbnails=None, workers=None, assets=THUMBNAIL_ASSETS,
+                          clusters_per_page=CLUSTERS_PER_PAGE):
+    """
+    Genera una galería HTML organizada por grupos de similitud.
     
-    # Unir todas las partes y guardar
-    html_content = ''.join(html_parts)
-    
-    # Guardar archivo HTML
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    print(f"✅ Galería generada: {output_file} ({total_images} imágenes, {total_clusters} grupos)")
+    El HTML se escribe directamente a disco grupo a grupo. Con
+    'clusters_per_page' la salida se divide en una página índice
+    (output_file) y una página cada N grupos (<salida>_p0001.html, ...).
+    """
+    thumbnails = thumbnails or CacheMiniaturas()
+    stats = cluster_statistics(results_df)
+    counts = stats['counts']
+    grouped = results_df.groupby('grupo_similitud')
+    clusters = iter_cluster_thumbnails(grouped, image_dir, thumbnails, 120, output_file,
+                                       assets, workers)
+    used = []  # miniaturas referenciadas, para podar la carpeta al final
+    
+    if not clusters_per_page:
+        with open(output_file + '.tmp', 'w', encoding='utf-8') as f:
+            _open_page(f, "Galería de Zapatos por Similitud",
+                       f"Agrupación automática basada en características visuales - Total: {stats['total_images']} imágenes")
+            _write_stats(f, stats)
+            f.write("""
+    <input type="text" class="search-box" id="searchBox" placeholder="🔍 Buscar imagen por nombre...">
+    """)
+            _write_jump_to(f, [(f"#cluster-{c}", c, n) for c, n in counts.items()])
+            for cluster_id, items in clusters:
+                _write_cluster(f, cluster_id, items)
+                used.extend(src for _, src in items)
+            _close_page(f)
+        os.replace(output_file + '.tmp', output_file)
+        prune_thumbnails(output_file, used, assets)
+        print(f"✅ Galería generada: {output_file} ({stats['total_images']} imágenes, {stats['total_clusters']} grupos)")
+        return output_file
+    
+    # Reparto de grupos en páginas (counts está ordenado igual que groupby)
+    cluster_ids = counts.index.tolist()
+    pages = [cluster_ids[i:i + clusters_per_page] for i in range(0, len(cluster_ids), clusters_per_page)]
+    page_of = {c: n for n, page in enumerate(pages, 1) for c in page}
+    
+    # Página índice: estadísticas y enlaces a cada grupo, sin imágenes
+    with open(output_file + '.tmp', 'w', encoding='utf-8') as f:
+        _open_page(f, "Galería de Zapatos por Similitud",
+                   f"Agrupación automática basada en características visuales - Total: {stats['total_images']} imágenes en {len(pages)} páginas")
+        _write_stats(f, stats)
+        for n, page in enumerate(pages, 1):
+            page_name = os.path.basename(_page_file(output_file, n))
+            f.write(f"""
+    <div class="cluster">
+        <div class="cluster-header">
+            <div class="cluster-title"><a href="{page_name}">Página {n}</a></div>
+            <div class="cluster-count">{int(counts[page].sum())} imágenes</div>
+        </div>
+        <div class="cluster-stats">""")
+            for cluster_id in page:
+                f.write(f'<a href="{page_name}#cluster-{cluster_id}" class="jump-item">Grupo {cluster_id} ({counts[cluster_id]} imágenes)</a>')
+            f.write("""
+        </div>
+    </div>
+    """)
+        _close_page(f, search=False)
+    os.replace(output_file + '.tmp', output_file)
+    
+    # Una página por cada bloque de grupos; solo se mantiene abierto un archivo
+    index_name = os.path.basename(output_file)
+    written, f, current = set(), None, None
+    
+    def finish(f, number):
+        _close_page(f)
+        f.close()
+        os.replace(f.name, _page_file(output_file, number))
+    
+    for cluster_id, items in clusters:
+        number = page_of[cluster_id]
+        if number != current:
+            if f is not None:
+                finish(f, current)
+            current = number
+            page_path = _page_file(output_file, number)
+            written.add(page_path)
+            nav = [f'<a href="{index_name}" class="jump-item">Índice</a>']
+            if number > 1:
+                nav.append(f'<a href="{os.path.basename(_page_file(output_file, number - 1))}" class="jump-item">← Anterior</a>')
+            if number < len(pages):
+                nav.append(f'<a href="{os.path.basename(_page_file(output_file, number + 1))}" class="jump-item">Siguiente →</a>')
+            f = open(page_path + '.tmp', 'w', encoding='utf-8')
+            _open_page(f, f"Galería de Zapatos por Similitud - Página {number}",
+                       f"Página {number} de {len(pages)} - {int(counts[pages[number - 1]].sum())} imágenes")
+            f.write(f"""
+    <div class="page-nav">{''.join(nav)}</div>
+    <input type="text" class="search-box" id="searchBox" placeholder="🔍 Buscar imagen por nombre en esta página...">
+    """)
+            _write_jump_to(f, [(f"#cluster-{c}", c, counts[c]) for c in pages[number - 1]])
+        _write_cluster(f, cluster_id, items)
+        used.extend(src for _, src in items)
+    if f is not None:
+        finish(f, current)
+    
+    _remove_stale_pages(output_file, written)
+    prune_thumbnails(output_file, used, assets)
+    print(f"✅ Galería generada: {output_file} ({stats['total_images']} imágenes, "
+          f"{stats['total_clusters']} grupos, {len(pages)} páginas)")
     return output_file
 
-def generate_comparison_html(results_df, image_dir, output_file='comparacion_grupos_tenis.html'):
+
+def generate_comparison_html(results_df, image_dir, output_file='comparacion_grupos_tenis.html',
+                             thumbnails=None, workers=None, assets=THUMBNAIL_ASSETS):
     """
     Genera una página HTML para comparar grupos lado a lado
     """
+    thumbnails = thumbnails or CacheMiniaturas()
     
     grouped = results_df.groupby('grupo_similitud')
     
@@ -440,6 +599,10 @@ def generate_comparison_html(results_df, image_dir, output_file='comparacion_gru
     <div class="comparison-grid">
     """)
     
+    thumbs = thumbnails.preparar([os.path.join(image_dir, f)
+                                  for _, g in grouped for f in g['archivo'].tolist()[:12]], 100, workers)
+    sources = thumbnail_sources(thumbs, output_file, assets)
+    
     # Generar sección para cada grupo
     for cluster_id, group_data in grouped:
         cluster_images = group_data['archivo'].tolist()[:12]  # Máximo 12 imágenes por grupo
@@ -454,14 +617,10 @@ def generate_comparison_html(results_df, image_dir, output_file='comparacion_gru
             img_path = os.path.join(image_dir, filename)
             
             try:
-                img = Image.open(img_path)
-                img.thumbnail((100, 100), Image.Resampling.LANCZOS)
-                
-                buffered = io.BytesIO()
-                img.save(buffered, format="JPEG", quality=85)
-                img_str = base64.b64encode(buffered.getvalue()).decode()
-                
-                html_parts.append(f'<img src="data:image/jpeg;base64,{img_str}" class="comparison-img" title="{filename}">')
+                img_src = sources[img_path]
+                if img_src is None:
+                    raise OSError(f"No se pudo generar la miniatura de {img_path}")
+                html_parts.append(f'<img src="{img_src}" class="comparison-img" title="{filename}" loading="lazy" decoding="async">')
             except:
                 html_parts.append(f'<div style="width:80px;height:80px;background:#eee;display:flex;align-items:center;justify-content:center;border-radius:5px;font-size:10px;">Error</div>')
         
@@ -490,12 +649,168 @@ def generate_comparison_html(results_df, image_dir, output_file='comparacion_gru
     
     html_content = ''.join(html_parts)
     
+    prune_thumbnails(output_file, sources.values(), assets)
+    
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(html_content)
     
     print(f"✅ Comparación generada: {output_file}")
     return output_file
 
+# =============================================================================
+# BUSCADOR CON ÍNDICE PRECALCULADO Y SCROLL VIRTUAL
+# =============================================================================
+
+SEARCH_CSS = """
+        .virtual-scroll {
+            position: relative;
+            height: 75vh;
+            overflow-y: auto;
+            background: #f8f9fa;
+            border-radius: 10px;
+        }
+        .virtual-scroll .image-card {
+            position: absolute;
+            width: 140px;
+            height: 170px;
+            box-sizing: border-box;
+        }
+        .virtual-scroll .image-card:hover {
+            transform: none;
+        }
+        .cluster-tag {
+            font-size: 11px;
+            color: #667eea;
+            font-weight: bold;
+        }
+    """
+
+SEARCH_JS = """
+        const datos = window.GALERIA_INDICE;
+        const imagenes = datos.imagenes;  // [archivo, grupo, miniatura]
+        const nombres = imagenes.map(img => img[0].toLowerCase());
+        const ALTO_FILA = 180, ANCHO_CELDA = 150, FILAS_EXTRA = 3;
+        
+        const contenedor = document.getElementById('resultados');
+        const relleno = document.getElementById('relleno');
+        const contador = document.getElementById('contador');
+        let visibles = imagenes.map((_, i) => i);
+        
+        function escapar(texto) {
+            return String(texto).replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+        }
+        
+        // Solo se pintan las filas que están en pantalla (más unas pocas de margen)
+        function pintar() {
+            const columnas = Math.max(1, Math.floor(contenedor.clientWidth / ANCHO_CELDA));
+            const totalFilas = Math.ceil(visibles.length / columnas);
+            relleno.style.height = (totalFilas * ALTO_FILA) + 'px';
+            const primera = Math.max(0, Math.floor(contenedor.scrollTop / ALTO_FILA) - FILAS_EXTRA);
+            const ultima = Math.min(totalFilas, Math.ceil((contenedor.scrollTop + contenedor.clientHeight) / ALTO_FILA) + FILAS_EXTRA);
+            const html = [];
+            for (let fila = primera; fila < ultima; fila++) {
+                for (let col = 0; col < columnas; col++) {
+                    const k = fila * columnas + col;
+                    if (k >= visibles.length) break;
+                    const [archivo, grupo, miniatura] = imagenes[visibles[k]];
+                    const imagen = miniatura
+                        ? `<img src="${escapar(datos.prefijo + miniatura)}" alt="${escapar(archivo)}" decoding="async">`
+                        : '<div style="color: #c62828; font-size: 12px;">Error</div>';
+                    html.push(`<div class="image-card" style="top: ${fila * ALTO_FILA}px; left: ${col * ANCHO_CELDA}px">
+                        <div class="image-container">${imagen}</div>
+                        <div class="cluster-tag">Grupo ${grupo}</div>
+                        <div class="filename">${escapar(archivo)}</div>
+                    </div>`);
+                }
+            }
+            relleno.innerHTML = html.join('');
+        }
+        
+        // "grupo:12" filtra por grupo; cualquier otro texto busca en el nombre del archivo
+        function buscar(texto) {
+            const consulta = texto.trim().toLowerCase();
+            const porGrupo = consulta.match(/^grupo:\\s*(\\S+)$/);
+            visibles = [];
+            for (let i = 0; i < imagenes.length; i++) {
+                if (porGrupo ? String(imagenes[i][1]) === porGrupo[1] : nombres[i].includes(consulta)) {
+                    visibles.push(i);
+                }
+            }
+            contador.textContent = `${visibles.length} de ${imagenes.length} imágenes`;
+            contenedor.scrollTop = 0;
+            pintar();
+        }
+        
+        let espera = null;
+        document.getElementById('searchBox').addEventListener('input', function(e) {
+            clearTimeout(espera);
+            espera = setTimeout(() => buscar(e.target.value), 150);
+        });
+        
+        let pendiente = false;
+        function programarPintado() {
+            if (!pendiente) {
+                pendiente = true;
+                requestAnimationFrame(() => { pendiente = false; pintar(); });
+            }
+        }
+        contenedor.addEventListener('scroll', programarPintado);
+        window.addEventListener('resize', programarPintado);
+        buscar('');
+    """
+
+def search_index_file(output_file):
+    """Índice de búsqueda (.js) de una página: se carga con <script> y funciona desde file://."""
+    return os.path.splitext(output_file)[0] + "_indice.js"
+
+def generate_search_page(results_df, image_dir, output_file='buscador_tenis.html',
+                         thumbnails=None, workers=None):
+    """
+    Genera una página de búsqueda sobre un índice precalculado
+    (archivo, grupo, miniatura) que pinta solo las filas visibles.
+    
+    El índice se escribe en streaming como <salida>_indice.js
+    (window.GALERIA_INDICE = {...}); las miniaturas siempre son externas.
+    """
+    thumbnails = thumbnails or CacheMiniaturas()
+    grouped = results_df.groupby('grupo_similitud')
+    index_file = search_index_file(output_file)
+    used = []
+    
+    with open(index_file + '.tmp', 'w', encoding='utf-8') as f:
+        prefix = os.path.basename(thumbnail_folder(output_file)) + "/"
+        f.write(f'window.GALERIA_INDICE = {{"prefijo": {json.dumps(prefix)}, "imagenes": [\n')
+        first = True
+        for cluster_id, items in iter_cluster_thumbnails(grouped, image_dir, thumbnails, 120,
+                                                         output_file, "externos", workers):
+            cluster = cluster_id.item() if hasattr(cluster_id, 'item') else cluster_id
+            for filename, img_src in items:
+                name = img_src and os.path.basename(img_src)
+                f.write(("" if first else ",\n") + json.dumps([filename, cluster, name], ensure_ascii=False))
+                first = False
+                used.append(img_src)
+        f.write("\n]};\n")
+    os.replace(index_file + '.tmp', index_file)
+    prune_thumbnails(output_file, used, "externos")
+    
+    with open(output_file + '.tmp', 'w', encoding='utf-8') as f:
+        _open_page(f, "Buscador de Zapatos por Similitud",
+                   f"Búsqueda sobre {len(results_df)} imágenes en {len(grouped)} grupos - escribe parte del nombre o <code>grupo:N</code>")
+        f.write(f"""
+    <style>{SEARCH_CSS}</style>
+    <input type="text" class="search-box" id="searchBox" placeholder="🔍 Buscar imagen por nombre o grupo:N...">
+    <div class="stats-bar" id="contador"></div>
+    <div class="virtual-scroll" id="resultados">
+        <div id="relleno" style="position: relative;"></div>
+    </div>
+    <script src="{os.path.basename(index_file)}"></script>
+    <script>{SEARCH_JS}</script>""")
+        _close_page(f, search=False)
+    os.replace(output_file + '.tmp', output_file)
+    
+    print(f"✅ Buscador generado: {output_file} (índice: {index_file})")
+    return output_file
+
 # =============================================================================
 # EJECUCIÓN PRINCIPAL - CÓDIGO CORREGIDO
 # =============================================================================
@@ -528,11 +843,18 @@ def main():
     print("🖼️ Generando galerías HTML...")
     
     try:
+        # Todas las páginas comparten la caché de miniaturas en disco
+        thumbnails = CacheMiniaturas()
+        
         # Generar galería principal
-        galeria_file = generate_html_gallery(results_df, IMAGE_DIR)
+        galeria_file = generate_html_gallery(results_df, IMAGE_DIR, thumbnails=thumbnails)
         
         # Generar página de comparación
-        comparacion_file = generate_comparison_html(results_df, IMAGE_DIR)
+        comparacion_file = generate_comparison_html(results_df, IMAGE_DIR, thumbnails=thumbnails)
+        
+        # Generar buscador con índice precalculado
+        buscador_file = generate_search_page(results_df, IMAGE_DIR, thumbnails=thumbnails)
+        print(f"🖼️ Miniaturas: {thumbnails.resumen()}")
         
         # Mostrar enlaces en el notebook
         display(HTML(f"""
@@ -540,6 +862,7 @@ def main():
             <h3 style="color: #2e7d32; margin-top: 0;">🎉 ¡Galerías HTML Generadas Exitosamente!</h3>
             <p><strong>📁 Galería Principal:</strong> <a href="{galeria_file}" target="_blank" style="color: #2196f3; text-decoration: none; font-weight: bold;">{galeria_file}</a></p>
             <p><strong>🔍 Página de Comparación:</strong> <a href="{comparacion_file}" target="_blank" style="color: #2196f3; text-decoration: none; font-weight: bold;">{comparacion_file}</a></p>
+            <p><strong>🔎 Buscador:</strong> <a href="{buscador_file}" target="_blank" style="color: #2196f3; text-decoration: none; font-weight: bold;">{buscador_file}</a></p>
             <p style="margin-top: 15px; color: #555; font-size: 14px;">
                 💡 <strong>Instrucciones:</strong> Haz clic en los enlaces para abrir en tu navegador. 
                 La galería principal te permite explorar cada grupo en detalle, mientras que la página de comparación 
@@ -1,19 +1,28 @@
 import os
 import numpy as np
-import cv2
-from tensorflow.keras.preprocessing import image
-from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2, preprocess_input
+from extraccion_lotes import (extraer_features_y_color, separar_color, cargar_imagen,
+                              listar_imagenes, version_preprocesado, Tiempos,
+                              BATCH_SIZE, PREFETCH, DECODIFICACION_REDUCIDA)
+from cache_embeddings import (CacheEmbeddings, extraer_con_cache,
+                              MODELO_MOBILENET, MODELO_MOBILENET_COLOR, TAM_VENTANA)
+from modelos import obtener_mobilenet, preprocess_mobilenet
+from backends import obtener_backend, clave_modelo, nombre_backend
+from almacen_features import (guardar_almacen, cargar_almacen, actualizar_almacen, firma_archivo,
+                              ALMACEN_DIR)
+from duplicados import colapsar_duplicados, UMBRAL as UMBRAL_DUPLICADOS
+from extraccion_fragmentada import ExtractorFragmentado, PROCESOS
+from puntos_control import PuntosControl, directorio_puntos, firma_carpeta
 
 # =====================================================
 # 1. CONFIGURACIÓN
 # =====================================================
 
 DATASET_DIR = "tenis_dataset"  # cambia si tu carpeta tiene otro nombre
+DEDUPLICAR = True  # los casi-duplicados de una misma clase cuentan una sola vez en la media
+# PROCESOS (extraccion_fragmentada): con más de 1, la extracción se reparte en varios procesos
+# Cada clase terminada se guarda en <almacen>.parcial/ (puntos_control); --resume las reutiliza
 
-# Cargar modelo de características
-print("🧠 Cargando modelo MobileNetV2...")
-model = MobileNetV2(weights='imagenet', include_top=False, pooling='avg')
-print("✅ Modelo cargado correctamente.\n")
+# El modelo MobileNetV2 se carga la primera vez que se usa (modelos.obtener_mobilenet)
 
 # =====================================================
 # 2. FUNCIONES AUXILIARES
@@ -21,15 +30,14 @@ print("✅ Modelo cargado correctamente.\n")
 
 def extraer_features(img_path):
     """Extrae las características profundas (feature vector) de una imagen."""
-    img = image.load_img(img_path, target_size=(224, 224))
-    x = image.img_to_array(img)
-    x = np.expand_dims(x, axis=0)
-    x = preprocess_input(x)
-    feat = model.predict(x, verbose=0)
+    x = np.expand_dims(cargar_imagen(img_path), axis=0)
+    x = preprocess_mobilenet(x)
+    feat = obtener_mobilenet().predict(x, verbose=0)
     return feat[0]
 
 def promedio_color(img_path):
     """Calcula el color promedio RGB de la imagen."""
+    import cv2
     img = cv2.imread(img_path)
     if img is None:
         raise ValueError(f"No se pudo leer la imagen: {img_path}")
@@ -37,59 +45,291 @@ def promedio_color(img_path):
     mean_color = img.mean(axis=(0,1))
     return mean_color
 
+def listar_dataset(dataset_dir):
+    """
+    Lista plana (ruta → clase) para formar lotes que crucen carpetas pequeñas.
+    Devuelve (clases, {ruta: clase}).
+    """
+    clase_de = {}
+    clases = []
+    for class_name in os.listdir(dataset_dir):
+        class_path = os.path.join(dataset_dir, class_name)
+        if not os.path.isdir(class_path):
+            continue
+        clases.append(class_name)
+        for path in listar_imagenes(class_path):
+            clase_de[path] = class_name
+    return clases, clase_de
+
+def deduplicar_clases(clase_de, umbral=UMBRAL_DUPLICADOS, usar_cache=True):
+    """
+    Quita los casi-duplicados dentro de cada clase. Devuelve ({ruta: clase}, {dup: representante}).
+    Con usar_cache, los hashes perceptuales salen de la caché si el archivo no ha cambiado.
+    """
+    por_clase = {}
+    for path, class_name in clase_de.items():
+        por_clase.setdefault(class_name, []).append(path)
+    duplicado_de = {}
+    cache = CacheEmbeddings() if usar_cache else None
+    for rutas_clase in por_clase.values():
+        duplicado_de.update(colapsar_duplicados(sorted(rutas_clase), umbral, informe=False,
+                                                cache=cache)[1])
+    if cache:
+        cache.cerrar()
+
+    grupos = len(set(duplicado_de.values()))
+    print(f"🔁 Duplicados: {len(duplicado_de)} imágenes repetidas en {grupos} grupos "
+          f"→ se evitan {len(duplicado_de)} de {len(clase_de)} pasadas de la CNN")
+    return {p: c for p, c in clase_de.items() if p not in duplicado_de}, duplicado_de
+
+def extraer_rutas(rutas, batch_size=BATCH_SIZE, prefetch=PREFETCH, workers=None,
+                  usar_cache=True, reducir=DECODIFICACION_REDUCIDA, tiempos=None, procesos=PROCESOS,
+                  al_lote=None):
+    """
+    Features y color de cada ruta con caché. Devuelve ({ruta: feat}, {ruta: color}).
+    Con procesos > 1, lo que no está en la caché se reparte entre varios procesos.
+    'al_lote(rutas_ok, feats, cols, errores)' se llama después de cada lote.
+    """
+    tiempos = tiempos if tiempos is not None else Tiempos()
+    fragmentado = (ExtractorFragmentado(procesos, batch_size=batch_size, prefetch=prefetch,
+                                        reducir=reducir, tiempos=tiempos) if procesos > 1 else None)
+
+    def extraer(rutas):
+        if fragmentado:
+            return fragmentado(rutas)
+        return extraer_features_y_color(rutas, obtener_backend("mobilenet"), preprocess_mobilenet,
+                                        batch_size, prefetch, workers, reducir, tiempos)
+
+    cache = CacheEmbeddings() if usar_cache else None
+    if cache:
+        lotes = extraer_con_cache(list(rutas), extraer, cache,
+                                  clave_modelo(MODELO_MOBILENET_COLOR, nombre_backend()),
+                                  version_preprocesado(reducir), TAM_VENTANA * max(procesos, 1))
+    else:
+        lotes = extraer(list(rutas))
+
+    # Cada archivo se decodifica una sola vez: features y color salen del mismo buffer
+    feat_de, color_de = {}, {}
+    try:
+        for rutas_ok, matriz, errores in lotes:
+            for path, e in errores:
+                print(f"⚠️ Error procesando {path}: {e}")
+            feats, cols = separar_color(matriz)
+            feat_de.update(zip(rutas_ok, feats))
+            color_de.update(zip(rutas_ok, cols))
+            if al_lote:
+                al_lote(rutas_ok, feats, cols, errores)
+    finally:
+        if fragmentado:
+            fragmentado.cerrar()
+
+    if tiempos.imagenes:
+        print(f"⏱️ {tiempos.resumen()}")
+    if cache:
+        print(f"📦 Caché: {cache.aciertos} vectores reutilizados, {cache.fallos} calculados\n")
+        cache.cerrar()
+    return feat_de, color_de
+
 # =====================================================
 # 3. RECORRER EL DATASET
 # =====================================================
 
-def generar_vectores(dataset_dir=DATASET_DIR):
-    tenis_features = {}
-    tenis_colors = {}
-
+def generar_vectores(dataset_dir=DATASET_DIR, batch_size=BATCH_SIZE, prefetch=PREFETCH,
+                     workers=None, usar_cache=True, almacen_dir=ALMACEN_DIR, dtype=np.float32,
+                     reducir=DECODIFICACION_REDUCIDA, deduplicar=DEDUPLICAR, tiempos=None,
+                     procesos=PROCESOS, reanudar=False):
+    """
+    Extrae todo el dataset y escribe el almacén. Cada clase se guarda en un
+    punto de control al terminar; con reanudar=True las clases cuya carpeta
+    no ha cambiado desde el último intento no se vuelven a extraer.
+    """
     if not os.path.exists(dataset_dir):
         print(f"❌ No se encontró la carpeta: {dataset_dir}")
         return
 
     print(f"📂 Recorriendo carpeta principal: {dataset_dir}\n")
+    clases, clase_de = listar_dataset(dataset_dir)
+    firma_de = {p: firma_archivo(p) for p in clase_de}  # antes de extraer: si cambia después, se detecta
+    imagenes_de = {c: [] for c in clases}
+    for path, class_name in clase_de.items():
+        imagenes_de[class_name].append(path)
 
-    for class_name in os.listdir(dataset_dir):
-        class_path = os.path.join(dataset_dir, class_name)
-        if not os.path.isdir(class_path):
-            continue
+    configuracion = (f"{clave_modelo(MODELO_MOBILENET_COLOR, nombre_backend())}|"
+                     f"{version_preprocesado(reducir)}|{deduplicar}")
+    firmas = {c: firma_carpeta(imagenes_de[c], configuracion) for c in clases}
+    puntos = PuntosControl(directorio_puntos(almacen_dir), reanudar)
 
-        feats, cols = [], []
+    # bloques[clase] = (rutas, vectores, colores) de las clases ya terminadas
+    bloques = {}
+    if reanudar:
+        for class_name in clases:
+            guardado = puntos.cargar(class_name, firmas[class_name])
+            if guardado is not None:
+                bloques[class_name] = guardado
+        print(f"⏭️ Reanudando: {len(bloques)} de {len(clases)} clases sin cambios desde el último intento")
 
-        for fname in os.listdir(class_path):
-            if fname.lower().endswith((".jpg", ".jpeg", ".png")):
-                path = os.path.join(class_path, fname)
-                try:
-                    feats.append(extraer_features(path))
-                    cols.append(promedio_color(path))
-                except Exception as e:
-                    print(f"⚠️ Error procesando {path}: {e}")
+    clase_de = {p: c for p, c in clase_de.items() if c not in bloques}
+    if deduplicar:
+        clase_de, _ = deduplicar_clases(clase_de, usar_cache=usar_cache)
 
-        if len(feats) == 0:
+    # La clase se guarda cuando ha salido (bien o con error) su última imagen
+    faltan = {c: 0 for c in clases if c not in bloques}
+    for class_name in clase_de.values():
+        faltan[class_name] += 1
+    parciales = {c: ([], [], []) for c in faltan}
+
+    def terminar(class_name):
+        rutas_clase, feats, cols = parciales.pop(class_name)
+        bloques[class_name] = (rutas_clase,
+                               np.array(feats, dtype=np.float32) if feats else np.empty((0, 0), np.float32),
+                               np.array(cols, dtype=np.float32) if cols else np.empty((0, 3), np.float32))
+        if rutas_clase:
+            # una clase sin ninguna imagen válida no se da por terminada: --resume la reintenta
+            puntos.guardar(class_name, firmas[class_name], *bloques[class_name])
+            print(f"✅ Procesadas {len(rutas_clase)} imágenes para {class_name}")
+
+    def al_lote(rutas_ok, feats, cols, errores):
+        for path, feat, col in zip(rutas_ok, feats, cols):
+            rutas_clase, feats_clase, cols_clase = parciales[clase_de[path]]
+            rutas_clase.append(path)
+            feats_clase.append(feat)
+            cols_clase.append(col)
+        for path in list(rutas_ok) + [p for p, _ in errores]:
+            faltan[clase_de[path]] -= 1
+            if faltan[clase_de[path]] == 0:
+                terminar(clase_de[path])
+
+    for class_name in [c for c, n in faltan.items() if n == 0]:
+        terminar(class_name)
+    try:
+        extraer_rutas(clase_de, batch_size, prefetch, workers, usar_cache, reducir, tiempos,
+                      procesos, al_lote)
+    except KeyboardInterrupt:
+        print(f"\n⏸️ Interrumpido: {len(bloques)} de {len(clases)} clases guardadas en "
+              f"{puntos.directorio}/")
+        print("   Continúa con: python generar_vectores.py --resume")
+        raise
+    for class_name in list(parciales):  # por si alguna ruta no llegó a salir de la extracción
+        terminar(class_name)
+
+    # Unión final: vectores por imagen + centroides, sin pickle
+    nombres, clase_idx = [], []
+    rutas, vectores, colores = [], [], []
+    for class_name in clases:
+        rutas_clase, feats, cols = bloques[class_name]
+
+        if len(rutas_clase) == 0:
             print(f"⚠️ Carpeta vacía o sin imágenes válidas: {class_name} → se omite.")
             continue
 
-        feats = np.array(feats)
-        cols = np.array(cols)
-
-        tenis_features[class_name] = feats.mean(axis=0)
-        tenis_colors[class_name] = cols.mean(axis=0)
+        clase_idx.extend([len(nombres)] * len(rutas_clase))
+        nombres.append(class_name)
+        rutas.extend(rutas_clase)
+        vectores.append(feats)
+        colores.append(cols)
 
-        print(f"✅ Procesadas {len(feats)} imágenes para {class_name}")
+    if not nombres:
+        print("❌ No se procesó ninguna imagen.")
+        return
 
-    # Guardar resultados
-    np.save("tenis_features.npy", tenis_features)
-    np.save("tenis_colors.npy", tenis_colors)
-    print("\n💾 Archivos guardados:")
-    print(" - tenis_features.npy")
-    print(" - tenis_colors.npy")
+    vectores = np.concatenate(vectores)
+    colores = np.concatenate(colores)
+    guardar_almacen(nombres, rutas, clase_idx, vectores, colores, almacen_dir,
+                    dtype=dtype, modelo=clave_modelo(MODELO_MOBILENET, nombre_backend()),
+                    firmas=[firma_de[p] for p in rutas])
+    puntos.eliminar()
+    print(f"\n💾 Almacén guardado en: {almacen_dir}/")
+    print(f" - {len(rutas)} vectores por imagen ({np.dtype(dtype).name})")
+    print(f" - {len(nombres)} centroides de clase")
     print("\n✅ Vectores promedio creados correctamente.")
 
+def actualizar_vectores(dataset_dir=DATASET_DIR, almacen_dir=ALMACEN_DIR, renombrar=None,
+                        batch_size=BATCH_SIZE, prefetch=PREFETCH, workers=None,
+                        usar_cache=True, reducir=DECODIFICACION_REDUCIDA, deduplicar=DEDUPLICAR,
+                        procesos=PROCESOS):
+    """
+    Sincroniza el almacén con el dataset extrayendo solo las fotos nuevas o
+    modificadas. Las carpetas renombradas (mismos archivos, otro nombre) se
+    detectan solas; 'renombrar' permite indicarlas explícitamente.
+    """
+    almacen = cargar_almacen(almacen_dir)
+    if almacen is None:
+        print("ℹ️ No hay almacén previo: se genera completo.")
+        return generar_vectores(dataset_dir, batch_size, prefetch, workers, usar_cache,
+                                almacen_dir, reducir=reducir, deduplicar=deduplicar)
+
+    clases, clase_de = listar_dataset(dataset_dir)
+    if deduplicar:
+        # Los hashes de miniaturas son baratos; así el almacén sigue sin duplicados
+        clase_de, _ = deduplicar_clases(clase_de, usar_cache=usar_cache)
+    archivos_disco = {c: set() for c in clases}
+    for path, c in clase_de.items():
+        archivos_disco[c].add(os.path.basename(path))
+    archivos_almacen = {c: set() for c in almacen.clases}
+    for path, i in zip(almacen.rutas, almacen.clase_idx):
+        archivos_almacen[almacen.clases[i]].add(os.path.basename(path))
+
+    renombrar = dict(renombrar or {})
+    desaparecidas = [c for c in almacen.clases if c not in archivos_disco and c not in renombrar]
+    nuevas = [c for c in clases if c not in archivos_almacen and c not in renombrar.values()]
+    for vieja in desaparecidas:
+        for nueva in nuevas:
+            if archivos_almacen[vieja] and archivos_almacen[vieja] == archivos_disco[nueva]:
+                renombrar[vieja] = nueva
+                nuevas.remove(nueva)
+                break
+    for vieja, nueva in renombrar.items():
+        print(f"🔁 Clase renombrada: {vieja} → {nueva}")
+
+    # Rutas del almacén con los nombres nuevos ya aplicados → (tamaño, mtime_ns) al extraerlas
+    en_almacen = {}
+    for path, i, firma in zip(almacen.rutas, almacen.clase_idx, almacen.firmas()):
+        vieja = almacen.clases[i]
+        if vieja in renombrar:
+            carpeta, archivo = os.path.split(path)
+            path = os.path.join(os.path.dirname(carpeta), renombrar[vieja], archivo)
+        en_almacen[path] = tuple(int(x) for x in firma)
+
+    # Se vuelve a extraer lo que cambió de tamaño o de mtime (aunque el mtime sea más antiguo).
+    # Los almacenes sin firmas guardadas comparan con la fecha de escritura del almacén.
+    escrito = os.path.getmtime(os.path.join(almacen_dir, "indice.json"))
+    firma_de = {p: firma_archivo(p) for p in clase_de}
+
+    def cambiada(path):
+        if path not in en_almacen:
+            return True
+        if en_almacen[path] == (0, 0):
+            return firma_de[path][1] / 1e9 > escrito
+        return firma_de[path] != en_almacen[path]
+
+    agregar = [p for p in clase_de if cambiada(p)]
+    eliminar = [p for p in en_almacen if p not in clase_de]
+    if not (agregar or eliminar or renombrar):
+        print("✅ El almacén ya está al día.")
+        return
+
+    print(f"➕ {len(agregar)} imágenes nuevas o modificadas | ➖ {len(eliminar)} eliminadas")
+    feat_de, color_de = extraer_rutas(agregar, batch_size, prefetch, workers, usar_cache, reducir,
+                                      procesos=procesos)
+    rutas_ok = [p for p in agregar if p in feat_de]
+    nuevas_imagenes = (rutas_ok, [clase_de[p] for p in rutas_ok],
+                       np.array([feat_de[p] for p in rutas_ok], dtype=np.float32),
+                       np.array([color_de[p] for p in rutas_ok], dtype=np.float32),
+                       [firma_de[p] for p in rutas_ok])
+    actualizar_almacen(almacen, nuevas_imagenes, eliminar, renombrar)
+    print(f"💾 Almacén actualizado en: {almacen_dir}/")
+
 # =====================================================
 # 4. EJECUCIÓN PRINCIPAL
 # =====================================================
 
 if __name__ == "__main__":
-    generar_vectores()
+    import sys
+    # --procesos N: reparte la extracción entre N procesos (por defecto PROCESOS_EXTRACCION o 1)
+    # --resume: reutiliza las clases ya terminadas en un intento anterior interrumpido
+    procesos = int(sys.argv[sys.argv.index("--procesos") + 1]) if "--procesos" in sys.argv else PROCESOS
+    if "--actualizar" in sys.argv:
+        actualizar_vectores(procesos=procesos)
+    else:
+        generar_vectores(procesos=procesos,
+                         reanudar="--resume" in sys.argv or "--reanudar" in sys.argv)
@@ -0,0 +1,307 @@
+# =============================================================================
+# ÍNDICE DE VECINOS MÁS CERCANOS APROXIMADO (ANN) SOBRE LOS EMBEDDINGS
+# =============================================================================
+# Métodos disponibles (similitud coseno sobre vectores normalizados):
+#   - "hnsw"    : grafo HNSW de hnswlib (pip install hnswlib), si está instalado
+#   - "ivf"     : listas invertidas con k-means en NumPy puro (sin dependencias)
+#   - "exacto"  : fuerza bruta, útil como referencia o para catálogos pequeños
+#
+# Los índices se guardan dentro del almacén de características:
+#   almacen_tenis/ann_centroides.*   → top-k de clases
+#   almacen_tenis/ann_imagenes.*     → imágenes más parecidas
+# guardar_almacen reemplaza el directorio entero, así que antes vuelve a
+# construir en el nuevo los índices que tenía el anterior (mismo método).
+#
+# Uso:
+#   python indice_ann.py construir --metodo ivf
+#   python indice_ann.py buscar foto.jpg --k 5
+
+import os
+import json
+import argparse
+
+import numpy as np
+
+from puntuacion import normalizar_filas, top_k_filas
+
+try:
+    import hnswlib
+except ImportError:  # dependencia opcional
+    hnswlib = None
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+UMBRAL_EXACTO = 5_000   # por debajo de esto "auto" usa fuerza bruta
+NPROBE = 8              # listas visitadas por consulta (IVF)
+EF_BUSQUEDA = 64        # tamaño de la lista dinámica en la búsqueda (HNSW)
+TAM_BLOQUE = 65_536     # filas por bloque al asignar listas
+
+# =============================================================================
+# K-MEANS ESFÉRICO (para las listas del IVF)
+# =============================================================================
+
+def kmeans_esferico(x, k, iteraciones=20, muestra=100_000, semilla=42):
+    """k-means con similitud coseno; x debe venir normalizado por filas."""
+    rng = np.random.default_rng(semilla)
+    if x.shape[0] > muestra:
+        x = x[np.sort(rng.choice(x.shape[0], muestra, replace=False))]
+    centros = x[rng.choice(x.shape[0], k, replace=False)].copy()
+    for _ in range(iteraciones):
+        asignacion = np.argmax(x @ centros.T, axis=1)
+        sumas = np.zeros_like(centros)
+        np.add.at(sumas, asignacion, x)
+        vacios = np.bincount(asignacion, minlength=k) == 0
+        sumas[vacios] = x[rng.choice(x.shape[0], vacios.sum())]
+        centros = normalizar_filas(sumas)
+    return centros
+
+# =============================================================================
+# ÍNDICE
+# =============================================================================
+
+class IndiceANN:
+    """Índice de similitud coseno con búsqueda top-k por lotes."""
+
+    def __init__(self, metodo="auto"):
+        self.metodo = metodo
+        self.n = 0
+        self.dims = 0
+
+    # ---------------------------------------------------------------------
+    # Construcción
+    # ---------------------------------------------------------------------
+
+    def construir(self, vectores, n_listas=None, m_hnsw=16, ef_construccion=200):
+        x = normalizar_filas(vectores)
+        self.n, self.dims = x.shape
+
+        if self.metodo == "auto":
+            if self.n < UMBRAL_EXACTO:
+                self.metodo = "exacto"
+            else:
+                self.metodo = "hnsw" if hnswlib is not None else "ivf"
+
+        if self.metodo == "hnsw":
+            if hnswlib is None:
+                raise ImportError("hnswlib no está instalado: pip install hnswlib o usa metodo='ivf'")
+            self.hnsw = hnswlib.Index(space="ip", dim=self.dims)
+            self.hnsw.init_index(max_elements=self.n, ef_construction=ef_construccion, M=m_hnsw)
+            self.hnsw.add_items(x, np.arange(self.n))
+            self.hnsw.set_ef(EF_BUSQUEDA)
+        elif self.metodo == "ivf":
+            n_listas = n_listas or max(1, int(4 * np.sqrt(self.n)))
+            self.centros = kmeans_esferico(x, min(n_listas, self.n))
+            asignacion = np.concatenate([
+                np.argmax(x[i:i + TAM_BLOQUE] @ self.centros.T, axis=1)
+                for i in range(0, self.n, TAM_BLOQUE)])
+            orden = np.argsort(asignacion, kind="stable")
+            self.ids = orden.astype(np.int64)
+            self.vectores = np.ascontiguousarray(x[orden])
+            self.inicios = np.concatenate(
+                [[0], np.cumsum(np.bincount(asignacion, minlength=len(self.centros)))])
+        elif self.metodo == "exacto":
+            self.vectores = x
+        else:
+            raise ValueError(f"Método de índice desconocido: {self.metodo}")
+        return self
+
+    # ---------------------------------------------------------------------
+    # Búsqueda
+    # ---------------------------------------------------------------------
+
+    def buscar(self, consultas, k=5, nprobe=NPROBE, ef=EF_BUSQUEDA):
+        """Devuelve (indices, similitudes) de forma (consultas × k); -1 si faltan vecinos."""
+        q = normalizar_filas(np.atleast_2d(consultas))
+        k = min(k, self.n)
+
+        if self.metodo == "exacto":
+            sims = q @ self.vectores.T
+            idx = top_k_filas(sims, k)
+            return idx, np.take_along_axis(sims, idx, axis=1)
+
+        if self.metodo == "hnsw":
+            self.hnsw.set_ef(max(ef, k))
+            idx, dist = self.hnsw.knn_query(q, k=k)
+            return idx.astype(np.int64), 1 - dist
+
+        # IVF: visitar las 'nprobe' listas más cercanas de cada consulta
+        listas = top_k_filas(q @ self.centros.T, min(nprobe, len(self.centros)))
+        idx = np.full((len(q), k), -1, dtype=np.int64)
+        sims = np.full((len(q), k), -np.inf, dtype=np.float32)
+        for i, (consulta, elegidas) in enumerate(zip(q, listas)):
+            candidatos = np.concatenate(
+                [np.arange(self.inicios[l], self.inicios[l + 1]) for l in elegidas])
+            if candidatos.size == 0:
+                continue
+            s = self.vectores[candidatos] @ consulta
+            mejores = top_k_filas(s[None, :], k)[0]
+            idx[i, :len(mejores)] = self.ids[candidatos[mejores]]
+            sims[i, :len(mejores)] = s[mejores]
+        return idx, sims
+
+    # ---------------------------------------------------------------------
+    # Persistencia
+    # ---------------------------------------------------------------------
+
+    def guardar(self, prefijo):
+        meta = {"metodo": self.metodo, "n": self.n, "dims": self.dims}
+        if self.metodo == "hnsw":
+            self.hnsw.save_index(prefijo + ".hnsw")
+        elif self.metodo == "ivf":
+            np.save(prefijo + "_centros.npy", self.centros)
+            np.save(prefijo + "_vectores.npy", self.vectores)
+            np.save(prefijo + "_ids.npy", self.ids)
+            np.save(prefijo + "_inicios.npy", self.inicios)
+        else:
+            np.save(prefijo + "_vectores.npy", self.vectores)
+        with open(prefijo + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def cargar(cls, prefijo):
+        with open(prefijo + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        indice = cls(meta["metodo"])
+        indice.n, indice.dims = meta["n"], meta["dims"]
+        if indice.metodo == "hnsw":
+            if hnswlib is None:
+                raise ImportError("El índice se construyó con hnswlib, que no está instalado")
+            indice.hnsw = hnswlib.Index(space="ip", dim=indice.dims)
+            indice.hnsw.load_index(prefijo + ".hnsw", max_elements=indice.n)
+            indice.hnsw.set_ef(EF_BUSQUEDA)
+        elif indice.metodo == "ivf":
+            indice.centros = np.load(prefijo + "_centros.npy")
+            indice.vectores = np.load(prefijo + "_vectores.npy", mmap_mode="r")
+            indice.ids = np.load(prefijo + "_ids.npy", mmap_mode="r")
+            indice.inicios = np.load(prefijo + "_inicios.npy")
+        else:
+            indice.vectores = np.load(prefijo + "_vectores.npy", mmap_mode="r")
+        return indice
+
+# =============================================================================
+# ÍNDICES DEL ALMACÉN
+# =============================================================================
+
+INDICES = ("centroides", "imagenes")
+
+def _matriz(almacen, nombre):
+    return almacen.centroides if nombre == "centroides" else almacen.vectores
+
+def construir_indices(almacen, metodo="auto", n_listas=None, nombres=INDICES):
+    """Construye y guarda los índices de centroides y de imágenes junto al almacén."""
+    indices = {}
+    for nombre in nombres:
+        matriz = _matriz(almacen, nombre)
+        if len(matriz) == 0:
+            continue
+        indice = IndiceANN(metodo).construir(np.asarray(matriz, dtype=np.float32), n_listas)
+        indice.guardar(os.path.join(almacen.directorio, f"ann_{nombre}"))
+        indices[nombre] = indice
+        print(f"✅ Índice '{nombre}': {indice.n} vectores ({indice.metodo})")
+    return indices
+
+def metodos_guardados(directorio):
+    """{nombre: método} de los índices construidos en un directorio de almacén."""
+    metodos = {}
+    for nombre in INDICES:
+        meta = os.path.join(directorio, f"ann_{nombre}.json")
+        if os.path.exists(meta):
+            with open(meta, encoding="utf-8") as f:
+                metodos[nombre] = json.load(f)["metodo"]
+    return metodos
+
+def reconstruir_indices(origen, destino):
+    """Construye en el almacén 'destino' los índices que había en 'origen', con el mismo método."""
+    from almacen_features import cargar_almacen
+
+    metodos = metodos_guardados(origen)
+    if not metodos:
+        return
+    almacen = cargar_almacen(destino)
+    try:
+        for nombre, metodo in metodos.items():
+            try:
+                construir_indices(almacen, metodo, nombres=[nombre])
+            except ImportError as e:
+                print(f"⚠️ No se pudo reconstruir el índice '{nombre}': {e}")
+    finally:
+        almacen.cerrar()
+
+def cargar_indice(almacen, nombre):
+    """Carga 'centroides' o 'imagenes'; devuelve None si no se ha construido o no está al día."""
+    prefijo = os.path.join(almacen.directorio, f"ann_{nombre}")
+    if not os.path.exists(prefijo + ".json"):
+        return None
+    indice = IndiceANN.cargar(prefijo)
+    if indice.n != len(_matriz(almacen, nombre)):
+        print(f"⚠️ El índice ANN '{nombre}' tiene {indice.n} vectores y el almacén "
+              f"{len(_matriz(almacen, nombre))}: se ignora (python indice_ann.py construir)")
+        return None
+    return indice
+
+def top_k_clases(indice_centroides, puntuador, feats, colores, alpha=0.8, k=5,
+                 candidatos=None, **opciones):
+    """
+    Preselecciona clases por forma con el índice ANN y reordena esos candidatos
+    con la fórmula completa forma + color del PuntuadorTenis.
+    """
+    candidatos = candidatos or max(4 * k, 32)
+    idx, _ = indice_centroides.buscar(feats, candidatos, **opciones)
+    return puntuador.top_k_candidatos(feats, colores, idx, alpha, k)
+
+def imagenes_cercanas(indice_imagenes, almacen, feats, k=5, **opciones):
+    """Las k imágenes del catálogo más parecidas: [[(ruta, clase, similitud), ...], ...]."""
+    idx, sims = indice_imagenes.buscar(feats, k, **opciones)
+    rutas = almacen.rutas
+    return [[(rutas[j], almacen.clases[almacen.clase_idx[j]], float(s))
+             for j, s in zip(fila_idx, fila_sims) if j >= 0]
+            for fila_idx, fila_sims in zip(idx, sims)]
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+if __name__ == "__main__":
+    from almacen_features import cargar_almacen, ALMACEN_DIR
+
+    parser = argparse.ArgumentParser(description="Índices ANN sobre el almacén de características")
+    parser.add_argument("--dir", default=ALMACEN_DIR)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("construir", help="Construye los índices de centroides e imágenes")
+    p.add_argument("--metodo", default="auto", choices=["auto", "hnsw", "ivf", "exacto"])
+    p.add_argument("--listas", type=int, default=None, help="Número de listas IVF")
+    p = sub.add_parser("buscar", help="Clases e imágenes más parecidas a una foto")
+    p.add_argument("imagen")
+    p.add_argument("--k", type=int, default=5)
+    p.add_argument("--alpha", type=float, default=0.8)
+    args = parser.parse_args()
+
+    almacen = cargar_almacen(args.dir)
+    if almacen is None:
+        raise SystemExit(f"❌ No existe el almacén {args.dir}; ejecuta generar_vectores.py")
+
+    if args.comando == "construir":
+        construir_indices(almacen, args.metodo, args.listas)
+    else:
+        import clasificar_carpeta as cc
+        from puntuacion import PuntuadorTenis
+
+        feat, color = cc.features_y_color(args.imagen)
+        feat, color = feat[None, :], color[None, :]
+        indice = cargar_indice(almacen, "centroides")
+        puntuador = PuntuadorTenis.desde_almacen(almacen)
+        if indice is None:
+            clases = puntuador.top_k(feat, color, args.alpha, args.k)[0]
+        else:
+            clases = top_k_clases(indice, puntuador, feat, color, args.alpha, args.k)[0]
+        print("\n=== CLASES MÁS PARECIDAS ===")
+        for nombre, sim in clases:
+            print(f"{nombre}: {sim:.3f}")
+
+        indice = cargar_indice(almacen, "imagenes")
+        if indice is not None:
+            print("\n=== IMÁGENES MÁS PARECIDAS ===")
+            for ruta, clase, sim in imagenes_cercanas(indice, almacen, feat, args.k)[0]:
+                print(f"{ruta} [{clase}]: {sim:.3f}")
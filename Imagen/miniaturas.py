@@ -0,0 +1,207 @@
+# =============================================================================
+# CACHÉ EN DISCO DE MINIATURAS PARA LAS GALERÍAS
+# =============================================================================
+# Cada miniatura se guarda como un JPEG (o WebP) pequeño cuyo nombre sale de
+# (ruta absoluta, tamaño del archivo, mtime, tamaño de la miniatura, formato).
+# Si la foto no cambia, la siguiente galería lee la miniatura ya hecha en
+# lugar de abrir otra vez la imagen a resolución completa; si cambia, su clave
+# es otra y se regenera. Las que faltan se generan en un pool de procesos y
+# los JPEG se decodifican ya reducidos con draft() (escalado DCT 1/2, 1/4, 1/8).
+#
+#   miniaturas_cache/ab/ab12...f0_120.jpg
+#
+# publicar_miniaturas() copia (o enlaza) las miniaturas de una página a una carpeta junto
+# al HTML para referenciarlas como archivos con loading="lazy".
+#
+# Uso:
+#   python miniaturas.py stats
+#   python miniaturas.py limpiar --dias 30
+
+import os
+import io
+import time
+import base64
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+DIR_MINIATURAS = os.environ.get("CACHE_MINIATURAS", "miniaturas_cache")
+FORMATO = "JPEG"   # "JPEG" o "WEBP"
+CALIDAD = 85
+MIN_PARALELO = 32  # por debajo de esto no compensa arrancar el pool de procesos
+EXTENSION = {"JPEG": "jpg", "WEBP": "webp"}
+MIME = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# =============================================================================
+# MINIATURAS
+# =============================================================================
+
+def crear_miniatura(img_path, tam, formato=FORMATO):
+    """Bytes de la miniatura (lado mayor = tam) en el formato pedido."""
+    img = Image.open(img_path)
+    # JPEG: decodifica a 1/2, 1/4 o 1/8 de resolución, sin bajar del doble de 'tam'
+    img.draft("RGB", (tam * 2, tam * 2))
+    img.thumbnail((tam, tam), Image.Resampling.LANCZOS)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buffered = io.BytesIO()
+    img.save(buffered, format=formato, quality=CALIDAD)
+    return buffered.getvalue()
+
+def _guardar_miniatura(tarea):
+    """Genera y escribe una miniatura (se ejecuta en los procesos del pool)."""
+    img_path, tam, formato, destino = tarea
+    try:
+        datos = crear_miniatura(img_path, tam, formato)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        tmp = f"{destino}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(datos)
+        os.replace(tmp, destino)  # escritura atómica
+        return destino, None
+    except Exception as e:
+        return None, str(e)
+
+def data_uri(ruta_miniatura):
+    """URI data: de una miniatura ya guardada (para incrustarla en el HTML)."""
+    extension = os.path.splitext(ruta_miniatura)[1][1:]
+    formato = next(f for f, e in EXTENSION.items() if e == extension)
+    with open(ruta_miniatura, "rb") as f:
+        datos = base64.b64encode(f.read()).decode()
+    return f"data:{MIME[formato]};base64,{datos}"
+
+def publicar_miniaturas(miniaturas, carpeta):
+    """
+    Deja en 'carpeta' las miniaturas de {imagen: miniatura} (enlace duro si
+    se puede, si no copia). Devuelve {imagen: nombre_de_archivo} (None si no
+    había miniatura).
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    nombres = {}
+    for img_path, miniatura in miniaturas.items():
+        if miniatura is None:
+            nombres[img_path] = None
+            continue
+        nombre = os.path.basename(miniatura)
+        destino = os.path.join(carpeta, nombre)
+        if not os.path.exists(destino):
+            try:
+                os.link(miniatura, destino)
+            except OSError:
+                shutil.copyfile(miniatura, destino)
+        nombres[img_path] = nombre
+    return nombres
+
+def podar_publicadas(carpeta, en_uso):
+    """Borra de 'carpeta' las miniaturas cuyo nombre no está en 'en_uso'."""
+    if os.path.isdir(carpeta):
+        for nombre in os.listdir(carpeta):
+            if nombre not in en_uso:
+                os.remove(os.path.join(carpeta, nombre))
+
+class CacheMiniaturas:
+    """Miniaturas en disco indexadas por ruta, tamaño, mtime y tamaño de miniatura."""
+
+    def __init__(self, directorio=DIR_MINIATURAS, formato=FORMATO):
+        self.directorio = directorio
+        self.formato = formato
+        self.aciertos = 0
+        self.fallos = 0
+
+    def clave(self, img_path, tam):
+        st = os.stat(img_path)
+        datos = f"{os.path.abspath(img_path)}|{st.st_size}|{st.st_mtime_ns}|{tam}|{self.formato}"
+        return hashlib.sha1(datos.encode("utf-8")).hexdigest()
+
+    def destino(self, img_path, tam):
+        clave = self.clave(img_path, tam)
+        return os.path.join(self.directorio, clave[:2], f"{clave}_{tam}.{EXTENSION[self.formato]}")
+
+    def ruta(self, img_path, tam):
+        """Ruta de la miniatura en la caché; la crea si falta o si la foto cambió."""
+        destino = self.destino(img_path, tam)
+        if os.path.exists(destino):
+            self.aciertos += 1
+            return destino
+        destino, error = _guardar_miniatura((img_path, tam, self.formato, destino))
+        if error:
+            raise OSError(error)
+        self.fallos += 1
+        return destino
+
+    def base64(self, img_path, tam):
+        """URI data: de la miniatura (para incrustarla en el HTML)."""
+        return data_uri(self.ruta(img_path, tam))
+
+    def preparar(self, rutas, tam, workers=None):
+        """
+        {ruta_imagen: ruta_miniatura} en el mismo orden que 'rutas'. Las que
+        faltan se generan en un pool de procesos; las que fallan quedan en None.
+        """
+        resultado, tareas = {}, []
+        for img_path in rutas:
+            try:
+                destino = self.destino(img_path, tam)
+            except OSError:
+                resultado[img_path] = None
+                continue
+            if os.path.exists(destino):
+                self.aciertos += 1
+                resultado[img_path] = destino
+            else:
+                resultado[img_path] = None  # reserva el orden
+                tareas.append((img_path, tam, self.formato, destino))
+
+        if len(tareas) >= MIN_PARALELO and (workers or os.cpu_count() or 1) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                generadas = list(ex.map(_guardar_miniatura, tareas, chunksize=16))
+        else:
+            generadas = [_guardar_miniatura(t) for t in tareas]
+
+        for (img_path, *_), (destino, _error) in zip(tareas, generadas):
+            resultado[img_path] = destino
+            self.fallos += destino is not None
+        return resultado
+
+    def resumen(self):
+        return f"{self.aciertos} miniaturas reutilizadas, {self.fallos} generadas"
+
+    def limpiar(self, dias):
+        """Borra las miniaturas que no se han leído ni creado en los últimos 'dias' días."""
+        limite = time.time() - dias * 86400
+        borradas = 0
+        for carpeta, _, archivos in os.walk(self.directorio):
+            for nombre in archivos:
+                ruta = os.path.join(carpeta, nombre)
+                if max(os.path.getatime(ruta), os.path.getmtime(ruta)) < limite:
+                    os.remove(ruta)
+                    borradas += 1
+        return borradas
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Caché de miniaturas de las galerías")
+    parser.add_argument("--dir", default=DIR_MINIATURAS)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("stats", help="Número de miniaturas y espacio ocupado")
+    p = sub.add_parser("limpiar", help="Borra miniaturas sin uso reciente")
+    p.add_argument("--dias", type=int, default=30)
+    args = parser.parse_args()
+
+    cache = CacheMiniaturas(args.dir)
+    if args.comando == "stats":
+        archivos = [os.path.join(c, n) for c, _, ns in os.walk(args.dir) for n in ns]
+        total = sum(os.path.getsize(a) for a in archivos)
+        print(f"🖼️ {args.dir}: {len(archivos)} miniaturas, {total / 1e6:.1f} MB")
+    else:
+        print(f"🧹 {cache.limpiar(args.dias)} miniaturas borradas")
@@ -0,0 +1,46 @@
+# =============================================================================
+# ACCESO PEREZOSO A LOS MODELOS
+# =============================================================================
+# TensorFlow y los pesos de ImageNet solo se cargan la primera vez que se pide
+# un modelo, y después se reutiliza la misma instancia. Importar cualquier
+# script de Imagen (por ejemplo para leer resultados) ya no cuesta segundos.
+# El preprocesado replica en NumPy el preprocess_input de Keras, así que
+# decodificar y preparar lotes no necesita TensorFlow.
+
+from functools import lru_cache
+
+import numpy as np
+
+MEDIA_IMAGENET_BGR = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+
+@lru_cache(maxsize=None)
+def obtener_mobilenet():
+    """MobileNetV2 (ImageNet) sin capa de clasificación, con average pooling."""
+    print("🧠 Cargando modelo MobileNetV2...")
+    from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2
+    model = MobileNetV2(weights='imagenet', include_top=False, pooling='avg')
+    print("✅ Modelo cargado correctamente.\n")
+    return model
+
+@lru_cache(maxsize=None)
+def obtener_vgg16():
+    """VGG16 (ImageNet) sin capas fully connected + Global Average Pooling."""
+    print("🧠 Cargando modelo VGG16...")
+    import tensorflow as tf
+    from tensorflow.keras.applications import VGG16
+    from tensorflow.keras.models import Model
+    base_model = VGG16(weights='imagenet', include_top=False, input_shape=(224, 224, 3))
+    x = tf.keras.layers.GlobalAveragePooling2D()(base_model.output)
+    model = Model(inputs=base_model.input, outputs=x)
+    print("✅ Modelo cargado correctamente.\n")
+    return model
+
+def preprocess_mobilenet(x):
+    """preprocess_input de MobileNetV2 (escala a [-1, 1]), mismas operaciones que Keras."""
+    x = np.asarray(x, dtype=np.float32)
+    return x / np.float32(127.5) - np.float32(1.0)
+
+def preprocess_vgg16(x):
+    """preprocess_input de VGG16 (BGR y resta de la media de ImageNet), mismas operaciones que Keras."""
+    x = np.asarray(x, dtype=np.float32)
+    return x[..., ::-1] - MEDIA_IMAGENET_BGR
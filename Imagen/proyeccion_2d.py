@@ -0,0 +1,128 @@
+# =============================================================================
+# PROYECCIÓN 2-D ESCALABLE PARA VISUALIZAR LOS GRUPOS
+# =============================================================================
+# Sustituye a TSNE(perplexity=30) sobre la matriz completa de VGG16:
+#   1. submuestreo estratificado opcional (máximo N imágenes por grupo)
+#   2. PCA a PCA_COMPONENTES dimensiones
+#   3. t-SNE acelerado: openTSNE (FFT) si está instalado, si no UMAP
+#      (umap-learn) y, en último caso, TSNE Barnes-Hut de sklearn
+#   4. caché de las coordenadas en proyecciones_2d/<hash>.npz, con el hash
+#      calculado sobre la matriz de características y los parámetros, de modo
+#      que regenerar los gráficos con los mismos datos es instantáneo
+#
+# Dependencias opcionales: pip install openTSNE  /  pip install umap-learn
+# (se importan solo al proyectar: importar este módulo no carga numba)
+
+import os
+import hashlib
+from importlib.util import find_spec
+
+import numpy as np
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+DIR_CACHE = "proyecciones_2d"
+PCA_COMPONENTES = 50
+PERPLEXITY = 30
+TAM_BLOQUE = 65_536  # filas por bloque al calcular el hash
+
+# =============================================================================
+# UTILIDADES
+# =============================================================================
+
+def hash_matriz(matriz, **parametros):
+    """Hash del contenido de la matriz (por bloques, vale para memmap) y de los parámetros."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((matriz.shape, str(matriz.dtype), sorted(parametros.items()))).encode())
+    for i in range(0, len(matriz), TAM_BLOQUE):
+        h.update(np.ascontiguousarray(matriz[i:i + TAM_BLOQUE]).tobytes())
+    return h.hexdigest()
+
+def submuestra_estratificada(grupos, max_por_grupo, semilla=42):
+    """Índices ordenados con como mucho 'max_por_grupo' elementos de cada grupo."""
+    rng = np.random.default_rng(semilla)
+    grupos = np.asarray(grupos)
+    elegidos = []
+    for g in np.unique(grupos):
+        miembros = np.flatnonzero(grupos == g)
+        if len(miembros) > max_por_grupo:
+            miembros = rng.choice(miembros, max_por_grupo, replace=False)
+        elegidos.append(miembros)
+    return np.sort(np.concatenate(elegidos))
+
+def instalado(modulo):
+    """Comprueba si un paquete opcional está instalado sin importarlo."""
+    return find_spec(modulo) is not None
+
+def metodo_disponible(metodo="auto"):
+    if metodo != "auto":
+        return metodo
+    if instalado("openTSNE"):
+        return "opentsne"
+    return "umap" if instalado("umap") else "tsne"
+
+# =============================================================================
+# PROYECCIÓN
+# =============================================================================
+
+def _proyectar(x, metodo, perplexity, semilla):
+    if metodo == "opentsne":
+        try:
+            import openTSNE
+        except ImportError:
+            raise ImportError("openTSNE no está instalado: pip install openTSNE") from None
+        return np.asarray(openTSNE.TSNE(perplexity=perplexity, negative_gradient_method="fft",
+                                        n_jobs=-1, random_state=semilla).fit(x))
+    if metodo == "umap":
+        try:
+            import umap
+        except ImportError:
+            raise ImportError("umap-learn no está instalado: pip install umap-learn") from None
+        return umap.UMAP(n_components=2, n_neighbors=max(2, int(perplexity)),
+                         random_state=semilla).fit_transform(x)
+    if metodo == "tsne":
+        from sklearn.manifold import TSNE
+        return TSNE(n_components=2, perplexity=min(perplexity, len(x) - 1), method="barnes_hut",
+                    init="pca", random_state=semilla).fit_transform(x)
+    raise ValueError(f"Método de proyección desconocido: {metodo}")
+
+def proyectar_2d(features, grupos=None, max_por_grupo=None, metodo="auto",
+                 pca_componentes=PCA_COMPONENTES, perplexity=PERPLEXITY, semilla=42,
+                 dir_cache=DIR_CACHE):
+    """
+    Coordenadas 2-D de las características. Devuelve (indices, coordenadas):
+    'indices' son las filas proyectadas (todas, o la submuestra por grupo).
+    """
+    metodo = metodo_disponible(metodo)
+    if max_por_grupo and grupos is not None:
+        indices = submuestra_estratificada(grupos, max_por_grupo, semilla)
+    else:
+        indices = np.arange(len(features))
+
+    clave = None
+    if dir_cache:
+        submuestra = max_por_grupo and grupos is not None
+        clave = hash_matriz(features, metodo=metodo, max_por_grupo=max_por_grupo,
+                            pca=pca_componentes, perplexity=perplexity, semilla=semilla,
+                            grupos=hash_matriz(np.asarray(grupos)) if submuestra else None)
+        ruta = os.path.join(dir_cache, f"{clave}.npz")
+        if os.path.exists(ruta):
+            datos = np.load(ruta)
+            print(f"✓ Proyección 2-D leída de la caché ({len(datos['indices'])} puntos)")
+            return datos["indices"], datos["coordenadas"]
+
+    x = np.asarray(features[indices], dtype=np.float32)
+    if x.shape[1] > pca_componentes and len(x) > pca_componentes:
+        from sklearn.decomposition import PCA
+        x = PCA(n_components=pca_componentes, svd_solver="randomized",
+                random_state=semilla).fit_transform(x)
+
+    print(f"Proyectando {len(x)} puntos a 2-D ({metodo})...")
+    coordenadas = _proyectar(x, metodo, perplexity, semilla).astype(np.float32)
+
+    if clave:
+        os.makedirs(dir_cache, exist_ok=True)
+        np.savez(os.path.join(dir_cache, f"{clave}.npz"), indices=indices, coordenadas=coordenadas)
+    return indices, coordenadas
@@ -0,0 +1,92 @@
+# =============================================================================
+# PUNTOS DE CONTROL POR CLASE PARA generar_vectores
+# =============================================================================
+# Cada clase se guarda en su propio .npz (rutas, vectores y colores) en cuanto
+# termina, con escritura atómica. Si el proceso se corta (error, Ctrl-C),
+# "python generar_vectores.py --resume" lee de aquí las clases cuya carpeta no
+# ha cambiado y solo extrae las demás; al final todas se unen en el almacén y
+# esta carpeta se borra.
+#
+#   almacen_tenis.parcial/
+#     3f2a...e1.npz     una por clase (nombre = sha1 del nombre de la clase)
+#
+# La firma de cada clase cubre nombre, tamaño y mtime de cada imagen de su
+# carpeta y la configuración de extracción (modelo, preprocesado, duplicados).
+
+import os
+import shutil
+import hashlib
+
+import numpy as np
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+SUFIJO = ".parcial"
+
+# =============================================================================
+# FIRMAS
+# =============================================================================
+
+def directorio_puntos(almacen_dir):
+    """Carpeta de puntos de control que acompaña a un almacén."""
+    return os.path.normpath(almacen_dir) + SUFIJO
+
+def firma_carpeta(rutas, configuracion=""):
+    """Huella de las imágenes de una clase (nombre, tamaño, mtime) y de la configuración."""
+    entradas = [configuracion]
+    for ruta in sorted(rutas):
+        st = os.stat(ruta)
+        entradas.append(f"{os.path.basename(ruta)}|{st.st_size}|{st.st_mtime_ns}")
+    return hashlib.sha1("\n".join(entradas).encode("utf-8")).hexdigest()
+
+# =============================================================================
+# PUNTOS DE CONTROL
+# =============================================================================
+
+class PuntosControl:
+    """
+    Un .npz por clase terminada. Sin 'reanudar', los puntos de una ejecución
+    anterior se descartan al empezar.
+    """
+
+    def __init__(self, directorio, reanudar=False):
+        self.directorio = directorio
+        if not reanudar and os.path.isdir(directorio):
+            shutil.rmtree(directorio)
+        os.makedirs(directorio, exist_ok=True)
+
+    def ruta(self, clase):
+        return os.path.join(self.directorio, hashlib.sha1(clase.encode("utf-8")).hexdigest() + ".npz")
+
+    def cargar(self, clase, firma):
+        """(rutas, vectores, colores) si hay un punto de control con esa firma, si no None."""
+        ruta = self.ruta(clase)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with np.load(ruta) as datos:
+                if str(datos["clase"]) != clase or str(datos["firma"]) != firma:
+                    return None
+                return datos["rutas"].tolist(), datos["vectores"], datos["colores"]
+        except (OSError, ValueError, KeyError):
+            return None  # punto de control dañado: la clase se vuelve a extraer
+
+    def guardar(self, clase, firma, rutas, vectores, colores):
+        destino = self.ruta(clase)
+        tmp = destino + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, clase=np.array(clase), firma=np.array(firma),
+                     rutas=np.array(rutas, dtype=str),
+                     vectores=np.asarray(vectores, dtype=np.float32),
+                     colores=np.asarray(colores, dtype=np.float32))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, destino)  # escritura atómica
+
+    def __len__(self):
+        return sum(n.endswith(".npz") for n in os.listdir(self.directorio))
+
+    def eliminar(self):
+        shutil.rmtree(self.directorio, ignore_errors=True)
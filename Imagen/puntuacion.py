@@ -0,0 +1,165 @@
+# =============================================================================
+# PUNTUACIÓN VECTORIZADA FORMA + COLOR
+# =============================================================================
+# Misma fórmula que clasificar_tenis:
+#   sim_total = alpha * coseno(feat, centroide) + (1 - alpha) * 1 / (1 + ||color - color_clase||)
+# pero calculada para un lote completo de consultas contra todas las clases con
+# un único producto de matrices y una única distancia con broadcasting.
+#
+# La parte de color admite variantes (VARIANTES_COLOR); "rgb" es la original.
+# evaluacion.py compara alpha y variantes sobre las imágenes del almacén.
+
+import numpy as np
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+VARIANTES_COLOR = ("rgb", "lab", "lineal", "exp")
+ESCALA_COLOR = 40.0                 # distancia RGB a la que "exp" vale 1/e
+DIST_MAX_RGB = 255 * np.sqrt(3)
+
+# =============================================================================
+# UTILIDADES
+# =============================================================================
+
+def normalizar_filas(matriz):
+    """Divide cada fila por su norma L2 (las filas nulas quedan en cero, como en sklearn)."""
+    matriz = np.asarray(matriz, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    return np.divide(matriz, normas, out=np.zeros_like(matriz), where=normas > 0)
+
+def top_k_filas(puntuaciones, k):
+    """Índices de las k mayores puntuaciones por fila, ordenados de mayor a menor."""
+    k = min(k, puntuaciones.shape[1])
+    if k == puntuaciones.shape[1]:
+        idx = np.argsort(-puntuaciones, axis=1)
+    else:
+        idx = np.argpartition(-puntuaciones, k - 1, axis=1)[:, :k]
+        orden = np.argsort(-np.take_along_axis(puntuaciones, idx, axis=1), axis=1)
+        idx = np.take_along_axis(idx, orden, axis=1)
+    return idx[:, :k]
+
+def rgb_a_lab(colores):
+    """Colores sRGB 0-255 (..., 3) a CIELAB (iluminante D65)."""
+    c = np.clip(np.asarray(colores, dtype=np.float32) / 255, 0, 1)
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = c @ np.array([[0.4124, 0.2126, 0.0193],
+                        [0.3576, 0.7152, 0.1192],
+                        [0.1805, 0.0722, 0.9505]], dtype=np.float32)
+    xyz = xyz / np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]),
+                     200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+def distancia_color(colores, colores_clases, variante="rgb"):
+    """Distancia euclídea con broadcasting sobre el último eje (CIELAB si variante="lab", si no RGB)."""
+    if variante == "lab":
+        colores, colores_clases = rgb_a_lab(colores), rgb_a_lab(colores_clases)
+    return np.linalg.norm(colores - colores_clases, axis=-1)
+
+def similitud_de_distancia(dist, variante="rgb"):
+    """
+    Similitud de color a partir de la distancia de distancia_color:
+      rgb    1 / (1 + distancia RGB)        (la fórmula de clasificar_tenis)
+      lab    1 / (1 + ΔE76 en CIELAB)
+      lineal 1 - distancia RGB / distancia máxima
+      exp    exp(-distancia RGB / ESCALA_COLOR)
+    """
+    if variante in ("rgb", "lab"):
+        return 1 / (1 + dist)
+    if variante == "lineal":
+        return 1 - dist / DIST_MAX_RGB
+    if variante == "exp":
+        return np.exp(-dist / ESCALA_COLOR)
+    raise ValueError(f"Variante de color desconocida: {variante} (usa una de {VARIANTES_COLOR})")
+
+def similitud_color(colores, colores_clases, variante="rgb"):
+    """Similitud de color con broadcasting ((q, 1, 3) contra (1, C, 3) → (q, C))."""
+    return similitud_de_distancia(distancia_color(colores, colores_clases, variante), variante)
+
+# =============================================================================
+# PUNTUADOR
+# =============================================================================
+
+class PuntuadorTenis:
+    """Centroides normalizados y colores apilados una sola vez para puntuar por lotes."""
+
+    def __init__(self, clases, centroides, centroides_colores, color="rgb"):
+        centroides = np.asarray(centroides, dtype=np.float32)
+        colores = np.asarray(centroides_colores, dtype=np.float32)
+
+        # Las clases con NaN se descartaban en cada comparación; aquí, una sola vez
+        validas = ~(np.isnan(centroides).any(axis=1) | np.isnan(colores).any(axis=1))
+        self.clases = [c for c, ok in zip(clases, validas) if ok]
+        # posición interna de cada clase original (-1 si se descartó)
+        self.posicion = np.full(len(validas), -1, dtype=np.int64)
+        self.posicion[validas] = np.arange(validas.sum())
+        self.centroides = normalizar_filas(centroides[validas])
+        self.colores = np.ascontiguousarray(colores[validas])
+        self.color = color
+
+    @classmethod
+    def desde_almacen(cls, almacen):
+        return cls(almacen.clases, almacen.centroides, almacen.centroides_colores)
+
+    @classmethod
+    def desde_diccionarios(cls, tenis_features, tenis_colors):
+        clases = list(tenis_features)
+        return cls(clases, np.stack([tenis_features[c] for c in clases]),
+                   np.stack([tenis_colors[c] for c in clases]))
+
+    def __len__(self):
+        return len(self.clases)
+
+    def puntuar(self, feats, colores, alpha=0.8):
+        """Matriz (consultas × clases) con la similitud combinada."""
+        feats = np.atleast_2d(np.asarray(feats, dtype=np.float32))
+        colores = np.atleast_2d(np.asarray(colores, dtype=np.float32))
+
+        sim_forma = normalizar_filas(feats) @ self.centroides.T
+        sim_forma[np.isnan(feats).any(axis=1)] = np.nan  # normalizar_filas las dejaría en cero
+        sim_color = similitud_color(colores[:, None, :], self.colores[None, :, :], self.color)
+        return alpha * sim_forma + (1 - alpha) * sim_color
+
+    def top_k(self, feats, colores, alpha=0.8, k=1):
+        """
+        Lista con las k mejores clases [(nombre, similitud), ...] por consulta.
+        Las consultas con NaN devuelven una lista vacía.
+        """
+        puntuaciones = self.puntuar(feats, colores, alpha)
+        clases = np.broadcast_to(np.arange(len(self.clases)), puntuaciones.shape)
+        return self._mejores(puntuaciones, clases, k)
+
+    def top_k_candidatos(self, feats, colores, candidatos, alpha=0.8, k=1):
+        """
+        Igual que top_k pero puntuando solo las clases candidatas de cada consulta
+        (matriz consultas × m con índices del almacén, -1 = sin candidato).
+        """
+        feats = np.atleast_2d(np.asarray(feats, dtype=np.float32))
+        con_nan = np.isnan(feats).any(axis=1)
+        feats = normalizar_filas(feats)
+        colores = np.atleast_2d(np.asarray(colores, dtype=np.float32))
+        candidatos = np.asarray(candidatos)
+
+        clases = np.where(candidatos >= 0, self.posicion[np.maximum(candidatos, 0)], -1)
+        seguras = np.maximum(clases, 0)
+        sim_forma = np.einsum("qd,qmd->qm", feats, self.centroides[seguras])
+        sim_color = similitud_color(colores[:, None, :], self.colores[seguras], self.color)
+        puntuaciones = alpha * sim_forma + (1 - alpha) * sim_color
+        puntuaciones[clases < 0] = -np.inf
+        puntuaciones[con_nan] = np.nan
+        return self._mejores(puntuaciones, clases, k)
+
+    def _mejores(self, puntuaciones, clases, k):
+        invalidas = np.isnan(puntuaciones).any(axis=1)
+        idx = top_k_filas(np.nan_to_num(puntuaciones, nan=-np.inf, neginf=-np.inf), k)
+
+        resultados = []
+        for fila, (indices, invalida) in enumerate(zip(idx, invalidas)):
+            if invalida:
+                resultados.append([])
+                continue
+            resultados.append([(self.clases[clases[fila, j]], float(puntuaciones[fila, j]))
+                               for j in indices if np.isfinite(puntuaciones[fila, j])])
+        return resultados
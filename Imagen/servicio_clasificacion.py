@@ -0,0 +1,232 @@
+# =============================================================================
+# SERVICIO LOCAL DE CLASIFICACIÓN CON MICRO-LOTES
+# =============================================================================
+# Mantiene MobileNetV2 y los centroides en memoria y agrupa las peticiones
+# concurrentes en micro-lotes (máximo 'max_lote' imágenes o 'max_espera_ms'
+# de espera, lo que ocurra primero) para hacer una sola pasada por la red.
+#
+# Uso:
+#   python servicio_clasificacion.py --puerto 8765 --max-lote 32 --max-espera-ms 10
+#
+#   POST /clasificar  {"ruta": "media/123.jpg", "k": 3}
+#   POST /clasificar  {"rutas": ["a.jpg", "b.jpg"], "k": 1}
+#   GET  /salud
+
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import clasificar_carpeta as cc
+from almacen_features import ALMACEN_DIR
+from cache_embeddings import CacheEmbeddings
+from backends import obtener_backend
+from modelos import preprocess_mobilenet
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+HOST = "127.0.0.1"
+PUERTO = 8765
+MAX_LOTE = 32
+MAX_ESPERA_MS = 10
+ALPHA = 0.8
+
+# =============================================================================
+# MICRO-LOTES
+# =============================================================================
+
+class MicroLotes:
+    """
+    Agrupa peticiones individuales en lotes para 'procesar_lote'.
+    procesar_lote recibe la lista de elementos y devuelve una lista de
+    resultados del mismo tamaño (o lanza una excepción para todo el lote).
+    """
+
+    def __init__(self, procesar_lote, max_lote=MAX_LOTE, max_espera_ms=MAX_ESPERA_MS,
+                 al_iniciar=None):
+        self.procesar_lote = procesar_lote
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000
+        self.al_iniciar = al_iniciar
+        self.cola = queue.Queue()
+        self.lotes_procesados = 0
+        self.tamanos = deque(maxlen=1000)  # tamaño de los últimos lotes
+        self.hilo = threading.Thread(target=self._bucle, daemon=True)
+        self.hilo.start()
+
+    def enviar(self, elemento):
+        """Encola un elemento y devuelve un Future con su resultado."""
+        futuro = Future()
+        self.cola.put((elemento, futuro))
+        return futuro
+
+    def _bucle(self):
+        # Los recursos ligados al hilo (p. ej. la conexión SQLite) se crean aquí
+        if self.al_iniciar:
+            self.al_iniciar()
+        while True:
+            pendientes = [self.cola.get()]
+            limite = time.perf_counter() + self.max_espera
+            while len(pendientes) < self.max_lote:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                try:
+                    pendientes.append(self.cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            elementos = [e for e, _ in pendientes]
+            try:
+                resultados = self.procesar_lote(elementos)
+                for (_, futuro), resultado in zip(pendientes, resultados):
+                    futuro.set_result(resultado)
+            except Exception as e:
+                for _, futuro in pendientes:
+                    futuro.set_exception(e)
+            self.lotes_procesados += 1
+            self.tamanos.append(len(pendientes))
+
+# =============================================================================
+# CLASIFICADOR CALIENTE
+# =============================================================================
+
+class ServicioClasificacion:
+    """Modelo, centroides y caché cargados una vez; clasifica micro-lotes de rutas."""
+
+    def __init__(self, almacen_dir=ALMACEN_DIR, alpha=ALPHA, usar_cache=True,
+                 max_lote=MAX_LOTE, max_espera_ms=MAX_ESPERA_MS):
+        self.alpha = alpha
+        self.usar_cache = usar_cache
+        self.cache = None
+        self.mejores_clases = cc.cargar_clasificador(almacen_dir)
+        if self.mejores_clases is None:
+            raise SystemExit(1)
+
+        # Calentamiento: construir el grafo antes de la primera petición real
+        modelo = obtener_backend("mobilenet")
+        modelo(preprocess_mobilenet(np.zeros((1, 224, 224, 3), dtype=np.float32)), training=False)
+
+        self.lotes = MicroLotes(self._procesar, max_lote, max_espera_ms, self._iniciar_hilo)
+
+    def _iniciar_hilo(self):
+        if self.usar_cache:
+            self.cache = CacheEmbeddings()
+
+    def _procesar(self, peticiones):
+        """peticiones = [(ruta, k)] → [{"ruta", "clases"} o {"ruta", "error"}]"""
+        k_max = max(k for _, k in peticiones)
+        rutas = list(dict.fromkeys(r for r, _ in peticiones))
+        por_ruta = {}
+        for ruta, top, error in cc.clasificar_rutas(
+                rutas, self.mejores_clases, self.alpha, k_max, self.cache,
+                batch_size=len(rutas), prefetch=0):
+            por_ruta[ruta] = (top, error)
+
+        respuestas = []
+        for ruta, k in peticiones:
+            top, error = por_ruta.get(ruta, (None, "sin resultado"))
+            if error is not None:
+                respuestas.append({"ruta": ruta, "error": str(error)})
+            else:
+                respuestas.append({"ruta": ruta, "clases": [
+                    {"clase": c, "similitud": round(s, 4)} for c, s in top[:k]]})
+        return respuestas
+
+    def clasificar(self, rutas, k=1):
+        """Encola cada ruta por separado y espera sus resultados."""
+        futuros = [self.lotes.enviar((ruta, k)) for ruta in rutas]
+        return [f.result() for f in futuros]
+
+# =============================================================================
+# SERVIDOR HTTP
+# =============================================================================
+
+def leer_peticion(peticion):
+    """
+    (rutas, k) de un cuerpo {"rutas": [...], "k": 3} o {"ruta": "...", "k": 3}.
+    Lanza ValueError si el cuerpo no tiene esa forma.
+    """
+    if not isinstance(peticion, dict):
+        raise ValueError("el cuerpo debe ser un objeto JSON")
+    if "rutas" in peticion:
+        rutas = peticion["rutas"]
+        if not isinstance(rutas, list) or not rutas:
+            raise ValueError("'rutas' debe ser una lista no vacía")
+    elif "ruta" in peticion:
+        rutas = [peticion["ruta"]]
+    else:
+        raise ValueError("falta 'rutas' o 'ruta'")
+    if not all(isinstance(r, str) and r for r in rutas):
+        raise ValueError("cada ruta debe ser un texto no vacío")
+    k = peticion.get("k", 1)
+    if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+        raise ValueError("'k' debe ser un entero mayor o igual que 1")
+    return rutas, k
+
+def crear_servidor(servicio, host=HOST, puerto=PUERTO):
+    class Manejador(BaseHTTPRequestHandler):
+        def _responder(self, codigo, cuerpo):
+            datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def do_GET(self):
+            if self.path != "/salud":
+                return self._responder(404, {"error": "ruta no encontrada"})
+            tamanos = servicio.lotes.tamanos
+            self._responder(200, {"estado": "ok",
+                                  "lotes": servicio.lotes.lotes_procesados,
+                                  "lote_medio": round(float(np.mean(tamanos)), 2) if tamanos else 0})
+
+        def do_POST(self):
+            if self.path != "/clasificar":
+                return self._responder(404, {"error": "ruta no encontrada"})
+            try:
+                largo = int(self.headers.get("Content-Length", 0))
+                rutas, k = leer_peticion(json.loads(self.rfile.read(largo) or b"{}"))
+            except ValueError as e:
+                return self._responder(400, {"error": f"petición inválida: {e}"})
+            resultados = servicio.clasificar(rutas, k)
+            self._responder(200, {"resultados": resultados})
+
+        def log_message(self, formato, *args):
+            pass  # sin una línea por petición
+
+    return ThreadingHTTPServer((host, puerto), Manejador)
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio local de clasificación de tenis")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--max-lote", type=int, default=MAX_LOTE)
+    parser.add_argument("--max-espera-ms", type=float, default=MAX_ESPERA_MS)
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--almacen", default=ALMACEN_DIR)
+    parser.add_argument("--sin-cache", action="store_true")
+    args = parser.parse_args()
+
+    servicio = ServicioClasificacion(args.almacen, args.alpha, not args.sin_cache,
+                                     args.max_lote, args.max_espera_ms)
+    servidor = crear_servidor(servicio, args.host, args.puerto)
+    print(f"🚀 Servicio escuchando en http://{args.host}:{args.puerto} "
+          f"(lote máx. {args.max_lote}, espera máx. {args.max_espera_ms} ms)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servicio detenido.")
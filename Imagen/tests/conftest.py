@@ -0,0 +1,5 @@
+# Los scripts de Imagen/ son módulos planos: se importan por nombre desde la carpeta padre.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+import backends
+from almacen_features import (guardar_almacen, cargar_almacen, actualizar_almacen,
+                              calcular_centroides)
+
+def _catalogo(n=60, clases=4, dims=8, semilla=0):
+    rng = np.random.default_rng(semilla)
+    clase_idx = np.arange(n) % clases
+    vectores = rng.standard_normal((n, dims)).astype(np.float32)
+    colores = (rng.random((n, 3)) * 255).astype(np.float32)
+    nombres = [f"{c:02d} marca_{c}" for c in range(clases)]
+    rutas = [f"ds/{nombres[c]}/{i}.jpg" for i, c in enumerate(clase_idx)]
+    return nombres, rutas, clase_idx, vectores, colores
+
+def test_actualizar_igual_que_reconstruir(tmp_path):
+    nombres, rutas, clase_idx, vectores, colores = _catalogo()
+    base = slice(0, 40)
+    guardar_almacen(nombres, rutas[base], clase_idx[base], vectores[base], colores[base],
+                    str(tmp_path / "inc"))
+
+    # añade 20, quita 5 y sustituye 1 (misma ruta, vector nuevo)
+    vectores2 = vectores.copy()
+    vectores2[3] += 1
+    nuevas = list(range(40, 60)) + [3]
+    quitar = [rutas[i] for i in range(10, 15)]
+    actualizar_almacen(cargar_almacen(str(tmp_path / "inc")),
+                       ([rutas[i] for i in nuevas], [nombres[clase_idx[i]] for i in nuevas],
+                        vectores2[nuevas], colores[nuevas]), quitar)
+
+    quedan = [i for i in range(60) if i not in range(10, 15)]
+    guardar_almacen(nombres, [rutas[i] for i in quedan], clase_idx[quedan], vectores2[quedan],
+                    colores[quedan], str(tmp_path / "completo"))
+
+    inc, completo = cargar_almacen(str(tmp_path / "inc")), cargar_almacen(str(tmp_path / "completo"))
+    assert inc.clases == completo.clases
+    assert sorted(inc.rutas) == sorted(completo.rutas)
+    np.testing.assert_allclose(inc.centroides, completo.centroides, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(inc.centroides_colores, completo.centroides_colores, rtol=1e-5)
+    np.testing.assert_array_equal(inc.conteos, completo.conteos)
+
+def test_almacen_migrado_conserva_el_centroide(tmp_path):
+    nombres, rutas, clase_idx, vectores, colores = _catalogo(clases=2)
+    _, _, centroides = calcular_centroides(vectores, clase_idx, 2)
+    _, _, centroides_colores = calcular_centroides(colores, clase_idx, 2)
+    guardar_almacen(nombres, [], [], np.empty((0, 8), np.float32), np.empty((0, 3), np.float32),
+                    str(tmp_path / "alm"), centroides=centroides,
+                    centroides_colores=centroides_colores, conteos=np.zeros(2, dtype=np.int64))
+
+    nueva = np.full((1, 8), 3.0, dtype=np.float32)
+    actualizar_almacen(cargar_almacen(str(tmp_path / "alm")),
+                       (["ds/nueva.jpg"], [nombres[0]], nueva, np.zeros((1, 3), np.float32)))
+    almacen = cargar_almacen(str(tmp_path / "alm"))
+    # el centroide antiguo cuenta como una imagen
+    np.testing.assert_allclose(almacen.centroides[0], (centroides[0] + nueva[0]) / 2, rtol=1e-5)
+    np.testing.assert_allclose(almacen.centroides[1], centroides[1], rtol=1e-6)
+    np.testing.assert_array_equal(almacen.conteos, [2, 1])
+
+def test_actualizar_vectores_detecta_archivo_con_mtime_antiguo(tmp_path, monkeypatch):
+    import generar_vectores as gv
+    monkeypatch.setattr(backends, "BACKEND", "sintetico")
+
+    rng = np.random.default_rng(0)
+    for c in ("01 nike_a", "02 adidas_b"):
+        os.makedirs(tmp_path / "ds" / c)
+        for i in range(3):
+            pixeles = rng.integers(0, 255, (64, 64, 3), dtype=np.uint8)
+            Image.fromarray(pixeles).save(tmp_path / "ds" / c / f"{i}.jpg")
+    dataset, almacen_dir = str(tmp_path / "ds"), str(tmp_path / "alm")
+    gv.generar_vectores(dataset, usar_cache=False, almacen_dir=almacen_dir, deduplicar=False)
+    antes = cargar_almacen(almacen_dir)
+    ruta = os.path.join(dataset, "01 nike_a", "0.jpg")
+    vector_antes = np.array(antes.vectores[antes.rutas.index(ruta)])
+    antes.cerrar()
+
+    # se sustituye por otra foto con una fecha anterior a la del almacén
+    Image.fromarray(np.full((64, 64, 3), 200, dtype=np.uint8)).save(ruta)
+    os.utime(ruta, ns=(1_000_000_000_000_000_000, 1_000_000_000_000_000_000))
+    gv.actualizar_vectores(dataset, almacen_dir, usar_cache=False, deduplicar=False)
+
+    despues = cargar_almacen(almacen_dir)
+    assert len(despues) == 6
+    assert not np.allclose(despues.vectores[despues.rutas.index(ruta)], vector_antes)
+
+def test_los_indices_ann_sobreviven_a_la_actualizacion(tmp_path):
+    from indice_ann import construir_indices, cargar_indice
+
+    nombres, rutas, clase_idx, vectores, colores = _catalogo()
+    directorio = str(tmp_path / "alm")
+    guardar_almacen(nombres, rutas[:40], clase_idx[:40], vectores[:40], colores[:40], directorio)
+    almacen = cargar_almacen(directorio)
+    construir_indices(almacen, "ivf", n_listas=4)
+    almacen.cerrar()
+
+    actualizar_almacen(cargar_almacen(directorio),
+                       (rutas[40:], [nombres[c] for c in clase_idx[40:]], vectores[40:], colores[40:]))
+    almacen = cargar_almacen(directorio)
+    for nombre, n in (("centroides", 4), ("imagenes", 60)):
+        indice = cargar_indice(almacen, nombre)
+        assert indice is not None and indice.metodo == "ivf" and indice.n == n
+
+def test_float16_sin_deriva_al_sustituir(tmp_path):
+    nombres, rutas, clase_idx, vectores, colores = _catalogo(n=20, clases=2)
+    vectores = vectores * 300 + 1000  # lejos de valores representables exactamente en float16
+    directorio = str(tmp_path / "alm")
+    guardar_almacen(nombres, rutas, clase_idx, vectores, colores, directorio, dtype=np.float16)
+
+    otro = vectores[:1] + 123.456
+    for _ in range(50):
+        for vector in (otro, vectores[:1]):
+            actualizar_almacen(cargar_almacen(directorio),
+                               (rutas[:1], [nombres[clase_idx[0]]], vector, colores[:1]))
+
+    # sin deriva: como mucho el redondeo a float16 de las imágenes (medio ulp = 0.5 bajo 2048)
+    _, _, esperado = calcular_centroides(vectores, clase_idx, 2)
+    diferencia = np.abs(cargar_almacen(directorio).centroides - esperado).max()
+    assert diferencia <= 0.5, diferencia
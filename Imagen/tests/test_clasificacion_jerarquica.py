@@ -0,0 +1,47 @@
+import numpy as np
+
+from almacen_features import guardar_almacen, cargar_almacen
+from clasificacion_jerarquica import ClasificadorJerarquico, familia_de
+from puntuacion import PuntuadorTenis
+
+CLASES = ["01 nike_AF1_cream", "01 nike free metcon 6 beige", "02 adidas_samba_blanco"]
+
+def _centroides(semilla=0):
+    rng = np.random.default_rng(semilla)
+    return (rng.standard_normal((len(CLASES), 16)).astype(np.float32),
+            (rng.random((len(CLASES), 3)) * 255).astype(np.float32))
+
+def test_familia_de():
+    assert familia_de("01 nike_AF1_cream") == "01 nike"
+    assert familia_de("01 nike_AF1_cream", "modelo") == "01 nike af1"
+    assert familia_de("01 nike free metcon 6 beige", "modelo") == "01 nike free"
+
+def test_almacen_migrado_sin_conteos(tmp_path):
+    centroides, colores = _centroides()
+    # como migrar_legado: solo centroides y conteos a cero
+    guardar_almacen(CLASES, [], [], np.empty((0, 16), np.float32), np.empty((0, 3), np.float32),
+                    str(tmp_path / "almacen"), centroides=centroides, centroides_colores=colores,
+                    conteos=np.zeros(len(CLASES), dtype=np.int64))
+    almacen = cargar_almacen(str(tmp_path / "almacen"))
+
+    jerarquico = ClasificadorJerarquico.desde_almacen(almacen, familias_top=2)
+    assert len(jerarquico.familias) == 2
+    top = jerarquico.top_k(centroides, colores, 0.8, 1)
+    assert [t[0][0] for t in top] == CLASES
+
+def test_familias_sin_peso_se_omiten():
+    centroides, colores = _centroides()
+    jerarquico = ClasificadorJerarquico(CLASES, centroides, colores, conteos=[5, 3, 0])
+    assert jerarquico.familias.clases == ["01 nike"]
+    assert [t[0][0] for t in jerarquico.top_k(centroides[:2], colores[:2], 0.8, 1)] == CLASES[:2]
+
+def test_con_todas_las_familias_coincide_con_plana():
+    centroides, colores = _centroides(1)
+    rng = np.random.default_rng(2)
+    feats = centroides[rng.integers(0, 3, 20)] + rng.standard_normal((20, 16)).astype(np.float32)
+    cols = (rng.random((20, 3)) * 255).astype(np.float32)
+    plana = PuntuadorTenis(CLASES, centroides, colores).top_k(feats, cols, 0.8, 2)
+    jerarquica = ClasificadorJerarquico(CLASES, centroides, colores, familias_top=2).top_k(feats, cols, 0.8, 2)
+    for a, b in zip(plana, jerarquica):
+        assert [c for c, _ in a] == [c for c, _ in b]
+        np.testing.assert_allclose([s for _, s in a], [s for _, s in b], rtol=1e-5)
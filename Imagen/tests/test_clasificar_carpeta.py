@@ -0,0 +1,50 @@
+import numpy as np
+from PIL import Image
+
+import backends
+import clasificar_carpeta as cc
+from puntuacion import PuntuadorTenis
+
+def test_una_imagen_igual_que_por_lotes(tmp_path, monkeypatch):
+    monkeypatch.setattr(backends, "BACKEND", "sintetico")
+    rng = np.random.default_rng(0)
+    rutas = []
+    for i in range(3):
+        rutas.append(str(tmp_path / f"{i}.jpg"))
+        Image.fromarray(rng.integers(0, 255, (300, 400, 3), dtype=np.uint8)).save(rutas[-1])
+
+    puntuador = PuntuadorTenis(["a", "b"], rng.standard_normal((2, 1280)),
+                               rng.random((2, 3)) * 255)
+    for reducir in (False, True):
+        capturas = []
+
+        def mejores(feats, cols, alpha, k):
+            capturas.append((feats, cols))
+            return puntuador.top_k(feats, cols, alpha, k)
+
+        lotes = list(cc.clasificar_rutas(rutas, mejores, reducir=reducir))
+        feats, cols = np.vstack([f for f, _ in capturas]), np.vstack([c for _, c in capturas])
+        for i, ruta in enumerate(rutas):
+            feat, color = cc.features_y_color(ruta, reducir)
+            np.testing.assert_allclose(feat, feats[i], atol=1e-5)
+            np.testing.assert_allclose(color, cols[i], rtol=1e-6)
+            np.testing.assert_allclose(cc.promedio_color(ruta, reducir), cols[i], rtol=1e-6)
+            clase, sim = cc.clasificar_tenis(ruta, puntuador, reducir=reducir)
+            assert clase == lotes[i][1][0][0] and abs(sim - lotes[i][1][0][1]) < 1e-5
+
+def test_con_cache_caliente_no_carga_el_modelo(tmp_path, monkeypatch):
+    from cache_embeddings import CacheEmbeddings
+
+    monkeypatch.setattr(backends, "BACKEND", "sintetico")
+    ruta = str(tmp_path / "0.jpg")
+    Image.fromarray(np.full((64, 64, 3), 90, dtype=np.uint8)).save(ruta)
+    puntuador = PuntuadorTenis(["a", "b"], np.eye(2, 1280), [[90, 90, 90], [0, 0, 0]])
+
+    cache = CacheEmbeddings(str(tmp_path / "cache.sqlite"))
+    primera = list(cc.clasificar_rutas([ruta], puntuador.top_k, cache=cache))
+
+    def sin_modelo(*args, **kwargs):
+        raise AssertionError("se cargó el modelo con la caché caliente")
+    monkeypatch.setattr(cc, "obtener_backend", sin_modelo)
+    assert list(cc.clasificar_rutas([ruta], puntuador.top_k, cache=cache)) == primera
+    cache.cerrar()
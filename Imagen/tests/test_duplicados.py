@@ -0,0 +1,30 @@
+import numpy as np
+from PIL import Image
+
+import duplicados
+from cache_embeddings import CacheEmbeddings
+from duplicados import colapsar_duplicados, grupos_duplicados
+
+def test_sin_encadenar_por_transitividad():
+    # A~B y B~C a 3 bits, pero A y C a 6: C no entra en el grupo de A
+    hashes = {"a": 0b000000, "b": 0b000111, "c": 0b111111}
+    assert grupos_duplicados(hashes, umbral=3) == [["a", "b"]]
+    assert grupos_duplicados(hashes, umbral=6) == [["a", "b", "c"]]
+
+def test_hashes_desde_la_cache(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (64, 64, 3), dtype=np.uint8)
+    rutas = []
+    for i, img in enumerate([base, base, rng.integers(0, 255, (64, 64, 3), dtype=np.uint8)]):
+        rutas.append(str(tmp_path / f"{i}.png"))
+        Image.fromarray(img).save(rutas[-1])
+
+    cache = CacheEmbeddings(str(tmp_path / "cache.sqlite"))
+    primera = colapsar_duplicados(rutas, informe=False, cache=cache)
+
+    def sin_decodificar(ruta):
+        raise AssertionError(f"se volvió a decodificar {ruta}")
+    monkeypatch.setitem(duplicados.HASHES, duplicados.METODO, sin_decodificar)
+    assert colapsar_duplicados(rutas, informe=False, cache=cache) == primera
+    assert primera[1] == {rutas[1]: rutas[0]}
+    cache.cerrar()
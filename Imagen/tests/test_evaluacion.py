@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from evaluacion import evaluar
+from puntuacion import PuntuadorTenis, VARIANTES_COLOR
+
+def _dejar_uno_fuera(vectores, colores, clase_idx, n_clases, alphas, variante, k):
+    """Referencia: recalcula las medias sin cada consulta y puntúa con PuntuadorTenis."""
+    posiciones = []
+    for i in range(len(vectores)):
+        fuera = np.arange(len(vectores)) != i
+        y = clase_idx[i]
+        if (clase_idx[fuera] == y).sum() == 0:
+            continue
+        ce = np.stack([vectores[fuera & (clase_idx == c)].mean(axis=0) for c in range(n_clases)])
+        co = np.stack([colores[fuera & (clase_idx == c)].mean(axis=0) for c in range(n_clases)])
+        puntuador = PuntuadorTenis([str(c) for c in range(n_clases)], ce, co, color=variante)
+        fila = []
+        for alpha in alphas:
+            p = puntuador.puntuar(vectores[i], colores[i], alpha)[0]
+            fila.append(int((p > p[y]).sum()))
+        posiciones.append(fila)
+    posiciones = np.array(posiciones)
+    return np.stack([(posiciones < j).mean(axis=0) for j in range(1, k + 1)], axis=1)
+
+def test_dejar_uno_fuera_igual_que_fuerza_bruta():
+    rng = np.random.default_rng(0)
+    n_clases, k = 6, 3
+    clase_idx = rng.integers(0, n_clases, 90)
+    base = rng.standard_normal((n_clases, 16))
+    vectores = (base[clase_idx] + 1.5 * rng.standard_normal((90, 16))).astype(np.float32)
+    colores = (rng.random((n_clases, 3))[clase_idx] * 200
+               + rng.random((90, 3)) * 55).astype(np.float32)
+    alphas = np.array([0.0, 0.3, 0.6, 0.8, 1.0])
+
+    tasas, evaluadas = evaluar(vectores, colores, clase_idx, n_clases, alphas, k=k)
+    assert evaluadas == 90
+    for variante in VARIANTES_COLOR:
+        esperado = _dejar_uno_fuera(vectores, colores, clase_idx, n_clases, alphas, variante, k)
+        np.testing.assert_allclose(tasas[variante], esperado, atol=1e-9, err_msg=variante)
+
+def test_alpha_fuera_de_rango():
+    with pytest.raises(ValueError):
+        evaluar(np.ones((4, 2)), np.ones((4, 3)), [0, 0, 1, 1], 2, alphas=[0.5, 1.5])
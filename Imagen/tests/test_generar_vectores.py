@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import backends
+import generar_vectores as gv
+from puntos_control import PuntosControl, directorio_puntos
+
+def test_clase_sin_imagenes_validas_no_queda_terminada(tmp_path, monkeypatch):
+    monkeypatch.setattr(backends, "BACKEND", "sintetico")
+    rng = np.random.default_rng(0)
+    os.makedirs(tmp_path / "ds" / "01 nike_a")
+    os.makedirs(tmp_path / "ds" / "02 adidas_b")
+    for i in range(2):
+        Image.fromarray(rng.integers(0, 255, (32, 32, 3), dtype=np.uint8)).save(
+            tmp_path / "ds" / "01 nike_a" / f"{i}.jpg")
+        (tmp_path / "ds" / "02 adidas_b" / f"{i}.jpg").write_bytes(b"no es una imagen")
+
+    def cortar(*args, **kwargs):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(gv, "guardar_almacen", cortar)
+    almacen_dir = str(tmp_path / "alm")
+    with pytest.raises(KeyboardInterrupt):
+        gv.generar_vectores(str(tmp_path / "ds"), usar_cache=False, almacen_dir=almacen_dir,
+                            deduplicar=False)
+
+    puntos = PuntosControl(directorio_puntos(almacen_dir), reanudar=True)
+    assert os.path.exists(puntos.ruta("01 nike_a"))
+    assert not os.path.exists(puntos.ruta("02 adidas_b"))
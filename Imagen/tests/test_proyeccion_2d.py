@@ -0,0 +1,17 @@
+import numpy as np
+
+from proyeccion_2d import proyectar_2d
+
+def test_cache_sin_grupos(tmp_path):
+    features = np.random.default_rng(0).random((40, 8), dtype=np.float32)
+    indices, coordenadas = proyectar_2d(features, max_por_grupo=5, metodo="tsne", perplexity=5,
+                                        dir_cache=str(tmp_path))
+    np.testing.assert_array_equal(indices, np.arange(40))
+    assert coordenadas.shape == (40, 2)
+
+    # la segunda llamada sale de la caché
+    indices2, coordenadas2 = proyectar_2d(features, max_por_grupo=5, metodo="tsne", perplexity=5,
+                                          dir_cache=str(tmp_path))
+    np.testing.assert_array_equal(indices2, indices)
+    np.testing.assert_array_equal(coordenadas2, coordenadas)
+    assert len(list(tmp_path.iterdir())) == 1
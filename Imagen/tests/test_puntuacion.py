@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from puntuacion import PuntuadorTenis
+
+@pytest.fixture
+def catalogo():
+    rng = np.random.default_rng(0)
+    clases = [f"clase_{i:03d}" for i in range(40)]
+    centroides = rng.random((40, 64), dtype=np.float32)
+    colores = rng.random((40, 3), dtype=np.float32) * 255
+    centroides[7, 3] = np.nan  # las clases con NaN se descartaban en el bucle
+    feats = rng.random((25, 64), dtype=np.float32)
+    cols = rng.random((25, 3), dtype=np.float32) * 255
+    return clases, centroides, colores, feats, cols
+
+@pytest.mark.parametrize("alpha", [0.0, 0.5, 0.8, 1.0])
+def test_igual_que_el_bucle_original(catalogo, alpha):
+    pytest.importorskip("sklearn")
+    from benchmarks import _puntuar_bucle
+
+    clases, centroides, colores, feats, cols = catalogo
+    puntuador = PuntuadorTenis(clases, centroides, colores)
+    tenis_features, tenis_colors = dict(zip(clases, centroides)), dict(zip(clases, colores))
+    for [(nombre, sim)], feat, col in zip(puntuador.top_k(feats, cols, alpha, k=1), feats, cols):
+        nombre_ref, sim_ref = _puntuar_bucle(feat, col, tenis_features, tenis_colors, alpha)
+        assert nombre == nombre_ref
+        assert sim == pytest.approx(sim_ref, rel=1e-5)
+
+def test_candidatos_completos_igual_que_top_k(catalogo):
+    clases, centroides, colores, feats, cols = catalogo
+    puntuador = PuntuadorTenis(clases, centroides, colores)
+    todos = np.broadcast_to(np.arange(len(clases)), (len(feats), len(clases)))
+    con_hueco = np.hstack([todos, np.full((len(feats), 3), -1)])
+    esperado = puntuador.top_k(feats, cols, 0.8, k=5)
+    for obtenido in (puntuador.top_k_candidatos(feats, cols, todos, 0.8, k=5),
+                     puntuador.top_k_candidatos(feats, cols, con_hueco, 0.8, k=5)):
+        for fila, fila_esperada in zip(obtenido, esperado):
+            assert [c for c, _ in fila] == [c for c, _ in fila_esperada]
+            np.testing.assert_allclose([s for _, s in fila], [s for _, s in fila_esperada], rtol=1e-5)
+
+def test_consulta_con_nan_sin_resultado(catalogo):
+    clases, centroides, colores, feats, cols = catalogo
+    feats = feats.copy()
+    feats[0, 0] = np.nan
+    puntuador = PuntuadorTenis(clases, centroides, colores)
+    todos = np.broadcast_to(np.arange(len(clases)), (2, len(clases)))
+    for resultados in (puntuador.top_k(feats[:2], cols[:2]),
+                       puntuador.top_k_candidatos(feats[:2], cols[:2], todos)):
+        assert resultados[0] == [] and len(resultados[1]) == 1
@@ -0,0 +1,49 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from servicio_clasificacion import leer_peticion, crear_servidor
+
+def test_leer_peticion():
+    assert leer_peticion({"rutas": ["a.jpg", "b.jpg"], "k": 3}) == (["a.jpg", "b.jpg"], 3)
+    assert leer_peticion({"ruta": "a.jpg"}) == (["a.jpg"], 1)
+
+@pytest.mark.parametrize("cuerpo", [
+    [], "a.jpg", {}, {"rutas": "a.jpg"}, {"rutas": []}, {"rutas": [1]}, {"ruta": None},
+    {"ruta": "a.jpg", "k": 0}, {"ruta": "a.jpg", "k": -2}, {"ruta": "a.jpg", "k": "3"},
+    {"ruta": "a.jpg", "k": True},
+])
+def test_peticiones_invalidas(cuerpo):
+    with pytest.raises(ValueError):
+        leer_peticion(cuerpo)
+
+class _Servicio:
+    class lotes:
+        tamanos, lotes_procesados = [], 0
+
+    def clasificar(self, rutas, k=1):
+        return [{"ruta": r, "clases": []} for r in rutas]
+
+def _post(url, datos):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, datos, method="POST")) as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_servidor_responde_400():
+    servidor = crear_servidor(_Servicio(), "127.0.0.1", 0)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        url = f"http://127.0.0.1:{servidor.server_address[1]}/clasificar"
+        for datos in (b"[1, 2]", b'"a.jpg"', b"{no es json", b'{"rutas": "a.jpg"}', b'{"ruta": "a", "k": 0}'):
+            codigo, cuerpo = _post(url, datos)
+            assert codigo == 400 and "petición inválida" in cuerpo["error"]
+        assert _post(url, b'{"rutas": ["a.jpg"], "k": 2}') == (200, {"resultados": [{"ruta": "a.jpg", "clases": []}]})
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
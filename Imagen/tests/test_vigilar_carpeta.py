@@ -0,0 +1,43 @@
+import json
+import os
+
+import pytest
+
+import clasificar_carpeta as cc
+import vigilar_carpeta
+from vigilar_carpeta import RegistroResultados, Vigilante
+
+@pytest.mark.parametrize("extension", ["jsonl", "csv"])
+def test_fila_cortada_no_impide_arrancar(tmp_path, capsys, extension):
+    salida = str(tmp_path / f"salida.{extension}")
+    registro = RegistroResultados(salida)
+    registro.escribir("media/a.jpg", (10, 20), [("clase", 0.9)])
+    registro.cerrar()
+    with open(salida, "a", encoding="utf-8") as f:
+        f.write('{"fecha": "2026-10-19", "ruta": "media/b.j' if extension == "jsonl" else "x,media/b.jpg")
+
+    registro = RegistroResultados(salida)
+    assert registro.hechas == {("media/a.jpg", 10, 20)}
+    assert "1 filas ilegibles" in capsys.readouterr().out
+    registro.escribir("media/c.jpg", (30, 40), error="ilegible")
+    registro.cerrar()
+    assert RegistroResultados(salida).hechas == {("media/a.jpg", 10, 20), ("media/c.jpg", 30, 40)}
+    if extension == "jsonl":
+        with open(salida, encoding="utf-8") as f:
+            assert json.loads(f.read().splitlines()[-1])["ruta"] == "media/c.jpg"
+
+def test_revision_solo_consulta_lo_nuevo(tmp_path, monkeypatch):
+    monkeypatch.setattr(cc, "cargar_clasificador", lambda *a, **k: lambda *a2, **k2: [])
+    vigilante = Vigilante(str(tmp_path), str(tmp_path / "salida.jsonl"), usar_cache=False)
+    for nombre in ("a.jpg", "b.jpg"):
+        (tmp_path / nombre).write_bytes(b"x")
+    assert vigilante._nuevas(vigilar_carpeta.escanear(str(tmp_path))) == {
+        str(tmp_path / "a.jpg"), str(tmp_path / "b.jpg")}
+
+    (tmp_path / "c.jpg").write_bytes(b"x")
+    os.remove(tmp_path / "a.jpg")
+    assert vigilante._nuevas(vigilar_carpeta.escanear(str(tmp_path))) == {str(tmp_path / "c.jpg")}
+    # si vuelve a aparecer tras borrarse, cuenta como nueva
+    (tmp_path / "a.jpg").write_bytes(b"y")
+    assert vigilante._nuevas(vigilar_carpeta.escanear(str(tmp_path))) == {str(tmp_path / "a.jpg")}
+    vigilante.registro.cerrar()
@@ -0,0 +1,281 @@
+# =============================================================================
+# MODO VIGILANCIA: CLASIFICAR LAS IMÁGENES QUE VAN LLEGANDO A UNA CARPETA
+# =============================================================================
+# Pensado para correr sin interfaz junto al bot que escribe en media/:
+#   - detecta archivos nuevos con watchdog (inotify en Linux) si está
+#     instalado (pip install watchdog) y, si no, revisando la carpeta cada
+#     'intervalo' segundos (solo se consultan los archivos que no estaban antes)
+#   - espera a que cada archivo termine de escribirse antes de leerlo
+#   - clasifica solo lo nuevo, en lotes pequeños, con el modelo cargado una vez
+#   - añade una línea por imagen a un CSV o JSONL (nunca reescribe el archivo)
+#
+# Al arrancar lee la salida existente y no repite lo ya clasificado (misma
+# ruta, tamaño y fecha de modificación).
+#
+# Uso:
+#   python vigilar_carpeta.py media --salida clasificaciones.jsonl
+#   python clasificar_carpeta.py media --vigilar
+
+import os
+import csv
+import json
+import time
+import queue
+import argparse
+from datetime import datetime
+
+import clasificar_carpeta as cc
+from almacen_features import ALMACEN_DIR
+from cache_embeddings import CacheEmbeddings
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # dependencia opcional
+    Observer = None
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+CARPETA = "media"
+SALIDA = "clasificaciones.jsonl"
+INTERVALO = 1.0         # segundos entre revisiones
+ESPERA_ESTABLE = 0.5    # segundos sin cambios para dar un archivo por terminado
+REVISION_COMPLETA = 60  # con watchdog, revisión completa de seguridad cada N s
+LOTE = 16
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+CAMPOS = ["fecha", "ruta", "tamano", "mtime_ns", "clase", "similitud", "top", "error"]
+
+# =============================================================================
+# SALIDA SOLO-AÑADIR
+# =============================================================================
+
+class RegistroResultados:
+    """CSV o JSONL (según la extensión) abierto en modo append, una fila por imagen."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.csv = ruta.lower().endswith(".csv")
+        self.hechas = self._leer_hechas()
+        nuevo = not os.path.exists(ruta) or os.path.getsize(ruta) == 0
+        cortada = not nuevo and not self._termina_en_salto()
+        self.archivo = open(ruta, "a", encoding="utf-8", newline="")
+        if cortada:
+            self.archivo.write("\n")  # la última línea quedó a medias: la siguiente va aparte
+        if self.csv:
+            self.escritor = csv.DictWriter(self.archivo, fieldnames=CAMPOS)
+            if nuevo:
+                self.escritor.writeheader()
+
+    def _termina_en_salto(self):
+        with open(self.ruta, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _leer_hechas(self):
+        """
+        (ruta, tamaño, mtime_ns) de todo lo que ya está en la salida. Las filas
+        ilegibles (p. ej. cortadas por una caída a mitad de escritura) se saltan.
+        """
+        if not os.path.exists(self.ruta):
+            return set()
+        hechas, malas = set(), 0
+        with open(self.ruta, encoding="utf-8", newline="") as f:
+            filas = csv.DictReader(f) if self.csv else (l for l in f if l.strip())
+            for fila in filas:
+                try:
+                    fila = fila if self.csv else json.loads(fila)
+                    hechas.add((fila["ruta"], int(fila["tamano"]), int(fila["mtime_ns"])))
+                except (ValueError, TypeError, KeyError):
+                    malas += 1
+        if malas:
+            print(f"⚠️ {malas} filas ilegibles en {self.ruta}: se ignoran "
+                  f"(esas imágenes se volverán a clasificar)")
+        return hechas
+
+    def escribir(self, ruta, firma, top=None, error=None):
+        fila = {"fecha": datetime.now().isoformat(timespec="seconds"), "ruta": ruta,
+                "tamano": firma[0], "mtime_ns": firma[1],
+                "clase": top[0][0] if top else None,
+                "similitud": round(top[0][1], 4) if top else None,
+                "top": [[c, round(s, 4)] for c, s in top] if top else None,
+                "error": str(error) if error is not None else None}
+        if self.csv:
+            fila["top"] = json.dumps(fila["top"], ensure_ascii=False) if top else ""
+            self.escritor.writerow(fila)
+        else:
+            self.archivo.write(json.dumps(fila, ensure_ascii=False) + "\n")
+        self.hechas.add((ruta, *firma))
+
+    def confirmar(self):
+        self.archivo.flush()
+        os.fsync(self.archivo.fileno())
+
+    def cerrar(self):
+        self.archivo.close()
+
+# =============================================================================
+# DETECCIÓN DE ARCHIVOS NUEVOS
+# =============================================================================
+
+def es_imagen(ruta):
+    return ruta.lower().endswith(EXTENSIONES)
+
+def escanear(carpeta):
+    """Todas las imágenes de la carpeta (sin subcarpetas)."""
+    with os.scandir(carpeta) as entradas:
+        return [e.path for e in entradas if e.is_file() and es_imagen(e.name)]
+
+def _firma(ruta):
+    st = os.stat(ruta)
+    return st.st_size, st.st_mtime_ns
+
+class _AvisosWatchdog(FileSystemEventHandler if Observer else object):
+    def __init__(self, cola):
+        self.cola = cola
+
+    def on_created(self, evento):
+        if not evento.is_directory:
+            self.cola.put(evento.src_path)
+
+    def on_modified(self, evento):
+        if not evento.is_directory:
+            self.cola.put(evento.src_path)
+
+    def on_moved(self, evento):
+        if not evento.is_directory:
+            self.cola.put(evento.dest_path)
+
+# =============================================================================
+# VIGILANTE
+# =============================================================================
+
+class Vigilante:
+    def __init__(self, carpeta=CARPETA, salida=SALIDA, alpha=0.8, k=3, intervalo=INTERVALO,
+                 lote=LOTE, almacen_dir=ALMACEN_DIR, usar_ann=True, usar_cache=True,
+                 jerarquico=False):
+        self.carpeta = carpeta
+        self.alpha = alpha
+        self.k = k
+        self.intervalo = intervalo
+        self.lote = lote
+        self.mejores_clases = cc.cargar_clasificador(almacen_dir, usar_ann, jerarquico)
+        if self.mejores_clases is None:
+            raise SystemExit(1)
+        self.registro = RegistroResultados(salida)
+        self.cache = CacheEmbeddings() if usar_cache else None
+        self.pendientes = set()
+        self.vistas = set()  # imágenes de la última revisión de la carpeta
+        self.clasificadas = 0
+
+    def _candidatas(self, rutas):
+        for ruta in rutas:
+            if es_imagen(ruta):
+                self.pendientes.add(os.path.normpath(ruta))
+
+    def _nuevas(self, rutas):
+        """Las rutas que no estaban en la revisión anterior: solo a esas se les hace stat."""
+        actuales = set(rutas)
+        nuevas = actuales - self.vistas
+        self.vistas = actuales
+        return nuevas
+
+    def _listas(self):
+        """Pendientes que ya terminaron de escribirse y no están en la salida."""
+        ahora = time.time()
+        listas = []
+        for ruta in list(self.pendientes):
+            try:
+                firma = _firma(ruta)
+            except OSError:
+                self.pendientes.discard(ruta)  # borrada antes de procesarla
+                continue
+            if (ruta, *firma) in self.registro.hechas:
+                self.pendientes.discard(ruta)
+            elif firma[0] > 0 and ahora - firma[1] / 1e9 >= ESPERA_ESTABLE:
+                listas.append((ruta, firma))
+        return sorted(listas, key=lambda par: par[1][1])  # por orden de llegada
+
+    def procesar(self):
+        listas = self._listas()
+        for i in range(0, len(listas), self.lote):
+            tanda = dict(listas[i:i + self.lote])
+            t0 = time.perf_counter()
+            for ruta, top, error in cc.clasificar_rutas(
+                    list(tanda), self.mejores_clases, self.alpha, self.k, self.cache,
+                    batch_size=len(tanda), prefetch=0):
+                self.registro.escribir(ruta, tanda[ruta], top, error)
+                self.pendientes.discard(ruta)
+                if error is not None:
+                    print(f"⚠️ {os.path.basename(ruta)}: {error}")
+                else:
+                    print(f"✅ {os.path.basename(ruta)} → {top[0][0]} ({top[0][1]:.3f})")
+            self.registro.confirmar()
+            self.clasificadas += len(tanda)
+            print(f"⏱️ Lote de {len(tanda)} en {time.perf_counter() - t0:.2f} s")
+
+    def ejecutar(self):
+        self._candidatas(self._nuevas(escanear(self.carpeta)))
+        cola = queue.Queue()
+        observador = None
+        if Observer is not None:
+            observador = Observer()
+            observador.schedule(_AvisosWatchdog(cola), self.carpeta, recursive=False)
+            observador.start()
+        modo = "watchdog" if observador else f"revisión cada {self.intervalo:g} s"
+        print(f"👀 Vigilando '{self.carpeta}' ({modo}). Ctrl+C para salir.\n")
+
+        ultima_completa = time.monotonic()
+        try:
+            while True:
+                self.procesar()
+                if observador:
+                    try:
+                        self._candidatas([cola.get(timeout=self.intervalo)])
+                        while True:
+                            self._candidatas([cola.get_nowait()])
+                    except queue.Empty:
+                        pass
+                    if time.monotonic() - ultima_completa >= REVISION_COMPLETA:
+                        self._candidatas(escanear(self.carpeta))
+                        ultima_completa = time.monotonic()
+                else:
+                    time.sleep(self.intervalo)
+                    self._candidatas(self._nuevas(escanear(self.carpeta)))
+        except KeyboardInterrupt:
+            print(f"\n👋 Vigilancia detenida: {self.clasificadas} imágenes clasificadas.")
+        finally:
+            if observador:
+                observador.stop()
+                observador.join()
+            if self.cache:
+                self.cache.cerrar()
+            self.registro.cerrar()
+
+# =============================================================================
+# EJECUCIÓN PRINCIPAL
+# =============================================================================
+
+def argumentos(parser):
+    parser.add_argument("--salida", default=SALIDA, help="Archivo .jsonl o .csv (solo se añade)")
+    parser.add_argument("--alpha", type=float, default=0.8)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--intervalo", type=float, default=INTERVALO)
+    parser.add_argument("--lote", type=int, default=LOTE)
+    parser.add_argument("--almacen", default=ALMACEN_DIR)
+    parser.add_argument("--sin-ann", action="store_true")
+    parser.add_argument("--sin-cache", action="store_true")
+    parser.add_argument("--jerarquico", action="store_true",
+                        help="Puntúa primero las marcas y luego solo sus clases")
+    return parser
+
+def vigilar(args, carpeta):
+    Vigilante(carpeta, args.salida, args.alpha, args.k, args.intervalo, args.lote,
+              args.almacen, not args.sin_ann, not args.sin_cache, args.jerarquico).ejecutar()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clasifica las imágenes nuevas de una carpeta")
+    parser.add_argument("carpeta", nargs="?", default=CARPETA)
+    args = argumentos(parser).parse_args()
+    vigilar(args, args.carpeta)